@@ -0,0 +1,26 @@
+"""
+Standalone benchmarks for the transact app.
+
+Run them from the ``src`` directory as modules, e.g. ``python -m benchmarks.validation``.
+Benchmarks touching the database use the configured ``default`` database, so run migrations first.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+
+def setup_django() -> None:
+    """Configure Django so that the benchmarks can import the project's apps."""
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "lucro.settings")
+    django.setup()
+
+
+@contextmanager
+def timer(results: dict, key):
+    """Record the wall-clock duration of the wrapped block in seconds under the given key."""
+    start = time.perf_counter()
+    yield
+    results[key] = time.perf_counter() - start
@@ -0,0 +1,54 @@
+"""
+Measure categorisation throughput against the local stub enrichment service, serially and concurrently.
+
+Usage: python -m benchmarks.enrichment [--descriptions 200] [--latency 0.05 0.1] [--concurrency 1 10 50 200]
+"""
+
+import argparse
+import asyncio
+import threading
+
+from benchmarks import setup_django, timer
+
+setup_django()
+
+from transact.enrichment import AsyncHTTPBackend, LocalBackend  # noqa: E402
+from transact.management.commands.enrichment_stub_server import StubEnrichmentServer  # noqa: E402
+from transact.rules import RuleMatcher  # noqa: E402
+
+
+def start_stub(min_latency: float, max_latency: float) -> str:
+    """Run the stub enrichment service on a free port in a background thread, returning its URL."""
+    stub = StubEnrichmentServer(RuleMatcher([("uber", "Transport")]), min_latency=min_latency, max_latency=max_latency)
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(stub.start("127.0.0.1", 0))
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/categorise"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--descriptions", type=int, default=200)
+    parser.add_argument("--latency", type=float, nargs=2, default=[0.05, 0.1])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 200])
+    args = parser.parse_args()
+
+    url = start_stub(*args.latency)
+    descriptions = [f"uber ride {i}" for i in range(args.descriptions)]
+    results = {}
+
+    with timer(results, "serial"):
+        LocalBackend(*args.latency).categorise_many(descriptions)
+    for concurrency in args.concurrency:
+        with timer(results, concurrency):
+            categories = AsyncHTTPBackend(url, concurrency=concurrency).categorise_many(descriptions)
+        assert len(categories) == len(descriptions)
+
+    print(f"{'backend':>24} {'seconds':>8} {'rows/sec':>9}")
+    for key, seconds in results.items():
+        name = "local, serial" if key == "serial" else f"async, concurrency {key}"
+        print(f"{name:>24} {seconds:>8.2f} {len(descriptions) / seconds:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
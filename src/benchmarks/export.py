@@ -0,0 +1,109 @@
+"""
+Measure the transaction listing and exports: how long a page takes to fetch deep into the listing with keyset
+pagination rather than OFFSET, and the throughput and peak memory of streaming exports.
+
+Transactions are generated for one account, then rolled back. The peak memory of the exports is traced by
+tracemalloc and should stay flat whatever the number of rows. Large accounts are best measured on PostgreSQL, where
+exports read off a server-side cursor, e.g. against the docker-compose database:
+
+    POSTGRES_HOST=localhost ... python -m benchmarks.export --rows 2000000
+"""
+
+import argparse
+import random
+import tracemalloc
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from itertools import batched
+
+from benchmarks import setup_django, timer
+
+setup_django()
+
+from django.db import connection, transaction  # noqa: E402
+
+from transact.exports import csv_chunks, export_rows, ndjson_chunks  # noqa: E402
+from transact.models import Account, Transaction  # noqa: E402
+from transact.serializers import TransactionListSerializer  # noqa: E402
+
+
+class Rollback(Exception):
+    pass
+
+
+def insert_transactions(count: int) -> None:
+    Account.objects.create(account_id="acc_bench", name="Benchmark", type="checking")
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    step = timedelta(days=365) / count
+    batch_id = uuid.uuid4()
+    rows = (
+        Transaction(
+            transaction_id=f"bench_{i}",
+            account_id="acc_bench",
+            amount=Decimal(random.randint(-50000, 20000)) / 100,
+            currency="USD",
+            date=start + step * i,
+            description="Benchmark",
+            batch_id=batch_id,
+        )
+        for i in range(count)
+    )
+    for chunk in batched(rows, 10_000):
+        Transaction.objects.bulk_create(chunk)
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE transact_transaction")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"database: {connection.vendor}, rows: {args.rows:,}")
+    transactions = Transaction.objects.filter(account_id="acc_bench").in_period(date(2025, 1, 1), date(2025, 12, 31))
+    ordered = transactions.order_by("date", "transaction_id")
+    try:
+        with transaction.atomic():
+            insert_transactions(args.rows)
+
+            print(f"{'page at':>10} {'offset (ms)':>12} {'keyset (ms)':>12}")
+            for position in (0, args.rows // 2, args.rows - args.page_size):
+                results = {}
+                with timer(results, "offset"):
+                    page = list(ordered[position : position + args.page_size])
+                after = page[0] if position else None
+                with timer(results, "keyset"):
+                    keyset = ordered
+                    if after is not None:
+                        # Seeking to the cursor before filtering on the period, as the listing does
+                        seek = Transaction.objects.filter(date__gte=after.date).exclude(
+                            date=after.date, transaction_id__lt=after.transaction_id
+                        )
+                        keyset = (seek & ordered).order_by("date", "transaction_id")
+                    assert list(keyset[: args.page_size]) == page
+                print(f"{position:>10,} {results['offset'] * 1000:>12.1f} {results['keyset'] * 1000:>12.1f}")
+
+            print(f"{'export':>10} {'rows/s':>12} {'peak (MB)':>12}")
+            for name, format_chunks in (("csv", csv_chunks), ("ndjson", ndjson_chunks)):
+                results = {}
+                with timer(results, name):
+                    columns, rows = export_rows(ordered, TransactionListSerializer())
+                    assert sum(len(chunk) for chunk in format_chunks(columns, rows))
+                # Tracing slows the export down, so the memory is measured on a second run
+                tracemalloc.start()
+                columns, rows = export_rows(ordered, TransactionListSerializer())
+                for _ in format_chunks(columns, rows):
+                    pass
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print(f"{name:>10} {args.rows / results[name]:>12,.0f} {peak / 2**20:>12.1f}")
+            raise Rollback
+    except Rollback:
+        pass
+
+
+if __name__ == "__main__":
+    main()
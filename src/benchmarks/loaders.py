@@ -0,0 +1,78 @@
+"""
+Measure transaction loader throughput on the configured database.
+
+Each loader inserts a fresh batch and then reloads it as a redelivery. All writes are rolled back afterwards.
+The COPY loader is only measured on PostgreSQL, e.g. against the docker-compose database:
+
+    POSTGRES_HOST=localhost ... python -m benchmarks.loaders --rows 10000 100000
+"""
+
+import argparse
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from benchmarks import setup_django, timer
+
+setup_django()
+
+from django.db import connection, transaction  # noqa: E402
+
+from transact.loaders import BulkCreateLoader, CopyLoader  # noqa: E402
+from transact.models import Account  # noqa: E402
+
+
+class Rollback(Exception):
+    pass
+
+
+def build_rows(count: int) -> list[dict]:
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "transaction_id": f"bench_{uuid.uuid4().hex}",
+            "account_id": "acc_bench",
+            "amount": Decimal(f"{-(i % 250) - 1}.99"),
+            "currency": "USD",
+            "date": start + timedelta(minutes=i),
+            "merchant_name": "Uber",
+            "description": "Uber ride",
+        }
+        for i in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    loaders = [BulkCreateLoader()]
+    if connection.vendor == "postgresql":
+        loaders.append(CopyLoader())
+
+    print(f"database: {connection.vendor}")
+    print(f"{'loader':>18} {'rows':>8} {'insert rows/s':>14} {'redelivery rows/s':>18}")
+    for count in args.rows:
+        rows = build_rows(count)
+        for loader in loaders:
+            results = {}
+            try:
+                with transaction.atomic():
+                    Account.objects.create(account_id="acc_bench", name="Benchmark", type="checking")
+                    with timer(results, "insert"):
+                        loader.load(rows, str(uuid.uuid4()))
+                    with timer(results, "redelivery"):
+                        loader.load(rows, str(uuid.uuid4()))
+                    raise Rollback
+            except Rollback:
+                pass
+
+            print(
+                f"{type(loader).__name__:>18} {count:>8} {count / results['insert']:>14,.0f} "
+                f"{count / results['redelivery']:>18,.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Compare the compiled category rule matcher with checking every rule in turn, as the hard-coded chain did.
+
+Usage: python -m benchmarks.rules [--rules 10 1000 50000] [--descriptions 2000]
+"""
+
+import argparse
+import random
+import string
+
+from benchmarks import setup_django, timer
+
+setup_django()
+
+from transact.enums import Category  # noqa: E402
+from transact.rules import RuleMatcher  # noqa: E402
+
+
+def build_rules(count: int) -> list[tuple[str, str]]:
+    categories = list(Category)
+    patterns = {"".join(random.choices(string.ascii_lowercase, k=random.randint(4, 10))) for _ in range(count)}
+    return [(pattern, random.choice(categories).value) for pattern in patterns]
+
+
+def build_descriptions(rules: list[tuple[str, str]], count: int) -> list[str]:
+    # Half of the descriptions contain a pattern, the other half match nothing
+    descriptions = []
+    for i in range(count):
+        words = ["".join(random.choices(string.ascii_uppercase + string.digits, k=6)) for _ in range(4)]
+        if i % 2:
+            words.insert(2, random.choice(rules)[0].title())
+        descriptions.append(" ".join(words))
+    return descriptions
+
+
+def match_linearly(rules: list[tuple[str, str]], description: str) -> str | None:
+    description = description.lower()
+    for pattern, category in rules:
+        if pattern in description:
+            return category
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rules", type=int, nargs="+", default=[10, 1_000, 50_000])
+    parser.add_argument("--descriptions", type=int, default=2_000)
+    args = parser.parse_args()
+
+    print(f"{'rules':>8} {'compile (s)':>12} {'linear (us/row)':>16} {'compiled (us/row)':>18} {'speedup':>8}")
+    for size in args.rules:
+        rules = build_rules(size)
+        descriptions = build_descriptions(rules, args.descriptions)
+        results = {}
+
+        with timer(results, "compile"):
+            matcher = RuleMatcher(rules)
+        with timer(results, "linear"):
+            expected = [match_linearly(rules, description) for description in descriptions]
+        with timer(results, "compiled"):
+            matched = [matcher.match(description) for description in descriptions]
+
+        assert matched == expected
+        per_row = {key: results[key] / len(descriptions) * 1e6 for key in ("linear", "compiled")}
+        print(
+            f"{len(rules):>8} {results['compile']:>12.3f} {per_row['linear']:>16.1f} {per_row['compiled']:>18.1f} "
+            f"{per_row['linear'] / per_row['compiled']:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Compare account summaries answered from the daily rollups, from a single scan of the account's transactions, and from
+three scans of them as before.
+
+Transactions are generated for one account over a year, summarised over several ranges, then rolled back. All
+implementations are checked to return the same summaries, to the cent. Large accounts are best measured on
+PostgreSQL, e.g. against the docker-compose database:
+
+    POSTGRES_HOST=localhost ... python -m benchmarks.summary --rows 5000000
+"""
+
+import argparse
+import random
+import statistics
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from itertools import batched
+
+from benchmarks import setup_django, timer
+
+setup_django()
+
+from django.db import connection, transaction  # noqa: E402
+from django.db.models import Count, Q, Sum  # noqa: E402
+
+from transact.enums import Category  # noqa: E402
+from transact.models import Account, DailyAccountRollup, Transaction  # noqa: E402
+
+
+class Rollback(Exception):
+    pass
+
+
+def three_scan_summary(account_id: str, start_date: date, end_date: date) -> dict:
+    """The account summary as it was computed before, with an aggregate and two GROUP BY queries."""
+    applicable_transactions = Transaction.objects.filter(account_id=account_id).in_period(start_date, end_date)
+    metrics = applicable_transactions.aggregate(
+        total_transactions=Count("*"),
+        total_spend=Sum("amount", filter=Q(amount__lt=0)),
+        total_income=Sum("amount", filter=Q(amount__gt=0)),
+    )
+    total_spend = abs(metrics["total_spend"] or Decimal("0.00"))
+    total_income = metrics["total_income"] or Decimal("0.00")
+    top_categories = (
+        applicable_transactions.filter(category__isnull=False)
+        .values("category")
+        .annotate(total_spend=Sum("amount", filter=Q(amount__lt=0)), transaction_count=Count("*"))
+        .order_by("-total_spend")[:5]
+    )
+    return {
+        "account_id": account_id,
+        "date_range": {"start": start_date, "end": end_date},
+        "metrics": {
+            "total_transactions": metrics["total_transactions"] or 0,
+            "total_spend": total_spend,
+            "total_income": total_income,
+            "net": total_income - total_spend,
+        },
+        "top_categories": [
+            {
+                "category": category["category"],
+                "total_spend": abs(category["total_spend"] or Decimal("0.00")),
+                "transaction_count": category["transaction_count"],
+            }
+            for category in top_categories
+        ],
+        "processing_status": applicable_transactions.status_counts(),
+    }
+
+
+def to_cents(value):
+    """Round the decimals of a summary to cents, as SQLite sums decimals as floats, e.g. to 60867.3099999999."""
+    if isinstance(value, dict):
+        return {key: to_cents(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [to_cents(item) for item in value]
+    if isinstance(value, Decimal):
+        return value.quantize(Decimal("0.01"))
+    return value
+
+
+def insert_transactions(count: int) -> None:
+    Account.objects.create(account_id="acc_bench", name="Benchmark", type="checking")
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    step = timedelta(days=365) / count
+    categories = [*Category, None]
+    statuses = list(Transaction.IngestionStatus)
+    batch_id = uuid.uuid4()
+    rows = (
+        Transaction(
+            transaction_id=f"bench_{i}",
+            account_id="acc_bench",
+            amount=Decimal(random.randint(-50000, 20000)) / 100,
+            currency="USD",
+            date=start + step * i,
+            description="Benchmark",
+            category=random.choice(categories),
+            ingestion_status=random.choice(statuses),
+            batch_id=batch_id,
+        )
+        for i in range(count)
+    )
+    for chunk in batched(rows, 10_000):
+        Transaction.objects.bulk_create(chunk)
+    # Bulk inserts bypass the rollups
+    DailyAccountRollup.objects.rebuild(["acc_bench"])
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE transact_transaction")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, nargs="+", default=[7, 30, 365])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"database: {connection.vendor}, rows: {args.rows:,}")
+    print(f"{'days':>6} {'three scans (ms)':>17} {'single scan (ms)':>17} {'rollups (ms)':>13}")
+    try:
+        with transaction.atomic():
+            insert_transactions(args.rows)
+            for days in args.days:
+                start_date, end_date = date(2025, 1, 1), date(2025, 1, 1) + timedelta(days=days - 1)
+                timings = {"three": [], "single": [], "rollups": []}
+                for _ in range(args.repeat):
+                    results = {}
+                    with timer(results, "three"):
+                        expected = three_scan_summary("acc_bench", start_date, end_date)
+                    with timer(results, "single"):
+                        single = Transaction.objects.summarise_transactions("acc_bench", start_date, end_date)
+                    with timer(results, "rollups"):
+                        rollups = Transaction.objects.account_summary("acc_bench", start_date, end_date)
+                    assert to_cents(single) == to_cents(rollups) == to_cents(expected)
+                    for key in timings:
+                        timings[key].append(results[key] * 1000)
+
+                medians = {key: statistics.median(values) for key, values in timings.items()}
+                print(f"{days:>6} {medians['three']:>17.1f} {medians['single']:>17.1f} {medians['rollups']:>13.1f}")
+            raise Rollback
+    except Rollback:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Compare the DRF serializer and the column-wise batch validator on ingestion payloads.
+
+Usage: python -m benchmarks.validation [--sizes 1000 10000 100000]
+"""
+
+import argparse
+import random
+from datetime import datetime, timedelta, timezone
+
+from benchmarks import setup_django, timer
+
+setup_django()
+
+from transact.serializers import TransactionSerializer  # noqa: E402
+from transact.validation import BatchValidator  # noqa: E402
+
+
+def build_rows(count: int) -> list[dict]:
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "transaction_id": f"bench_{i}",
+            "account_id": f"acc_bench_{i % 50}",
+            "amount": f"{random.uniform(-250, 3000):.2f}",
+            "iso_currency_code": "USD",
+            "date": (start + timedelta(minutes=i)).isoformat(),
+            "merchant_name": "Uber",
+            "name": "Uber ride",
+        }
+        for i in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    validator = BatchValidator(TransactionSerializer)
+    print(f"{'rows':>8} {'serializer (s)':>15} {'batch (s)':>10} {'speedup':>8}")
+    for size in args.sizes:
+        rows = build_rows(size)
+        results = {}
+
+        with timer(results, "serializer"):
+            serializer = TransactionSerializer(data=rows, many=True)
+            assert serializer.is_valid(), serializer.errors[:1]
+        with timer(results, "batch"):
+            validated = validator.validate(rows)
+
+        assert validated == serializer.validated_data
+        print(
+            f"{size:>8} {results['serializer']:>15.3f} {results['batch']:>10.3f} "
+            f"{results['serializer'] / results['batch']:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -9,8 +9,8 @@ app = Celery("lucro")
 # Load configuration from Django settings, all config keys will be made uppercase
 app.config_from_object("django.conf:settings", namespace="CELERY")
 
-# Auto-discover tasks from all registered Django apps
-app.autodiscover_tasks()
+# Auto-discover tasks from all registered Django apps, which keep them in their `task` module
+app.autodiscover_tasks(related_name="task")
 
 
 @app.task(bind=True)
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import json
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,6 +46,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "transact.middleware.RequestDecompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -76,6 +78,7 @@ WSGI_APPLICATION = "lucro.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+replica_aliases = []
 if os.environ.get("POSTGRES_HOST"):
     # Docker/production database configuration
     DATABASES = {
@@ -88,15 +91,29 @@ if os.environ.get("POSTGRES_HOST"):
             "PORT": os.environ["POSTGRES_PORT"],
         }
     }
+    # Read replicas, as comma-separated hosts sharing the primary's other settings. In tests, they mirror the
+    # primary's test database.
+    for i, host in enumerate(filter(None, os.environ.get("POSTGRES_REPLICA_HOSTS", "").split(",")), start=1):
+        DATABASES[f"replica{i}"] = {**DATABASES["default"], "HOST": host.strip(), "TEST": {"MIRROR": "default"}}
+        replica_aliases.append(f"replica{i}")
 else:
     # Local SQLite database
     DATABASES = {
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
-        }
+        },
+        # A second connection to the same file, standing in for a read replica when TRANSACT_READ_REPLICAS=replica
+        "replica": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "db.sqlite3",
+            "TEST": {"MIRROR": "default"},
+        },
     }
 
+# Reporting reads go to the replicas listed in TRANSACT_READ_REPLICAS, everything else to the primary
+DATABASE_ROUTERS = ["transact.routers.ReplicaRouter"]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -148,8 +165,37 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # orjson-backed codecs, which fall back to DRF's own JSON handling when orjson is not installed
+    'DEFAULT_PARSER_CLASSES': (
+        'transact.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'transact.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
+# Cache
+# Shared by every web and Celery worker through Redis when configured, otherwise local to each process.
+# Redis should evict expiring keys first, e.g. with "maxmemory-policy volatile-lru", as every cache entry has a TTL.
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+            "KEY_PREFIX": "lucro",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+
 # Celery Configuration
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_BROKER_URL = os.environ.get("CELERY_BROKER_URL", "redis://localhost:6379/0")
@@ -157,3 +203,88 @@ CELERY_RESULT_BACKEND = os.environ.get("CELERY_RESULT_BACKEND", "redis://localho
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TASK_SERIALIZER = "json"
 CELERY_TIMEZONE = "UTC"
+CELERY_BEAT_SCHEDULE = {
+    "recover-transactions": {
+        "task": "transact.task.recover_transactions",
+        "schedule": float(os.environ.get("TRANSACT_RECOVERY_INTERVAL", "60")),
+    },
+    "create-transaction-partitions": {
+        "task": "transact.task.create_transaction_partitions",
+        "schedule": 24 * 60 * 60,
+    },
+}
+
+# Transaction ingestion
+# Upper bound in bytes of a gzip or zstd compressed request body once decompressed, well below available memory, as
+# bodies other than NDJSON streams are read in full
+TRANSACT_MAX_DECOMPRESSED_BODY_SIZE = int(os.environ.get("TRANSACT_MAX_DECOMPRESSED_BODY_SIZE", str(50 * 1024**2)))
+# Upper bound in bytes of the payload of a batch staged for asynchronous ingestion
+TRANSACT_MAX_STAGED_BODY_SIZE = int(os.environ.get("TRANSACT_MAX_STAGED_BODY_SIZE", str(50 * 1024**2)))
+# Number of rows validated and inserted at a time when streaming NDJSON batches
+TRANSACT_INGESTION_CHUNK_SIZE = int(os.environ.get("TRANSACT_INGESTION_CHUNK_SIZE", "1000"))
+# Row lists at least this long are validated column by column instead of through per-row DRF serializers
+TRANSACT_BATCH_VALIDATION_THRESHOLD = int(os.environ.get("TRANSACT_BATCH_VALIDATION_THRESHOLD", "500"))
+# On PostgreSQL, batches of at least this many transactions are loaded through COPY rather than bulk INSERTs
+TRANSACT_COPY_LOADER_THRESHOLD = int(os.environ.get("TRANSACT_COPY_LOADER_THRESHOLD", "5000"))
+# Lifetime in seconds of the shared cache entries of accounts known to be stored, which batches skip upserting
+TRANSACT_ACCOUNT_CACHE_TTL = int(os.environ.get("TRANSACT_ACCOUNT_CACHE_TTL", "300"))
+
+# Transaction categorisation
+# Batches with more pending transactions than this are fanned out over parallel sub-tasks of this size,
+# which claim and update their transactions this many at a time
+TRANSACT_CATEGORISATION_CHUNK_SIZE = int(os.environ.get("TRANSACT_CATEGORISATION_CHUNK_SIZE", "1000"))
+# "batch" to categorise each batch in its own tasks, or "claim" to have drain tasks lease pending transactions of any
+# batch, at most this many per ingested batch, each categorising up to this many chunks before handing over
+TRANSACT_CATEGORISATION_MODE = os.environ.get("TRANSACT_CATEGORISATION_MODE", "batch")
+TRANSACT_CATEGORISATION_DRAIN_TASKS = int(os.environ.get("TRANSACT_CATEGORISATION_DRAIN_TASKS", "8"))
+TRANSACT_CATEGORISATION_DRAIN_CHUNKS = int(os.environ.get("TRANSACT_CATEGORISATION_DRAIN_CHUNKS", "50"))
+# How often in seconds workers check the category rules for changes, recompiling their matcher if needed
+TRANSACT_CATEGORY_RULES_RELOAD_INTERVAL = float(os.environ.get("TRANSACT_CATEGORY_RULES_RELOAD_INTERVAL", "30"))
+# Transactions processing, and staged batches inserting, for longer than this many seconds are considered stuck, and
+# put back to pending or staged
+TRANSACT_PROCESSING_TIMEOUT = int(os.environ.get("TRANSACT_PROCESSING_TIMEOUT", "600"))
+# Failed transactions are retried up to this many times, after a delay in seconds doubling from the base to the max
+TRANSACT_CATEGORISATION_MAX_RETRIES = int(os.environ.get("TRANSACT_CATEGORISATION_MAX_RETRIES", "5"))
+TRANSACT_RETRY_BASE_DELAY = int(os.environ.get("TRANSACT_RETRY_BASE_DELAY", "60"))
+TRANSACT_RETRY_MAX_DELAY = int(os.environ.get("TRANSACT_RETRY_MAX_DELAY", "3600"))
+# Dotted path of the backend categorising descriptions, and its keyword arguments as a JSON object, e.g. for
+# "transact.enrichment.AsyncHTTPBackend": {"url": "http://localhost:8001/categorise", "concurrency": 50}
+TRANSACT_ENRICHMENT_BACKEND = os.environ.get("TRANSACT_ENRICHMENT_BACKEND", "transact.enrichment.LocalBackend")
+TRANSACT_ENRICHMENT_OPTIONS = json.loads(os.environ.get("TRANSACT_ENRICHMENT_OPTIONS", "{}"))
+# Model trained by the train_classifier command, categorising the descriptions no category rule matches with at least
+# this probability
+TRANSACT_CLASSIFIER_PATH = os.environ.get("TRANSACT_CLASSIFIER_PATH", str(BASE_DIR / "classifier.npz"))
+TRANSACT_CLASSIFIER_THRESHOLD = float(os.environ.get("TRANSACT_CLASSIFIER_THRESHOLD", "0.9"))
+# Bound and lifetime in seconds of the per-process cache of categories by description, in front of the shared cache
+TRANSACT_CATEGORY_CACHE_SIZE = int(os.environ.get("TRANSACT_CATEGORY_CACHE_SIZE", "10000"))
+TRANSACT_CATEGORY_CACHE_LOCAL_TTL = int(os.environ.get("TRANSACT_CATEGORY_CACHE_LOCAL_TTL", "300"))
+# Lifetime in seconds of categories in the shared cache
+TRANSACT_CATEGORY_CACHE_TTL = int(os.environ.get("TRANSACT_CATEGORY_CACHE_TTL", "86400"))
+
+# Reports
+# Lifetime in seconds of account versions, each replaced on expiry by a newer one invalidating the reports cached
+TRANSACT_ACCOUNT_VERSION_TTL = int(os.environ.get("TRANSACT_ACCOUNT_VERSION_TTL", "86400"))
+# Lifetime in seconds of cached account summaries and series, invalidated as soon as the account's transactions change
+# They are only cached when the default cache is shared by every process, i.e. with REDIS_URL
+TRANSACT_SUMMARY_CACHE_TTL = int(os.environ.get("TRANSACT_SUMMARY_CACHE_TTL", "3600"))
+# Maximum number of accounts summarised by a single request to the bulk summary endpoint
+TRANSACT_SUMMARY_MAX_ACCOUNTS = int(os.environ.get("TRANSACT_SUMMARY_MAX_ACCOUNTS", "500"))
+# Maximum number of buckets of an account's time series
+TRANSACT_TIMESERIES_MAX_BUCKETS = int(os.environ.get("TRANSACT_TIMESERIES_MAX_BUCKETS", "1000"))
+# Number of transactions per page of the transaction listing by default, and at most
+TRANSACT_TRANSACTION_PAGE_SIZE = int(os.environ.get("TRANSACT_TRANSACTION_PAGE_SIZE", "100"))
+TRANSACT_TRANSACTION_MAX_PAGE_SIZE = int(os.environ.get("TRANSACT_TRANSACTION_MAX_PAGE_SIZE", "1000"))
+# Number of transactions fetched from the server-side cursor, and formatted, at a time by exports
+TRANSACT_EXPORT_CHUNK_SIZE = int(os.environ.get("TRANSACT_EXPORT_CHUNK_SIZE", "2000"))
+# Database aliases reporting reads are spread over, by default every replica given in POSTGRES_REPLICA_HOSTS
+TRANSACT_READ_REPLICAS = os.environ.get("TRANSACT_READ_REPLICAS", ",".join(replica_aliases))
+TRANSACT_READ_REPLICAS = [alias for alias in TRANSACT_READ_REPLICAS.split(",") if alias]
+# Replicas lagging behind the primary by more than this many seconds are skipped, and accounts changed within as many
+# seconds are read from the primary. 0 disables both, e.g. for synchronous replicas. Without a shared cache, i.e.
+# without REDIS_URL, changed accounts cannot be told apart, so reports are only read from replicas if this is 0.
+TRANSACT_REPLICA_MAX_LAG = float(os.environ.get("TRANSACT_REPLICA_MAX_LAG", "5"))
+
+# Partitioning
+# On PostgreSQL, migrate the transactions table to monthly partitions on their date, created this many months ahead
+TRANSACT_PARTITION_TRANSACTIONS = os.environ.get("TRANSACT_PARTITION_TRANSACTIONS", "false").lower() == "true"
+TRANSACT_PARTITION_MONTHS_AHEAD = int(os.environ.get("TRANSACT_PARTITION_MONTHS_AHEAD", "3"))
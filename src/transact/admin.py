@@ -1,3 +1,11 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import CategoryRule
+
+
+@admin.register(CategoryRule)
+class CategoryRuleAdmin(admin.ModelAdmin):
+    list_display = ["pattern", "category", "priority", "is_active", "updated_at"]
+    list_editable = ["category", "priority", "is_active"]
+    list_filter = ["category", "is_active"]
+    search_fields = ["pattern"]
@@ -0,0 +1,176 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_missing = object()
+
+
+def is_shared_cache(alias: str = "default") -> bool:
+    """
+    Return whether the given Django cache is shared by every process, unlike the local-memory and dummy caches.
+    """
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
+
+
+class BoundedTTLCache:
+    """
+    A thread-safe, in-process mapping holding at most ``maxsize`` entries for at most ``ttl`` seconds each.
+
+    The least recently used entry is evicted once the cache is full. Lookups are counted under the
+    ``<name>.hits`` and ``<name>.misses`` metrics.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Return the value cached under the given key, or the default if it is missing or expired.
+        """
+        value = self._lookup(key)
+        metrics.incr(f"{self.name}.misses" if value is _missing else f"{self.name}.hits")
+        return default if value is _missing else value
+
+    def contains(self, key, value) -> bool:
+        """
+        Return whether the given value is cached under the given key. A different cached value counts as a miss.
+        """
+        found = self._lookup(key) == value
+        metrics.incr(f"{self.name}.hits" if found else f"{self.name}.misses")
+        return found
+
+    def _lookup(self, key):
+        now = time.monotonic()
+        with self._lock:
+            value, expires_at = self._entries.get(key, (_missing, 0))
+            if value is _missing:
+                return _missing
+            if expires_at <= now:
+                del self._entries[key]
+                return _missing
+            self._entries.move_to_end(key)
+            return value
+
+    def set_many(self, items: dict) -> None:
+        """
+        Cache the given values by key, evicting the least recently used entries beyond the size bound.
+        """
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for key, value in items.items():
+                self._entries[key] = (value, expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def set(self, key, value) -> None:
+        self.set_many({key: value})
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class TwoTierCache:
+    """
+    Memoizes an expensive function of a string key in a per-process LRU in front of a shared Django cache.
+
+    Keys missing from the local tier are looked up in the shared tier (e.g. Redis) in a single round trip, and only
+    the keys missing from both are computed. ``None`` results are cached like any other, so that inputs without an
+    answer are not recomputed either. Entries expire after ``ttl`` seconds in the shared tier and ``local_ttl`` seconds
+    locally; beyond that, eviction is left to the LRU bound and the shared cache's own policy. Callers should embed a
+    version of whatever the function depends on in their keys, so that changing it invalidates every entry at once.
+
+    Lookups are counted under the ``<name>.local.*`` and ``<name>.shared.*`` metrics, and computations under
+    ``<name>.computed``. The shared tier is best effort: when it is unavailable, keys are simply computed.
+    """
+
+    # Stands for a cached None, which the Django cache API cannot tell apart from a missing key
+    NONE = "__none__"
+
+    def __init__(self, name: str, maxsize: int, local_ttl: float, ttl: float, alias: str = "default"):
+        self.name = name
+        self.ttl = ttl
+        self.alias = alias
+        self.local = BoundedTTLCache(f"{name}.local", maxsize=maxsize, ttl=local_ttl)
+
+    def get_many(self, keys: Iterable[str], compute_many: Callable[[list[str]], dict]) -> dict:
+        """
+        Return the values for the given keys, computing and caching the ones found in neither tier.
+
+        :param keys: The keys to look up.
+        :param compute_many: Computes the values of a list of keys, all at once. Keys it leaves out of its result are
+            left out of the returned values too, and are not cached.
+        :return: The values by key.
+        """
+        values = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            value = self.local.get(key, _missing)
+            if value is _missing:
+                missing.append(key)
+            else:
+                values[key] = value
+        if not missing:
+            return values
+
+        shared_keys = {self._shared_key(key): key for key in missing}
+        found = self._shared_get_many(list(shared_keys))
+        metrics.incr(f"{self.name}.shared.hits", len(found))
+        metrics.incr(f"{self.name}.shared.misses", len(missing) - len(found))
+
+        fetched = {
+            key: None if found[shared_key] == self.NONE else found[shared_key]
+            for shared_key, key in shared_keys.items()
+            if shared_key in found
+        }
+        to_compute = [key for key in missing if key not in fetched]
+        computed = compute_many(to_compute) if to_compute else {}
+        metrics.incr(f"{self.name}.computed", len(computed))
+
+        self._shared_set_many(
+            {self._shared_key(key): self.NONE if value is None else value for key, value in computed.items()}
+        )
+        self.local.set_many({**fetched, **computed})
+        return {**values, **fetched, **computed}
+
+    def clear(self) -> None:
+        """Clear the local tier. Shared entries are invalidated by changing the version in their keys."""
+        self.local.clear()
+
+    def _shared_key(self, key: str) -> str:
+        # Hashed, as keys may be arbitrarily long and some backends restrict their length and characters
+        return f"{self.name}:{hashlib.blake2b(key.encode(), digest_size=16).hexdigest()}"
+
+    def _shared_get_many(self, keys: list[str]) -> dict:
+        try:
+            return caches[self.alias].get_many(keys)
+        except Exception:
+            logger.warning("The %s cache is unavailable, computing every key", self.name, exc_info=True)
+            return {}
+
+    def _shared_set_many(self, items: dict) -> None:
+        if not items:
+            return
+        try:
+            caches[self.alias].set_many(items, timeout=self.ttl)
+        except Exception:
+            logger.warning("The %s cache is unavailable, results are only cached locally", self.name, exc_info=True)
@@ -0,0 +1,230 @@
+"""
+A statistical categoriser, falling back behind the category rules for the descriptions which match none of them.
+
+A multinomial naive Bayes model is trained by the ``train_classifier`` command from categorised transactions, over
+hashed character n-grams of their normalised descriptions, and saved to ``TRANSACT_CLASSIFIER_PATH``. Descriptions
+are featurised and scored a chunk at a time with array operations, never one by one.
+"""
+
+import hashlib
+import os
+import threading
+from collections.abc import Iterable
+from itertools import batched
+
+import numpy as np
+from django.conf import settings
+
+from . import metrics
+from .enums import Category
+from .rules import normalise_description
+
+# FNV-1a, which is stable across processes unlike hash()
+_FNV_OFFSET = np.uint64(0xCBF29CE484222325)
+_FNV_PRIME = np.uint64(0x100000001B3)
+
+
+def hash_ngrams(
+    descriptions: list[str], n_features: int, ngram_range: tuple[int, int] = (3, 5)
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Hash the character n-grams of the given descriptions, once normalised and padded with a space on both ends.
+
+    All the descriptions are laid end to end in a single byte array, and the hashes of the n-grams starting at every
+    position are computed at once, one n-gram length at a time.
+
+    :param descriptions: The descriptions to featurise.
+    :param n_features: The number of features n-grams are hashed to, a power of two.
+    :param ngram_range: The shortest and longest n-gram lengths.
+    :return: The index of the description and the feature of each n-gram, as two arrays of the same length.
+    """
+    texts = [f" {normalise_description(description)} ".encode() for description in descriptions]
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    rows = np.repeat(np.arange(len(texts)), lengths)
+    ends = np.repeat(np.cumsum(lengths), lengths)
+    positions = np.arange(len(rows))
+
+    lo, hi = ngram_range
+    # Pad the end so that the n-grams overrunning the last description can be hashed, then discarded
+    buffer = np.frombuffer(b"".join(texts) + bytes(hi), dtype=np.uint8).astype(np.uint64)
+    hashes = np.full(len(rows), _FNV_OFFSET, dtype=np.uint64)
+    all_rows, all_features = [], []
+    for n in range(1, hi + 1):
+        hashes = (hashes ^ buffer[n - 1 : n - 1 + len(rows)]) * _FNV_PRIME
+        if n >= lo:
+            valid = positions + n <= ends
+            mixed = hashes[valid] ^ (hashes[valid] >> np.uint64(32))
+            all_rows.append(rows[valid])
+            all_features.append((mixed & np.uint64(n_features - 1)).astype(np.int64))
+    return np.concatenate(all_rows), np.concatenate(all_features)
+
+
+class NaiveBayesClassifier:
+    """A multinomial naive Bayes model over hashed character n-grams of transaction descriptions."""
+
+    def __init__(
+        self,
+        classes: list[str],
+        log_prior: np.ndarray,
+        log_likelihood: np.ndarray,
+        ngram_range: tuple[int, int] = (3, 5),
+    ):
+        """
+        :param classes: The categories predicted.
+        :param log_prior: The log probability of each category.
+        :param log_likelihood: The log probability of each feature per category, of shape (classes, features).
+        :param ngram_range: The shortest and longest n-gram lengths the model was trained on.
+        """
+        self.classes = [str(category) for category in classes]
+        self.log_prior = log_prior.astype(np.float64)
+        self.log_likelihood = log_likelihood.astype(np.float32)
+        self.ngram_range = tuple(int(n) for n in ngram_range)
+        self.n_features = self.log_likelihood.shape[1]
+        digest = hashlib.blake2b(self.log_likelihood.tobytes(), digest_size=8)
+        digest.update(self.log_prior.tobytes())
+        self.version = digest.hexdigest()
+
+    @classmethod
+    def fit(
+        cls,
+        samples: Iterable[tuple[str, str]],
+        classes: Iterable[str] = tuple(Category),
+        n_features: int = 2**18,
+        alpha: float = 0.1,
+        ngram_range: tuple[int, int] = (3, 5),
+        chunk_size: int = 10000,
+    ) -> "NaiveBayesClassifier":
+        """
+        Train a model from categorised descriptions, counting the n-grams of a chunk of them at a time.
+
+        :param samples: ``(description, category)`` pairs. Categories outside ``classes`` are ignored.
+        :param classes: The categories to predict.
+        :param n_features: The number of features n-grams are hashed to, a power of two.
+        :param alpha: The additive smoothing of the feature counts.
+        :param ngram_range: The shortest and longest n-gram lengths.
+        :param chunk_size: The number of samples featurised at once.
+        :return: The trained model.
+        """
+        if n_features & (n_features - 1):
+            raise ValueError(f"The number of features must be a power of two, got {n_features}.")
+        classes = list(classes)
+        class_index = {category: i for i, category in enumerate(classes)}
+        feature_counts = np.zeros(len(classes) * n_features, dtype=np.float64)
+        class_counts = np.zeros(len(classes), dtype=np.float64)
+
+        for chunk in batched(samples, chunk_size):
+            known = [(description, class_index[category]) for description, category in chunk if category in class_index]
+            if not known:
+                continue
+            descriptions, labels = zip(*known)
+            labels = np.array(labels)
+            rows, features = hash_ngrams(list(descriptions), n_features, ngram_range)
+            feature_counts += np.bincount(labels[rows] * n_features + features, minlength=feature_counts.size)
+            class_counts += np.bincount(labels, minlength=len(classes))
+
+        if not class_counts.any():
+            raise ValueError("No categorised descriptions to train from.")
+        feature_counts = feature_counts.reshape(len(classes), n_features) + alpha
+        log_likelihood = np.log(feature_counts) - np.log(feature_counts.sum(axis=1, keepdims=True))
+        with np.errstate(divide="ignore"):
+            # Categories without samples are never predicted
+            log_prior = np.log(class_counts / class_counts.sum())
+        return cls(classes, log_prior, log_likelihood, ngram_range)
+
+    def predict(self, descriptions: list[str]) -> tuple[list[str | None], np.ndarray]:
+        """
+        Score the given descriptions all at once.
+
+        :param descriptions: The descriptions to categorise.
+        :return: The most likely category of each description, and the probability of it. Descriptions too short
+            to have any n-gram get no category and a confidence of zero.
+        """
+        if not descriptions:
+            return [], np.zeros(0)
+        rows, features = hash_ngrams(descriptions, self.n_features, self.ngram_range)
+        # The log likelihoods of the n-grams of every description summed per category, shape (classes, descriptions)
+        weights = self.log_likelihood[:, features]
+        scores = np.stack([np.bincount(rows, weights=w, minlength=len(descriptions)) for w in weights])
+        scores += self.log_prior[:, np.newaxis]
+
+        best = scores.argmax(axis=0)
+        # Softmax of the best score, computed stably
+        shifted = scores - scores[best, np.arange(len(descriptions))]
+        confidence = 1 / np.exp(shifted).sum(axis=0)
+        confidence[np.bincount(rows, minlength=len(descriptions)) == 0] = 0
+        categories = [self.classes[i] if c else None for i, c in zip(best, confidence)]
+        return categories, confidence
+
+    def categorise_many(self, descriptions: list[str], threshold: float) -> dict[str, str | None]:
+        """
+        Categorise the given descriptions, leaving the ones the model is not confident enough about uncategorised.
+
+        :param descriptions: The descriptions to categorise.
+        :param threshold: The minimum probability of the predicted category.
+        :return: The category of each description, None when its probability is below the threshold.
+        """
+        categories, confidence = self.predict(descriptions)
+        confident = confidence >= threshold
+        metrics.incr("classifier.predictions", len(descriptions))
+        metrics.incr("classifier.below_threshold", int((~confident).sum()))
+        return {
+            description: category if is_confident else None
+            for description, category, is_confident in zip(descriptions, categories, confident)
+        }
+
+    def save(self, path: str | os.PathLike) -> None:
+        with open(path, "wb") as file:
+            np.savez(
+                file,
+                classes=np.array(self.classes),
+                log_prior=self.log_prior,
+                log_likelihood=self.log_likelihood,
+                ngram_range=np.array(self.ngram_range),
+            )
+
+    @classmethod
+    def load(cls, path: str | os.PathLike) -> "NaiveBayesClassifier":
+        with np.load(path) as model:
+            return cls(
+                model["classes"].tolist(), model["log_prior"], model["log_likelihood"], tuple(model["ngram_range"])
+            )
+
+
+class _ClassifierCache:
+    """
+    Holds the model saved at ``TRANSACT_CLASSIFIER_PATH`` for the lifetime of a worker process, reloading it whenever
+    the file is replaced.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._classifier = None
+        self._key = None
+
+    def get(self) -> NaiveBayesClassifier | None:
+        path = settings.TRANSACT_CLASSIFIER_PATH
+        try:
+            stat = os.stat(path) if path else None
+        except FileNotFoundError:
+            stat = None
+        key = (path, stat.st_mtime_ns, stat.st_size) if stat else None
+
+        with self._lock:
+            if key != self._key:
+                self._classifier = NaiveBayesClassifier.load(path) if key else None
+                self._key = key
+                metrics.incr("classifier.reloads")
+            return self._classifier
+
+    def clear(self) -> None:
+        with self._lock:
+            self._classifier = None
+            self._key = None
+
+
+classifiers = _ClassifierCache()
+
+
+def get_classifier() -> NaiveBayesClassifier | None:
+    """Return the trained model, or None if there is none."""
+    return classifiers.get()
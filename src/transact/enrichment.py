@@ -0,0 +1,147 @@
+"""
+Backends determining the category of transaction descriptions.
+
+The backend in use is set by the ``TRANSACT_ENRICHMENT_BACKEND`` setting, as a dotted path to a subclass of
+:class:`EnrichmentBackend`.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from abc import ABC, abstractmethod
+from functools import cache
+from urllib.parse import urlsplit
+
+import httpx
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from . import metrics
+from .rules import get_rule_matcher
+
+logger = logging.getLogger(__name__)
+
+
+class EnrichmentError(Exception):
+    """A description could not be categorised, e.g. because the enrichment service failed or timed out."""
+
+
+class EnrichmentBackend(ABC):
+    """Determines the categories of many transaction descriptions at once."""
+
+    @abstractmethod
+    def categorise_many(self, descriptions: list[str]) -> dict[str, str | None]:
+        """
+        Categorise the given descriptions.
+
+        :param descriptions: Distinct, normalised descriptions.
+        :return: The category of each description, None for the ones which fit no category. Descriptions which
+            could not be categorised because of an error are left out.
+        """
+
+
+class LocalBackend(EnrichmentBackend):
+    """
+    Categorises descriptions in-process with the category rules, one after the other.
+
+    Each description takes a random delay of between ``min_latency`` and ``max_latency`` seconds, simulating a call to
+    a remote enrichment service.
+    """
+
+    def __init__(self, min_latency: float = 0.5, max_latency: float = 1):
+        self.min_latency = min_latency
+        self.max_latency = max_latency
+
+    def categorise_many(self, descriptions: list[str]) -> dict[str, str | None]:
+        matcher = get_rule_matcher()
+        categories = {}
+        for description in descriptions:
+            time.sleep(random.uniform(self.min_latency, self.max_latency))  # Simulate random processing latency
+            categories[description] = matcher.match(description)
+        return categories
+
+
+class AsyncHTTPBackend(EnrichmentBackend):
+    """
+    Categorises descriptions through a remote enrichment service, sending many requests at once from an event loop.
+
+    Each description is posted as ``{"description": ...}`` to the service, which answers ``{"category": ...}``, with
+    a null category for descriptions fitting none. At most ``concurrency`` requests are in flight at a time, over as
+    many connections kept alive for the call, and each step of a request, e.g. connecting or waiting for the response,
+    is bounded by ``timeout`` seconds. Timeouts, connection errors, 5xx responses and malformed responses are retried
+    up to ``retries`` times with exponential backoff.
+    """
+
+    def __init__(self, url: str, concurrency: int = 50, timeout: float = 5, retries: int = 2, backoff: float = 0.1):
+        if urlsplit(url).scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported enrichment service URL {url}, only HTTP and HTTPS are supported.")
+        if concurrency < 1 or retries < 0:
+            raise ValueError("The concurrency must be at least 1, and the number of retries at least 0.")
+        self.url = url
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+
+    def categorise_many(self, descriptions: list[str]) -> dict[str, str | None]:
+        return asyncio.run(self._categorise_all(descriptions))
+
+    async def _categorise_all(self, descriptions: list[str]) -> dict[str, str | None]:
+        # A client is bound to the event loop it is used from, which is a new one for every call
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        async with httpx.AsyncClient(timeout=self.timeout, limits=limits) as client:
+            semaphore = asyncio.Semaphore(self.concurrency)
+            results = await asyncio.gather(
+                *(self._categorise(client, semaphore, description) for description in descriptions),
+                return_exceptions=True,
+            )
+
+        categories = {}
+        for description, result in zip(descriptions, results):
+            if isinstance(result, Exception):
+                logger.warning("Could not categorise %r: %s", description, result)
+                metrics.incr("enrichment.failures")
+            else:
+                categories[description] = result
+        return categories
+
+    async def _categorise(
+        self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore, description: str
+    ) -> str | None:
+        async with semaphore:
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    metrics.incr("enrichment.retries")
+                    await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+                try:
+                    metrics.incr("enrichment.requests")
+                    response = await client.post(self.url, json={"description": description})
+                except httpx.TransportError as e:
+                    error = EnrichmentError(f"Request failed: {e!r}")
+                    continue
+
+                if response.status_code >= 500:
+                    error = EnrichmentError(f"The enrichment service answered {response.status_code}")
+                    continue
+                if response.status_code != 200:
+                    raise EnrichmentError(
+                        f"The enrichment service answered {response.status_code}: {response.content[:200]!r}"
+                    )
+                try:
+                    category = response.json()["category"]
+                except (ValueError, KeyError, TypeError) as e:
+                    # A truncated or garbled body, e.g. from a restarting service or a proxy
+                    error = EnrichmentError(f"Malformed response {response.content[:200]!r}: {e!r}")
+                    continue
+                if category is not None and not isinstance(category, str):
+                    error = EnrichmentError(f"Malformed category {category!r}")
+                    continue
+                return category
+            raise error
+
+
+@cache
+def get_enrichment_backend() -> EnrichmentBackend:
+    """Return the enrichment backend configured by the ``TRANSACT_ENRICHMENT_BACKEND`` settings."""
+    return import_string(settings.TRANSACT_ENRICHMENT_BACKEND)(**settings.TRANSACT_ENRICHMENT_OPTIONS)
@@ -1,3 +1,4 @@
+from datetime import date, timedelta
 from enum import StrEnum
 
 
@@ -6,3 +7,25 @@ class Category(StrEnum):
     SHOPPING = "Shopping"
     SOFTWARE = "Software"
     TRANSPORT = "Transport"
+
+
+class Interval(StrEnum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+    def truncate(self, day: date) -> date:
+        """Return the first day of the interval the given day falls in, weeks starting on Mondays."""
+        if self is Interval.WEEK:
+            return day - timedelta(days=day.weekday())
+        if self is Interval.MONTH:
+            return day.replace(day=1)
+        return day
+
+    def next(self, start: date) -> date:
+        """Return the first day of the interval following the one starting on the given day."""
+        if self is Interval.WEEK:
+            return start + timedelta(weeks=1)
+        if self is Interval.MONTH:
+            return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return start + timedelta(days=1)
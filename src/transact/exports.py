@@ -0,0 +1,90 @@
+"""
+Streaming exports of transactions, formatted a chunk of rows at a time as they are read off a server-side cursor, so
+that exports of any size are written in constant memory.
+"""
+
+import csv
+import json
+from collections.abc import Callable, Iterable, Iterator
+from datetime import datetime
+from itertools import batched
+
+from django.conf import settings
+from django.db.models import QuerySet
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speed-up
+    orjson = None
+
+
+class _Echo:
+    """A file-like object handing back what is written to it, for ``csv.writer`` to format single rows."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def export_rows(queryset: QuerySet, serializer: serializers.Serializer) -> tuple[list[str], Iterator[list]]:
+    """
+    Read the given rows off a server-side cursor, formatted as the serializer would format them.
+
+    Only the serializer's fields are read from the database, as plain values, and formatted by the fields themselves,
+    which is much cheaper than serializing model instances one by one.
+
+    :param queryset: The rows to export, in order.
+    :param serializer: The serializer of a single row.
+    :return: The names of the columns, and the formatted values of every row.
+    """
+    fields = list(serializer.fields.values())
+    values = queryset.values_list(*(field.source for field in fields))
+    formatters = [_formatter(field) for field in fields]
+
+    def rows():
+        for row in values.iterator(chunk_size=settings.TRANSACT_EXPORT_CHUNK_SIZE):
+            yield [None if value is None else formatter(value) for formatter, value in zip(formatters, row)]
+
+    return [field.field_name for field in fields], rows()
+
+
+def _formatter(field: serializers.Field) -> Callable:
+    """
+    Return the function formatting the values of the given field, which is the field's own ``to_representation``
+    except for ISO 8601 timestamps. Those are formatted exactly as DRF does, but without looking up the current
+    timezone for every value.
+    """
+    if not isinstance(field, serializers.DateTimeField):
+        return field.to_representation
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    tz = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or tz is None:
+        return field.to_representation
+
+    def format_datetime(value: datetime) -> str:
+        value = value.astimezone(tz).isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+    return format_datetime
+
+
+def csv_chunks(columns: list[str], rows: Iterable[list]) -> Iterator[str]:
+    """Format the given rows as CSV after a header line, a chunk of lines at a time."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for chunk in batched(rows, settings.TRANSACT_EXPORT_CHUNK_SIZE):
+        yield "".join(writer.writerow(row) for row in chunk)
+
+
+def ndjson_chunks(columns: list[str], rows: Iterable[list]) -> Iterator[bytes]:
+    """Format the given rows as JSON objects one per line, a chunk of lines at a time."""
+    if orjson:
+        dumps = orjson.dumps
+    else:
+
+        def dumps(record):
+            return json.dumps(record, separators=(",", ":")).encode()
+
+    for chunk in batched(rows, settings.TRANSACT_EXPORT_CHUNK_SIZE):
+        yield b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in chunk)
@@ -0,0 +1,297 @@
+import io
+import json
+import logging
+from collections.abc import Iterable
+from dataclasses import asdict
+from itertools import batched
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.exceptions import APIException
+
+from . import metrics
+from .caching import is_shared_cache
+from .loaders import UpsertResult, get_transaction_loader
+from .models import Account, DailyAccountRollup, IngestionBatch, Transaction
+from .parsers import NDJSONParser
+from .task import categorise_transactions
+from .validation import validate_rows
+
+logger = logging.getLogger(__name__)
+
+ACCOUNT_UPSERT_FIELDS = ("name", "type", "subtype", "mask")
+# Shared cache entries holding the fields accounts are known to be stored with, so that repeat batches can skip them
+KNOWN_ACCOUNT_PREFIX = "known_account"
+
+
+def upsert_accounts(accounts_data: list[dict]) -> None:
+    """
+    Insert the given accounts, updating the ones which already exist, in a single query.
+
+    Accounts the shared cache records as stored with the same fields are skipped entirely, for
+    ``TRANSACT_ACCOUNT_CACHE_TTL`` seconds after they were last upserted. Every process records the accounts it
+    upserts there, so that none keeps skipping an account another process changed since. When the cache is local to
+    each process, accounts are always upserted.
+
+    :param accounts_data: Validated account rows.
+    """
+    # The last occurrence wins when an account ID is repeated within the same payload
+    incoming = {account["account_id"]: account for account in accounts_data}
+    fingerprints = {
+        account_id: tuple(account.get(field) for field in ACCOUNT_UPSERT_FIELDS)
+        for account_id, account in incoming.items()
+    }
+    stale_account_ids = list(fingerprints)
+    if shared := is_shared_cache():
+        known = _known_accounts(fingerprints)
+        stale_account_ids = [
+            account_id for account_id, fingerprint in fingerprints.items() if known.get(account_id) != fingerprint
+        ]
+        metrics.incr("known_accounts.hits", len(fingerprints) - len(stale_account_ids))
+        metrics.incr("known_accounts.misses", len(stale_account_ids))
+    if not stale_account_ids:
+        return
+
+    Account.objects.bulk_create(
+        [Account(**incoming[account_id]) for account_id in stale_account_ids],
+        update_conflicts=True,
+        unique_fields=["account_id"],
+        update_fields=[*ACCOUNT_UPSERT_FIELDS, "updated_at"],
+    )
+
+    # Only remember the accounts once they are committed, as a rollback would leave the cache ahead of the database
+    if shared:
+        upserted = {account_id: fingerprints[account_id] for account_id in stale_account_ids}
+        transaction.on_commit(lambda: _remember_accounts(upserted))
+
+
+def _known_account_key(account_id: str) -> str:
+    return f"{KNOWN_ACCOUNT_PREFIX}:{account_id}"
+
+
+def _known_accounts(account_ids: Iterable[str]) -> dict[str, tuple]:
+    keys = {_known_account_key(account_id): account_id for account_id in account_ids}
+    try:
+        found = cache.get_many(keys)
+    except Exception:
+        logger.warning("The cache is unavailable, upserting every account", exc_info=True)
+        return {}
+    return {keys[key]: fingerprint for key, fingerprint in found.items()}
+
+
+def _remember_accounts(fingerprints: dict[str, tuple]) -> None:
+    try:
+        cache.set_many(
+            {_known_account_key(account_id): fingerprint for account_id, fingerprint in fingerprints.items()},
+            timeout=settings.TRANSACT_ACCOUNT_CACHE_TTL,
+        )
+    except Exception:
+        logger.warning("The cache is unavailable, accounts will be upserted again", exc_info=True)
+
+
+def upsert_transactions(transactions_data: list[dict], batch_id: str) -> UpsertResult:
+    """
+    Idempotently upsert the given transactions by their transaction ID, using the loader suited to their number.
+
+    :param transactions_data: Validated transaction rows.
+    :param batch_id: The batch ID to stamp onto newly inserted transactions.
+    :return: The number of inserted, updated and duplicate rows.
+    """
+    transaction_ids = [row["transaction_id"] for row in transactions_data]
+    changed = [
+        Transaction.objects.filter(transaction_id__in=chunk)
+        for chunk in batched(transaction_ids, settings.TRANSACT_INGESTION_CHUNK_SIZE)
+    ]
+    with DailyAccountRollup.objects.tracking(*changed, transaction_ids=transaction_ids):
+        return get_transaction_loader(len(transactions_data)).load(transactions_data, batch_id)
+
+
+def record_batch(batch_id: str, total_records: int, result: UpsertResult) -> None:
+    """
+    Record the given batch as inserted, along with its row counts.
+
+    :param batch_id: The batch ID.
+    :param total_records: The number of ingested accounts and transactions.
+    :param result: The transaction upsert counts.
+    """
+    batch = IngestionBatch(
+        batch_id=batch_id,
+        status=IngestionBatch.Status.INSERTED,
+        total_transactions=total_records,
+        **asdict(result),
+    )
+    # Batches ingested synchronously are created here, staged ones get their payload cleared
+    IngestionBatch.objects.bulk_create(
+        [batch],
+        update_conflicts=True,
+        unique_fields=["batch_id"],
+        update_fields=["status", "payload", "total_transactions", "inserted", "updated", "duplicates", "updated_at"],
+    )
+
+
+def ingest_batch(accounts_data: list[dict], transactions_data: list[dict], batch_id: str | None = None) -> dict:
+    """
+    Upsert validated accounts and transactions as one batch, then enqueue the categorisation of its transactions.
+
+    :param accounts_data: Validated account rows.
+    :param transactions_data: Validated transaction rows.
+    :param batch_id: The batch ID, generated if not given.
+    :return: A dictionary with the batch ID and the inserted, updated and duplicate transaction counts.
+    """
+    with transaction.atomic():
+        # We first handle the accounts via upserts, so that all necessary accounts exist for the transactions
+        upsert_accounts(accounts_data)
+
+        # Redelivered transactions are skipped or updated rather than failing the batch
+        batch_id = batch_id or str(uuid4())
+        result = upsert_transactions(transactions_data, batch_id=batch_id)
+        record_batch(batch_id, len(accounts_data) + len(transactions_data), result)
+
+    # Trigger asynchronous categorization for the new transactions of this batch, and those whose description changed
+    if result.inserted or result.updated:
+        categorise_transactions.delay(batch_id=batch_id)
+
+    return {
+        "total_transactions": len(accounts_data) + len(transactions_data),
+        "batch_id": batch_id,
+        **asdict(result),
+    }
+
+
+def stage_batch(payload: bytes, content_type: str) -> IngestionBatch:
+    """
+    Store a raw ingestion payload to be validated and inserted later by a worker.
+
+    :param payload: The raw request body.
+    :param content_type: The media type of the payload.
+    :return: The staged batch.
+    """
+    return IngestionBatch.objects.create(batch_id=uuid4(), content_type=content_type, payload=payload)
+
+
+def materialise_batch_payload(batch_id: str) -> dict | None:
+    """
+    Validate and insert the rows of a staged batch, recording the outcome on the batch.
+
+    Batches which are no longer staged, e.g. on task redelivery, are left untouched. A batch is claimed by moving it
+    to inserting, from where ``recover_transactions`` stages it again should its worker die before recording the
+    outcome.
+
+    :param batch_id: The ID of the staged batch.
+    :return: The ingestion result, or None if the batch was not materialised.
+    """
+    # Imported here as the serializers module depends on this one
+    from .serializers import CompositeCreationSerializer
+
+    claimed = IngestionBatch.objects.filter(batch_id=batch_id, status=IngestionBatch.Status.STAGED).update(
+        status=IngestionBatch.Status.INSERTING, updated_at=timezone.now()
+    )
+    if not claimed:
+        return None
+
+    batch = IngestionBatch.objects.get(batch_id=batch_id)
+    try:
+        if batch.content_type == NDJSONParser.media_type:
+            records = NDJSONParser().parse(io.BytesIO(bytes(batch.payload)))
+            return StreamingIngestion(batch_id=str(batch.batch_id)).ingest(records)
+
+        serializer = CompositeCreationSerializer(
+            data=json.loads(bytes(batch.payload)), context={"batch_id": str(batch.batch_id)}
+        )
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+    except (ValueError, APIException) as exc:
+        # Rejected payloads keep their body so that they can be inspected
+        errors = exc.detail if isinstance(exc, APIException) else {"detail": str(exc)}
+        IngestionBatch.objects.filter(batch_id=batch_id).update(status=IngestionBatch.Status.FAILED, errors=errors)
+        return None
+    except Exception as exc:
+        IngestionBatch.objects.filter(batch_id=batch_id).update(
+            status=IngestionBatch.Status.FAILED, errors={"detail": str(exc)}
+        )
+        raise
+
+
+class StreamingIngestion:
+    """
+    Ingests an NDJSON stream of accounts and transactions in fixed-size chunks.
+
+    Each record is an object holding either an ``account`` or a ``transaction`` key, whose value uses the same schema
+    as the JSON ingestion payload. Records are buffered per kind and, once a buffer holds ``chunk_size`` rows, validated
+    and inserted before parsing continues, so memory use is bounded by the chunk size rather than the batch size.
+    All chunks are written inside a single database transaction under one batch ID.
+    """
+
+    def __init__(self, chunk_size: int | None = None, batch_id: str | None = None):
+        # Imported here as the serializers module depends on this one
+        from .serializers import AccountSerializer, TransactionSerializer
+
+        self.chunk_size = chunk_size or settings.TRANSACT_INGESTION_CHUNK_SIZE
+        self.batch_id = batch_id or str(uuid4())
+        self.total_records = 0
+        self.result = UpsertResult()
+        self._serializers = {"account": AccountSerializer, "transaction": TransactionSerializer}
+        self._buffers = {"account": [], "transaction": []}
+
+    def ingest(self, records: Iterable[tuple[int, dict]]) -> dict:
+        """
+        Consume the given records, validating and persisting them chunk by chunk.
+
+        :param records: An iterable of ``(line_number, record)`` tuples, as produced by the NDJSON parser.
+        :return: A dictionary with the batch ID and the number of ingested records.
+        """
+        with transaction.atomic():
+            for line_number, record in records:
+                kind, data = self._unpack(line_number, record)
+                buffer = self._buffers[kind]
+                buffer.append((line_number, data))
+                if len(buffer) >= self.chunk_size:
+                    self._flush(kind)
+
+            for kind in self._buffers:
+                self._flush(kind)
+
+            record_batch(self.batch_id, self.total_records, self.result)
+
+        if self.result.inserted or self.result.updated:
+            categorise_transactions.delay(batch_id=self.batch_id)
+
+        return {
+            "total_transactions": self.total_records,
+            "batch_id": self.batch_id,
+            **asdict(self.result),
+        }
+
+    def _unpack(self, line_number: int, record) -> tuple[str, dict]:
+        if isinstance(record, dict) and len(record) == 1:
+            ((kind, data),) = record.items()
+            if kind in self._buffers:
+                return kind, data
+
+        message = f"Line {line_number}: expected an object with a single 'account' or 'transaction' key."
+        raise serializers.ValidationError({"non_field_errors": [message]})
+
+    def _flush(self, kind: str) -> None:
+        buffer = self._buffers[kind]
+        if not buffer:
+            return
+
+        line_numbers = [line_number for line_number, _ in buffer]
+        try:
+            validated_data = validate_rows(self._serializers[kind], [data for _, data in buffer])
+        except serializers.ValidationError as exc:
+            raise serializers.ValidationError(
+                {f"{kind}s": {line_number: errors for line_number, errors in zip(line_numbers, exc.detail) if errors}}
+            )
+
+        if kind == "account":
+            upsert_accounts(validated_data)
+        else:
+            self.result += upsert_transactions(validated_data, batch_id=self.batch_id)
+
+        self.total_records += len(buffer)
+        buffer.clear()
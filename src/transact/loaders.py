@@ -0,0 +1,357 @@
+import csv
+import io
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from itertools import batched
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Transaction
+from .partitions import KEY_TABLE, claim_transaction_ids, is_partitioned
+
+# Columns compared to decide whether a redelivered transaction has changed
+TRANSACTION_UPSERT_FIELDS = ("account_id", "amount", "currency", "date", "merchant_name", "description")
+# Fields written when a redelivered transaction has changed
+TRANSACTION_UPDATE_FIELDS = ["account", "amount", "currency", "date", "merchant_name", "description", "updated_at"]
+# Fields reset to those of a new transaction when the description of a redelivered one changed, so that it is
+# categorised again under the batch redelivering it
+TRANSACTION_RECATEGORISE_FIELDS = [
+    "batch_id",
+    "category",
+    "ingestion_status",
+    "lease_token",
+    "attempts",
+    "next_retry_at",
+]
+
+
+@dataclass
+class UpsertResult:
+    """Row counts of a transaction upsert."""
+
+    inserted: int = 0
+    updated: int = 0
+    duplicates: int = 0
+
+    def __add__(self, other: "UpsertResult") -> "UpsertResult":
+        return UpsertResult(
+            inserted=self.inserted + other.inserted,
+            updated=self.updated + other.updated,
+            duplicates=self.duplicates + other.duplicates,
+        )
+
+
+class TransactionLoader(ABC):
+    """
+    A strategy for idempotently upserting validated transactions by their transaction ID.
+
+    New transactions are inserted under the given batch, existing ones whose content changed are updated in place
+    and unchanged ones are counted as duplicates. Updated transactions keep their batch and category, unless their
+    description changed: they then move to the given batch as pending, uncategorised transactions, so that the
+    categorisation of that batch categorises them again.
+    When a transaction ID is repeated within the same payload, its last occurrence wins.
+    """
+
+    @abstractmethod
+    def load(self, transactions_data: list[dict], batch_id: str) -> UpsertResult:
+        """
+        Upsert the given transactions.
+
+        :param transactions_data: Validated transaction rows.
+        :param batch_id: The batch ID to stamp onto newly inserted transactions.
+        :return: The number of inserted, updated and duplicate rows.
+        """
+
+
+class BulkCreateLoader(TransactionLoader):
+    """
+    Upserts transactions through the ORM, in chunks of ``TRANSACT_INGESTION_CHUNK_SIZE`` rows.
+
+    Each chunk takes a constant number of queries: one lookup of the existing rows, one insert and two upserts, of
+    the transactions whose description changed and of the other changed ones.
+    """
+
+    def load(self, transactions_data: list[dict], batch_id: str) -> UpsertResult:
+        result = UpsertResult()
+        for chunk in batched(transactions_data, settings.TRANSACT_INGESTION_CHUNK_SIZE):
+            result += self._load_chunk(chunk, batch_id)
+        return result
+
+    def _load_chunk(self, transactions_data: tuple[dict, ...], batch_id: str) -> UpsertResult:
+        incoming = {row["transaction_id"]: row for row in transactions_data}
+        existing = self._existing(incoming)
+        claimed = None
+        if partitioned := is_partitioned(connection.alias):
+            # Unique transaction IDs are not enforced by a partitioned table itself. IDs a concurrent load inserted
+            # since the lookup, e.g. under another date, are found taken and their transactions updated instead.
+            claimed = claim_transaction_ids(incoming.keys() - existing.keys(), connection.alias)
+            if raced := incoming.keys() - existing.keys() - claimed:
+                existing |= self._existing(raced)
+
+        to_insert, to_update, to_recategorise = [], [], []
+        for transaction_id, row in incoming.items():
+            current = existing.get(transaction_id)
+            if current is None:
+                # IDs claimed but missing from the table belong to archived transactions, counted as duplicates
+                if claimed is None or transaction_id in claimed:
+                    to_insert.append(Transaction(**row, batch_id=batch_id))
+            elif current["description"] != row["description"]:
+                to_recategorise.append(Transaction(**row, batch_id=batch_id))
+            elif any(current[field] != row.get(field) for field in TRANSACTION_UPSERT_FIELDS):
+                to_update.append(Transaction(**row, batch_id=batch_id))
+
+        if to_insert:
+            # Conflicts can only come from a concurrent delivery of the same rows, which already inserted them
+            Transaction.objects.bulk_create(to_insert, ignore_conflicts=True)
+        self._update(to_update, TRANSACTION_UPDATE_FIELDS, partitioned)
+        self._update(to_recategorise, TRANSACTION_UPDATE_FIELDS + TRANSACTION_RECATEGORISE_FIELDS, partitioned)
+
+        updated = len(to_update) + len(to_recategorise)
+        return UpsertResult(
+            inserted=len(to_insert), updated=updated, duplicates=len(transactions_data) - len(to_insert) - updated
+        )
+
+    def _update(self, instances: list[Transaction], fields: list[str], partitioned: bool) -> None:
+        if not instances:
+            return
+        if partitioned:
+            # Partitioned tables have no unique constraint on the transaction ID alone to upsert on. Updates move the
+            # transactions whose date changed to their new partition.
+            now = timezone.now()
+            for instance in instances:
+                instance.updated_at = now
+            Transaction.objects.bulk_update(instances, fields)
+        else:
+            Transaction.objects.bulk_create(
+                instances, update_conflicts=True, unique_fields=["transaction_id"], update_fields=fields
+            )
+
+    def _existing(self, transaction_ids: Iterable[str]) -> dict[str, dict]:
+        return {
+            row.pop("transaction_id"): row
+            for row in Transaction.objects.filter(transaction_id__in=transaction_ids).values(
+                "transaction_id", *TRANSACTION_UPSERT_FIELDS
+            )
+        }
+
+
+class CopyLoader(TransactionLoader):
+    """
+    Upserts transactions on PostgreSQL by streaming them through ``COPY ... FROM STDIN``.
+
+    Rows are copied into a temporary staging table, then merged into the transactions table with a single
+    ``INSERT ... ON CONFLICT DO UPDATE`` which only touches rows whose content changed. This avoids building huge
+    multi-row INSERT statements and their parameter lists, which dominate the cost of large batches. A partitioned
+    table is merged into with an INSERT of the transactions whose IDs it lacks, then an UPDATE of the changed ones.
+    """
+
+    STAGING_TABLE = "transact_transaction_staging"
+    # Rows are CSV-encoded and handed to COPY this many at a time
+    COPY_CHUNK_SIZE = 1000
+
+    def load(self, transactions_data: list[dict], batch_id: str) -> UpsertResult:
+        if not transactions_data:
+            return UpsertResult()
+
+        staged_columns = ["transaction_id", *TRANSACTION_UPSERT_FIELDS]
+        with transaction.atomic(), connection.cursor() as cursor:
+            self._create_staging_table(cursor, staged_columns)
+            self._copy(cursor, staged_columns, transactions_data)
+            inserted, updated = self._merge(cursor, staged_columns, batch_id)
+
+        return UpsertResult(inserted=inserted, updated=updated, duplicates=len(transactions_data) - inserted - updated)
+
+    def _create_staging_table(self, cursor, staged_columns: list[str]) -> None:
+        quote_name = connection.ops.quote_name
+        columns = ", ".join(quote_name(column) for column in staged_columns)
+        # The staging table lives until the end of the surrounding transaction, and is reused by later loads within it
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE IF NOT EXISTS {quote_name(self.STAGING_TABLE)} ON COMMIT DROP AS "
+            f"SELECT {columns}, 0::bigint AS ordinal FROM {quote_name(Transaction._meta.db_table)} WITH NO DATA"
+        )
+        cursor.execute(f"TRUNCATE {quote_name(self.STAGING_TABLE)}")
+
+    def _copy(self, cursor, staged_columns: list[str], transactions_data: list[dict]) -> None:
+        quote_name = connection.ops.quote_name
+        columns = ", ".join(quote_name(column) for column in [*staged_columns, "ordinal"])
+        sql = f"COPY {quote_name(self.STAGING_TABLE)} ({columns}) FROM STDIN WITH (FORMAT csv)"
+        chunks = self._encode(staged_columns, transactions_data)
+
+        raw_cursor = cursor.cursor
+        if hasattr(raw_cursor, "copy_expert"):
+            # psycopg2
+            raw_cursor.copy_expert(sql, _IterableStream(chunks))
+        else:
+            # psycopg 3
+            with raw_cursor.copy(sql) as copy:
+                for chunk in chunks:
+                    copy.write(chunk)
+
+    def _encode(self, staged_columns: list[str], transactions_data: list[dict]) -> Iterator[bytes]:
+        """Yield the rows as CSV, in chunks, with NULLs left unquoted so that COPY tells them apart from blanks."""
+        for start, chunk in enumerate(batched(transactions_data, self.COPY_CHUNK_SIZE)):
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, quoting=csv.QUOTE_NOTNULL)
+            offset = start * self.COPY_CHUNK_SIZE
+            for ordinal, row in enumerate(chunk, start=offset):
+                writer.writerow([*(_copy_value(row.get(column)) for column in staged_columns), ordinal])
+            yield buffer.getvalue().encode()
+
+    def _merge(self, cursor, staged_columns: list[str], batch_id: str) -> tuple[int, int]:
+        """Merge the staged rows into the transactions table, returning the inserted and updated row counts."""
+        quote_name = connection.ops.quote_name
+        template = Transaction(batch_id=batch_id)
+
+        # Columns which are not staged take the values a freshly created model instance would save
+        constant_fields = [
+            field for field in Transaction._meta.concrete_fields if field.column not in staged_columns
+        ]
+        constant_params = [
+            field.get_db_prep_save(field.pre_save(template, add=True), connection) for field in constant_fields
+        ]
+
+        insert_columns = ", ".join(quote_name(c) for c in [*staged_columns, *(f.column for f in constant_fields)])
+        select_columns = ", ".join(
+            [*(f"source.{quote_name(c)}" for c in staged_columns), *(["%s"] * len(constant_fields))]
+        )
+        compared = [quote_name(c) for c in staged_columns[1:]]
+        source = f"""
+            SELECT DISTINCT ON (transaction_id) * FROM {quote_name(self.STAGING_TABLE)}
+            ORDER BY transaction_id, ordinal DESC
+        """
+
+        if is_partitioned(connection.alias):
+            constants = {field.name: param for field, param in zip(constant_fields, constant_params)}
+            return self._merge_partitioned(cursor, source, compared, insert_columns, select_columns, constants)
+
+        # Transactions whose description changed are reset to the values a new transaction of this batch takes
+        recategorise = [
+            quote_name(Transaction._meta.get_field(name).column) for name in TRANSACTION_RECATEGORISE_FIELDS
+        ]
+        assignments = ", ".join(
+            [
+                *(f"{c} = EXCLUDED.{c}" for c in [*compared, quote_name("updated_at")]),
+                *(
+                    f"{c} = CASE WHEN target.description IS DISTINCT FROM EXCLUDED.description "
+                    f"THEN EXCLUDED.{c} ELSE target.{c} END"
+                    for c in recategorise
+                ),
+            ]
+        )
+        cursor.execute(
+            f"""
+            WITH source AS ({source}), merged AS (
+                INSERT INTO {quote_name(Transaction._meta.db_table)} AS target ({insert_columns})
+                SELECT {select_columns} FROM source
+                ON CONFLICT (transaction_id) DO UPDATE SET {assignments}
+                WHERE ({", ".join(f"target.{c}" for c in compared)})
+                    IS DISTINCT FROM ({", ".join(f"EXCLUDED.{c}" for c in compared)})
+                RETURNING (xmax = 0) AS inserted
+            )
+            SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted) FROM merged
+            """,
+            constant_params,
+        )
+        return cursor.fetchone()
+
+    def _merge_partitioned(
+        self, cursor, source: str, compared: list[str], insert_columns: str, select_columns: str, constants: dict
+    ) -> tuple[int, int]:
+        """
+        Merge the staged rows into a partitioned transactions table, which has no unique constraint on the transaction
+        ID alone to upsert on.
+
+        New transactions are inserted once their IDs are claimed in the key table, then changed ones updated, moving
+        to their new partition if their date changed. The update is a statement of its own, so that it sees the
+        transactions of IDs a concurrent load claimed first, once that load committed.
+        """
+        quote_name = connection.ops.quote_name
+        table = quote_name(Transaction._meta.db_table)
+        cursor.execute(
+            f"""
+            WITH source AS ({source}), claimed AS (
+                INSERT INTO {quote_name(KEY_TABLE)} (transaction_id)
+                SELECT transaction_id FROM source ORDER BY transaction_id
+                ON CONFLICT DO NOTHING
+                RETURNING transaction_id
+            ), inserted AS (
+                INSERT INTO {table} ({insert_columns})
+                SELECT {select_columns} FROM source JOIN claimed USING (transaction_id)
+                RETURNING 1
+            )
+            SELECT COUNT(*) FROM inserted
+            """,
+            list(constants.values()),
+        )
+        (inserted,) = cursor.fetchone()
+
+        # Transactions whose description changed are reset to the values a new transaction of this batch takes
+        recategorise = [Transaction._meta.get_field(name) for name in TRANSACTION_RECATEGORISE_FIELDS]
+        resets = [
+            f"{quote_name(field.column)} = CASE WHEN target.description IS DISTINCT FROM source.description "
+            f"THEN %s ELSE target.{quote_name(field.column)} END"
+            for field in recategorise
+        ]
+        cursor.execute(
+            f"""
+            WITH source AS ({source}), updated AS (
+                UPDATE {table} AS target
+                SET {", ".join(f"{c} = source.{c}" for c in compared)}, {", ".join(resets)},
+                    {quote_name("updated_at")} = %s
+                FROM source
+                WHERE target.transaction_id = source.transaction_id
+                    AND ({", ".join(f"target.{c}" for c in compared)})
+                    IS DISTINCT FROM ({", ".join(f"source.{c}" for c in compared)})
+                RETURNING 1
+            )
+            SELECT COUNT(*) FROM updated
+            """,
+            [*(constants[field.name] for field in recategorise), timezone.now()],
+        )
+        (updated,) = cursor.fetchone()
+        return inserted, updated
+
+
+def get_transaction_loader(row_count: int) -> TransactionLoader:
+    """
+    Return the loader best suited to upserting the given number of transactions on the default database.
+
+    :param row_count: The number of transactions to load.
+    """
+    if connection.vendor == "postgresql" and row_count >= settings.TRANSACT_COPY_LOADER_THRESHOLD:
+        return CopyLoader()
+    return BulkCreateLoader()
+
+
+def _copy_value(value):
+    if value is None:
+        return None
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+class _IterableStream(io.RawIOBase):
+    """A read-only file object over an iterable of byte chunks, so that they can be streamed to COPY."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
@@ -0,0 +1,44 @@
+from datetime import datetime
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from transact.partitions import COMPRESSIONS, archive_partition, current_month, is_partitioned, monthly_partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Detach the monthly partitions of the transactions table older than a given month, export each one to a "
+        "compressed CSV file and drop it. Daily rollups are kept, also by rebuild_rollups, so summaries in TIME_ZONE "
+        "still cover archived months."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--before", required=True, help="Month to archive the partitions before, as YYYY-MM")
+        parser.add_argument("--output-dir", required=True, type=Path, help="Directory to write the archives to")
+        parser.add_argument("--compression", choices=COMPRESSIONS, default=COMPRESSIONS[0])
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS, help="Database alias to archive partitions of")
+
+    def handle(self, *args, **options):
+        try:
+            before = datetime.strptime(options["before"], "%Y-%m").date()
+        except ValueError:
+            raise CommandError(f"Invalid month {options['before']!r}, expected YYYY-MM.")
+        if before > current_month():
+            raise CommandError("Only partitions of past months can be archived.")
+        if not is_partitioned(options["database"]):
+            raise CommandError(
+                "The transactions table is not partitioned. Set TRANSACT_PARTITION_TRANSACTIONS on PostgreSQL and "
+                "migrate it first."
+            )
+        if not options["output_dir"].is_dir():
+            raise CommandError(f"{options['output_dir']} is not a directory.")
+
+        months = sorted(month for month in monthly_partitions(options["database"]) if month < before)
+        total = 0
+        for month in months:
+            path, count = archive_partition(month, options["output_dir"], options["compression"], options["database"])
+            self.stdout.write(f"Archived {count} transactions of {month:%Y-%m} to {path}")
+            total += count
+        self.stdout.write(self.style.SUCCESS(f"Archived {total} transactions from {len(months)} partitions."))
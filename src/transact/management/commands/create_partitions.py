@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from transact.partitions import create_partitions, is_partitioned
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the monthly partitions of the transactions table ahead of time, so that new transactions never land "
+        "in the default partition. The create_transaction_partitions task does the same every day."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months",
+            type=int,
+            default=settings.TRANSACT_PARTITION_MONTHS_AHEAD,
+            help="Number of months after the current one to create partitions for",
+        )
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS, help="Database alias to create partitions on")
+
+    def handle(self, *args, **options):
+        if not is_partitioned(options["database"]):
+            raise CommandError(
+                "The transactions table is not partitioned. Set TRANSACT_PARTITION_TRANSACTIONS on PostgreSQL and "
+                "migrate it first."
+            )
+        created = create_partitions(options["months"], options["database"])
+        for name in created:
+            self.stdout.write(f"Created {name}")
+        self.stdout.write(self.style.SUCCESS(f"Created {len(created)} partitions."))
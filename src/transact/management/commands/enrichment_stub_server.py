@@ -0,0 +1,90 @@
+import asyncio
+import json
+import random
+
+from django.core.management.base import BaseCommand
+
+from transact.rules import RuleMatcher, get_rule_matcher
+
+
+class StubEnrichmentServer:
+    """
+    A local stand-in for a remote enrichment service, answering ``POST {"description": ...}`` requests with
+    ``{"category": ...}`` after a random delay.
+
+    Categories come from the category rules as they were when the server started. A share of the requests, given by
+    ``failure_rate``, fail with a 503 so that client retries can be exercised.
+    """
+
+    def __init__(self, matcher: RuleMatcher, min_latency: float = 0.5, max_latency: float = 1, failure_rate: float = 0):
+        self.matcher = matcher
+        self.min_latency = min_latency
+        self.max_latency = max_latency
+        self.failure_rate = failure_rate
+        self.requests = 0
+
+    async def start(self, host: str, port: int) -> asyncio.Server:
+        return await asyncio.start_server(self._handle, host, port)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            await reader.readline()
+            headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+            self.requests += 1
+
+            await asyncio.sleep(random.uniform(self.min_latency, self.max_latency))
+            if random.random() < self.failure_rate:
+                status, response = "503 Service Unavailable", {"detail": "Simulated failure"}
+            else:
+                try:
+                    category = self.matcher.match(json.loads(body)["description"])
+                    status, response = "200 OK", {"category": category}
+                except (ValueError, KeyError, TypeError):
+                    status, response = "400 Bad Request", {"detail": "Expected a JSON object with a description"}
+
+            content = json.dumps(response).encode()
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(content)}\r\n"
+                "Connection: close\r\n\r\n".encode()
+                + content
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a local stub of the enrichment service, for use with the transact.enrichment.AsyncHTTPBackend backend. "
+        "Requests are answered with the category rules after a configurable random latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+        parser.add_argument("--port", type=int, default=8001, help="Port to listen on")
+        parser.add_argument("--min-latency", type=float, default=0.5, help="Minimum response latency in seconds")
+        parser.add_argument("--max-latency", type=float, default=1, help="Maximum response latency in seconds")
+        parser.add_argument("--failure-rate", type=float, default=0, help="Share of requests failing with a 503")
+
+    def handle(self, *args, **options):
+        server = StubEnrichmentServer(
+            get_rule_matcher(),
+            min_latency=options["min_latency"],
+            max_latency=options["max_latency"],
+            failure_rate=options["failure_rate"],
+        )
+        self.stdout.write(f"Stub enrichment service listening on http://{options['host']}:{options['port']}/")
+        try:
+            asyncio.run(self._serve(server, options["host"], options["port"]))
+        except KeyboardInterrupt:
+            pass
+
+    async def _serve(self, server: StubEnrichmentServer, host: str, port: int) -> None:
+        async with await server.start(host, port) as running:
+            await running.serve_forever()
@@ -0,0 +1,292 @@
+import csv
+import json
+import mmap
+import os
+import resource
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework import serializers
+
+from transact.ingestion import ingest_batch, upsert_accounts
+from transact.models import Account
+from transact.serializers import AccountSerializer, TransactionSerializer
+from transact.validation import validate_rows
+
+# Columns of a CSV file holding a transaction, named as in the ingestion payload
+TRANSACTION_COLUMNS = ("transaction_id", "account_id", "amount", "iso_currency_code", "date", "merchant_name", "name")
+# CSV columns holding the transaction's account, e.g. "account_name", besides "account_id"
+ACCOUNT_COLUMN_PREFIX = "account_"
+
+
+@dataclass
+class ParsedChunk:
+    """The validated rows of a slice of the input file."""
+
+    accounts: list[dict] = field(default_factory=list)
+    transactions: list[dict] = field(default_factory=list)
+    # Errors keyed by "accounts" or "transactions", then by line number within the chunk
+    errors: dict = field(default_factory=dict)
+    line_count: int = 0
+
+
+def split_file(data: mmap.mmap, start: int, chunk_bytes: int):
+    """
+    Yield ``(start, end)`` byte ranges of about ``chunk_bytes`` covering the data, each ending on a line boundary.
+
+    :param data: The memory-mapped input file.
+    :param start: The offset of the first line to include.
+    :param chunk_bytes: The approximate size of each range.
+    """
+    size = len(data)
+    while start < size:
+        end = start + chunk_bytes
+        if end >= size:
+            end = size
+        else:
+            newline = data.find(b"\n", max(end - 1, start))
+            end = size if newline == -1 else newline + 1
+        yield start, end
+        start = end
+
+
+def parse_chunk(
+    path: str,
+    file_format: str,
+    fieldnames: list[str] | None,
+    start: int,
+    end: int,
+    kinds: tuple[str, ...] = ("accounts", "transactions"),
+) -> ParsedChunk:
+    """
+    Parse and validate the lines of the given byte range of the input file.
+
+    This runs in the worker processes, so it only reads the file and never touches the database.
+
+    :param path: The path of the input file.
+    :param file_format: Either "csv" or "ndjson".
+    :param fieldnames: The CSV header, for CSV files.
+    :param start: The offset of the first byte of the range.
+    :param end: The offset past the last byte of the range.
+    :param kinds: The kinds of rows to validate and return, "accounts" and/or "transactions".
+    :return: The validated rows, or the errors found in them.
+    """
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        lines = data[start:end].split(b"\n")
+    if lines[-1] == b"":
+        lines.pop()
+
+    chunk = ParsedChunk(line_count=len(lines))
+    records = _csv_records(lines, fieldnames) if file_format == "csv" else _ndjson_records(lines, kinds)
+    buffers = {"accounts": {}, "transactions": []}
+    for line_number, kind, record in records:
+        if kind not in ("errors", *kinds):
+            continue
+        if kind == "errors":
+            chunk.errors.setdefault("non_field_errors", {})[line_number] = record
+        elif kind == "accounts":
+            # Every row of a CSV file repeats its account, so identical accounts are only validated once
+            buffers["accounts"][tuple(record.items())] = (line_number, record)
+        else:
+            buffers["transactions"].append((line_number, record))
+
+    for name, serializer_class in (("accounts", AccountSerializer), ("transactions", TransactionSerializer)):
+        buffer = buffers[name]
+        buffer = list(buffer.values()) if isinstance(buffer, dict) else buffer
+        try:
+            setattr(chunk, name, validate_rows(serializer_class, [record for _, record in buffer]))
+        except serializers.ValidationError as exc:
+            chunk.errors[name] = {line: errors for (line, _), errors in zip(buffer, exc.detail) if errors}
+
+    if chunk.errors:
+        chunk.accounts, chunk.transactions = [], []
+    return chunk
+
+
+def _csv_records(lines: list[bytes], fieldnames: list[str]):
+    account_columns = [name for name in fieldnames if name.startswith(ACCOUNT_COLUMN_PREFIX) and name != "account_id"]
+    reader = csv.reader(line.decode() for line in lines)
+    for line_number, values in enumerate(reader, start=1):
+        if not values:
+            continue
+        if len(values) != len(fieldnames):
+            yield line_number, "errors", [f"Expected {len(fieldnames)} columns, got {len(values)}."]
+            continue
+
+        # Blank cells stand for missing values
+        row = {name: value if value != "" else None for name, value in zip(fieldnames, values)}
+        if account_columns:
+            account = {name.removeprefix(ACCOUNT_COLUMN_PREFIX): row[name] for name in account_columns}
+            yield line_number, "accounts", {"account_id": row.get("account_id"), **account}
+        yield line_number, "transactions", {name: row[name] for name in TRANSACTION_COLUMNS if name in row}
+
+
+def _ndjson_records(lines: list[bytes], kinds: tuple[str, ...]):
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        # Transactions hold an "account_id" but no "account" key, so they are skipped without decoding them
+        if "transactions" not in kinds and b'"account"' not in line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, "errors", [f"Invalid JSON: {e}"]
+            continue
+
+        if isinstance(record, dict) and len(record) == 1 and next(iter(record)) in ("account", "transaction"):
+            ((kind, data),) = record.items()
+            yield line_number, f"{kind}s", data
+        else:
+            yield line_number, "errors", ["Expected an object with a single 'account' or 'transaction' key."]
+
+
+def peak_memory_mb(who: int) -> float:
+    """Return the peak resident set size of this process, or of its finished children, in MiB."""
+    max_rss = resource.getrusage(who).ru_maxrss
+    # Reported in bytes on macOS and in KiB elsewhere
+    return max_rss / 1024**2 if sys.platform == "darwin" else max_rss / 1024
+
+
+class Command(BaseCommand):
+    help = (
+        "Import accounts and transactions from a large CSV or NDJSON file, bypassing the HTTP endpoint. "
+        "The file is split into chunks which are parsed and validated by a pool of worker processes, then upserted "
+        "one chunk at a time, each as its own batch with its own categorisation task. NDJSON files hold one "
+        '{"account": {...}} or {"transaction": {...}} object per line; CSV files have a header row with the '
+        "transaction fields of the ingestion payload, plus optional account_name, account_type, account_subtype and "
+        "account_mask columns, and may not hold line breaks within values. Accounts of NDJSON files are all upserted "
+        "first, wherever they appear in the file. "
+        "Importing stops at the first invalid chunk, or at the first transactions of accounts found neither in the "
+        "file nor in the database; chunks already imported are kept, and re-running is safe."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or NDJSON file to import")
+        parser.add_argument(
+            "--format", choices=["csv", "ndjson"], help="Format of the file, guessed from its extension by default"
+        )
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count(), help="Number of parsing processes, 1 to parse inline"
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=float,
+            default=8,
+            help="Approximate size in MiB of the chunks parsed and loaded at once",
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.is_file():
+            raise CommandError(f"{path} does not exist.")
+        file_format = options["format"] or ("csv" if path.suffix.lower() == ".csv" else "ndjson")
+        if path.stat().st_size == 0:
+            self.stdout.write("Nothing to import.")
+            return
+
+        started = time.perf_counter()
+        totals = {"transactions": 0, "inserted": 0, "updated": 0, "duplicates": 0, "batches": 0}
+
+        with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start, fieldnames, line_offset = 0, None, 0
+            if file_format == "csv":
+                start = data.find(b"\n") + 1 or len(data)
+                fieldnames = next(csv.reader([data[:start].decode("utf-8-sig")]), [])
+                line_offset = 1
+                missing = set(TRANSACTION_COLUMNS) - set(fieldnames)
+                if missing:
+                    raise CommandError(f"The CSV header lacks the columns {', '.join(sorted(missing))}.")
+
+            ranges = list(split_file(data, start, int(options["chunk_size"] * 1024**2)))
+            account_ids = set()
+            if file_format == "ndjson":
+                # Accounts may come after their transactions, in a later chunk
+                account_ids = self._upsert_accounts(str(path), ranges, options["workers"])
+
+            kinds = ("transactions",) if file_format == "ndjson" else ("accounts", "transactions")
+            for chunk in self._parse(str(path), file_format, fieldnames, ranges, options["workers"], kinds):
+                if chunk.errors:
+                    raise CommandError(self._format_errors(chunk.errors, line_offset))
+                self._check_accounts(chunk, account_ids, line_offset)
+                if file_format == "csv":
+                    account_ids.update(account["account_id"] for account in chunk.accounts)
+
+                result = ingest_batch(chunk.accounts, chunk.transactions)
+                totals["transactions"] += len(chunk.transactions)
+                for key in ("inserted", "updated", "duplicates"):
+                    totals[key] += result[key]
+                totals["batches"] += 1
+                line_offset += chunk.line_count
+                self.stdout.write(
+                    f"Loaded batch {result['batch_id']} up to line {line_offset}: {result['inserted']} inserted, "
+                    f"{result['updated']} updated, {result['duplicates']} duplicates."
+                )
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {totals['transactions']} transactions of {len(account_ids)} accounts in {totals['batches']} "
+                f"batches in {elapsed:.1f}s ({totals['transactions'] / elapsed:,.0f} transactions/sec): "
+                f"{totals['inserted']} inserted, {totals['updated']} updated, {totals['duplicates']} duplicates."
+            )
+        )
+        self.stdout.write(
+            f"Peak memory: {peak_memory_mb(resource.RUSAGE_SELF):.0f} MiB (main process), "
+            f"{peak_memory_mb(resource.RUSAGE_CHILDREN):.0f} MiB (largest worker)."
+        )
+
+    def _upsert_accounts(self, path: str, ranges, workers: int) -> set[str]:
+        """Upsert the accounts of an NDJSON file, one chunk at a time, returning their IDs."""
+        account_ids, line_offset = set(), 0
+        for chunk in self._parse(path, "ndjson", None, ranges, workers, ("accounts",)):
+            if chunk.errors:
+                raise CommandError(self._format_errors(chunk.errors, line_offset))
+            with transaction.atomic():
+                upsert_accounts(chunk.accounts)
+            account_ids.update(account["account_id"] for account in chunk.accounts)
+            line_offset += chunk.line_count
+        self.stdout.write(f"Upserted {len(account_ids)} accounts.")
+        return account_ids
+
+    def _check_accounts(self, chunk: ParsedChunk, account_ids: set[str], line_offset: int) -> None:
+        """Stop the import before loading transactions of accounts found neither in the file nor in the database."""
+        unknown = {row["account_id"] for row in chunk.transactions} - account_ids
+        unknown -= {account["account_id"] for account in chunk.accounts}
+        unknown -= set(Account.objects.filter(account_id__in=unknown).values_list("account_id", flat=True))
+        if unknown:
+            raise CommandError(
+                f"Transactions up to line {line_offset + chunk.line_count} belong to unknown accounts, stopping the "
+                f"import: {', '.join(sorted(unknown)[:20])}"
+            )
+
+    def _parse(self, path: str, file_format: str, fieldnames, ranges, workers: int, kinds: tuple[str, ...]):
+        """Yield the parsed chunks of the given ranges in order, keeping at most two chunks per worker in flight."""
+        if workers <= 1:
+            for start, end in ranges:
+                yield parse_chunk(path, file_format, fieldnames, start, end, kinds)
+            return
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as executor:
+            pending = deque()
+            for start, end in ranges:
+                pending.append(executor.submit(parse_chunk, path, file_format, fieldnames, start, end, kinds))
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def _format_errors(self, errors: dict, line_offset: int) -> str:
+        messages = [
+            f"Line {line_offset + line} ({kind}): {json.dumps(detail)}"
+            for kind, lines in errors.items()
+            for line, detail in sorted(lines.items())
+        ]
+        return "Invalid rows, stopping the import:\n" + "\n".join(messages[:20])
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from transact.models import DailyAccountRollup
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the daily account rollups which account summaries are answered from, from the transactions. "
+        "Run it after changing TIME_ZONE, or after changing transactions outside of the ORM. Rollups of days before "
+        "the oldest partition of a partitioned transactions table are kept, as their transactions may be archived."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--account", dest="accounts", action="append", help="ID of an account to rebuild, all by default"
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        DailyAccountRollup.objects.rebuild(options["accounts"])
+        rollups = DailyAccountRollup.objects.all()
+        if options["accounts"]:
+            rollups = rollups.filter(account_id__in=options["accounts"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {rollups.count()} rollups in {time.perf_counter() - started:.1f}s.")
+        )
@@ -1,3 +1,4 @@
+import gzip
 import json
 import random
 from datetime import datetime, timedelta
@@ -105,8 +106,21 @@ class Command(BaseCommand):
         parser.add_argument("--server", default="http://localhost:8000", help="Base server URL")
         parser.add_argument("--count", type=int, default=10, help="Number of transactions to generate in the batch")
         parser.add_argument("--token", required=True, help="DRF Token to use for Authorization header")
+        parser.add_argument(
+            "--compress", choices=["none", "gzip", "zstd"], default="none", help="Content-Encoding of the request body"
+        )
 
-    def _post_json(self, url, data: str, headers=None):
+    def _compress(self, data: bytes, encoding: str) -> bytes:
+        """Compress the request body with the given Content-Encoding."""
+        if encoding == "gzip":
+            return gzip.compress(data)
+        if encoding == "zstd":
+            import zstandard
+
+            return zstandard.ZstdCompressor().compress(data)
+        return data
+
+    def _post_json(self, url, data: bytes, headers=None):
         resp = requests.post(url, data=data, headers=headers or {}, timeout=10)
         resp.raise_for_status()
         return resp.json()
@@ -131,8 +145,14 @@ class Command(BaseCommand):
         self.stdout.write(formatted_payload)
         self.stdout.write(f"Posting batch to {ingestion_url}...")
 
+        body = formatted_payload.encode()
+        if options["compress"] != "none":
+            body = self._compress(body, options["compress"])
+            headers["Content-Encoding"] = options["compress"]
+            self.stdout.write(f"Compressed payload from {len(formatted_payload.encode())} to {len(body)} bytes.")
+
         try:
-            resp = self._post_json(ingestion_url, formatted_payload, headers=headers)
+            resp = self._post_json(ingestion_url, body, headers=headers)
         except Exception as e:
             self.stderr.write(f"Failed to post batch: {e}")
             return
@@ -0,0 +1,76 @@
+import os
+import time
+import zlib
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from transact.classifier import NaiveBayesClassifier
+from transact.models import Transaction
+
+
+class Command(BaseCommand):
+    help = (
+        "Train the classifier categorising the descriptions no category rule matches, from the categorised "
+        "transactions, and save it where workers pick it up."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", help="Path to save the model to, TRANSACT_CLASSIFIER_PATH by default")
+        parser.add_argument("--features", type=int, default=18, help="Log2 of the number of hashed n-gram features")
+        parser.add_argument("--alpha", type=float, default=0.1, help="Additive smoothing of the n-gram counts")
+        parser.add_argument(
+            "--validation-split",
+            type=float,
+            default=0.1,
+            help="Share of the transactions held out to measure the model on",
+        )
+
+    def handle(self, *args, **options):
+        output = options["output"] or settings.TRANSACT_CLASSIFIER_PATH
+        if not output:
+            raise CommandError("No output path given, and TRANSACT_CLASSIFIER_PATH is not set.")
+        started = time.perf_counter()
+
+        counts = Counter()
+        validation = []
+
+        def training_samples():
+            samples = Transaction.objects.filter(
+                ingestion_status=Transaction.IngestionStatus.COMPLETED, category__isnull=False
+            ).values_list("transaction_id", "description", "category")
+            for transaction_id, description, category in samples.iterator(chunk_size=10000):
+                # Hold out a stable share of the transactions, whatever their order
+                if zlib.crc32(transaction_id.encode()) % 1000 < options["validation_split"] * 1000:
+                    validation.append((description, category))
+                else:
+                    counts[category] += 1
+                    yield description, category
+
+        try:
+            classifier = NaiveBayesClassifier.fit(
+                training_samples(), n_features=2 ** options["features"], alpha=options["alpha"]
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        # Replace the model atomically, so that workers never load a partly written file
+        temporary = f"{output}.tmp"
+        classifier.save(temporary)
+        os.replace(temporary, output)
+
+        self.stdout.write(
+            f"Trained on {counts.total()} transactions in {time.perf_counter() - started:.1f}s: "
+            + ", ".join(f"{category} {count}" for category, count in sorted(counts.items()))
+        )
+        if validation:
+            descriptions, expected = zip(*validation)
+            predicted, confidence = classifier.predict(list(descriptions))
+            confident = confidence >= settings.TRANSACT_CLASSIFIER_THRESHOLD
+            correct = sum(1 for p, e, c in zip(predicted, expected, confident) if c and p == e)
+            self.stdout.write(
+                f"Validation on {len(validation)} transactions: {confident.mean():.1%} categorised at a threshold of "
+                f"{settings.TRANSACT_CLASSIFIER_THRESHOLD}, {correct / max(confident.sum(), 1):.1%} of them correctly."
+            )
+        self.stdout.write(self.style.SUCCESS(f"Saved the classifier to {output}."))
@@ -0,0 +1,46 @@
+"""
+Process-local counters for instrumenting the transact app.
+
+Counters live in the memory of the process that increments them (a web or Celery worker), much like an in-process
+Prometheus registry. Counters named ``<prefix>.hits`` and ``<prefix>.misses`` get a derived ``<prefix>.hit_rate``.
+"""
+
+import threading
+from collections import Counter
+
+_counters: Counter = Counter()
+_lock = threading.Lock()
+
+
+def incr(name: str, amount: int = 1) -> None:
+    """
+    Increment the given counter.
+
+    :param name: The dotted counter name, e.g. ``known_accounts.hits``.
+    :param amount: The amount to increment the counter by.
+    """
+    with _lock:
+        _counters[name] += amount
+
+
+def snapshot() -> dict:
+    """
+    Return the current value of every counter, along with the derived hit rates.
+
+    :return: A dictionary of counter values keyed by name.
+    """
+    with _lock:
+        values = dict(_counters)
+
+    for name in list(values):
+        if name.endswith(".hits"):
+            prefix = name.removesuffix(".hits")
+            lookups = values[name] + values.get(f"{prefix}.misses", 0)
+            values[f"{prefix}.hit_rate"] = values[name] / lookups if lookups else 0.0
+    return dict(sorted(values.items()))
+
+
+def reset() -> None:
+    """Reset every counter."""
+    with _lock:
+        _counters.clear()
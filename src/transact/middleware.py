@@ -0,0 +1,87 @@
+import gzip
+import io
+import zlib
+
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from django.http import JsonResponse
+from rest_framework.exceptions import ParseError
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstd support is optional
+    zstandard = None
+
+
+def _gzip_reader(stream):
+    return gzip.GzipFile(fileobj=stream, mode="rb")
+
+
+def _zstd_reader(stream):
+    return zstandard.ZstdDecompressor().stream_reader(stream, read_across_frames=True)
+
+
+# Readers decompressing a request stream, by Content-Encoding
+DECODERS = {"gzip": _gzip_reader, "x-gzip": _gzip_reader}
+if zstandard is not None:
+    DECODERS["zstd"] = _zstd_reader
+
+
+class DecompressedStream(io.RawIOBase):
+    """
+    A read-only stream decompressing a request body on the fly, bounded to a maximum decompressed size.
+
+    Malformed bodies raise a ``ParseError`` and bodies inflating past the bound a ``RequestDataTooBig``,
+    so that neither reaches the views as a server error.
+    """
+
+    def __init__(self, reader, max_size: int):
+        self._reader = reader
+        self._max_size = max_size
+        self._read_size = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        try:
+            data = self._reader.read(len(buffer))
+        except (OSError, EOFError, zlib.error) as e:
+            raise ParseError(f"Malformed compressed request body: {e}")
+        except Exception as e:
+            if zstandard is not None and isinstance(e, zstandard.ZstdError):
+                raise ParseError(f"Malformed compressed request body: {e}")
+            raise
+
+        self._read_size += len(data)
+        if self._read_size > self._max_size:
+            raise RequestDataTooBig("Decompressed request body exceeded TRANSACT_MAX_DECOMPRESSED_BODY_SIZE.")
+
+        buffer[: len(data)] = data
+        return len(data)
+
+
+class RequestDecompressionMiddleware:
+    """
+    Transparently decompresses request bodies sent with a gzip or zstd ``Content-Encoding``.
+
+    The body is decompressed as a stream while the view reads it, so it is never held in memory in full unless the
+    view itself does so. Unsupported encodings are rejected with a 415 response.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        encoding = request.META.get("HTTP_CONTENT_ENCODING", "").strip().lower()
+        if encoding and encoding != "identity":
+            decoder = DECODERS.get(encoding)
+            if decoder is None:
+                return JsonResponse({"detail": f'Unsupported Content-Encoding "{encoding}".'}, status=415)
+
+            raw = DecompressedStream(decoder(request._stream), settings.TRANSACT_MAX_DECOMPRESSED_BODY_SIZE)
+            request._stream = io.BufferedReader(raw)
+            # The body now reaches the views decoded
+            del request.META["HTTP_CONTENT_ENCODING"]
+
+        return self.get_response(request)
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.9 on 2026-10-16 22:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transact', '0004_alter_transaction_managers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestionBatch',
+            fields=[
+                ('batch_id', models.UUIDField(primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('staged', 'Staged'), ('inserting', 'Inserting'), ('inserted', 'Inserted'), ('failed', 'Failed')], default='staged', max_length=20)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('payload', models.BinaryField(null=True)),
+                ('total_transactions', models.PositiveIntegerField(default=0)),
+                ('inserted', models.PositiveIntegerField(default=0)),
+                ('updated', models.PositiveIntegerField(default=0)),
+                ('duplicates', models.PositiveIntegerField(default=0)),
+                ('errors', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-16 22:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transact', '0005_ingestionbatch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestionbatch',
+            name='categorised_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
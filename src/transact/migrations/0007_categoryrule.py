@@ -0,0 +1,28 @@
+# Generated by Django 5.2.9 on 2026-10-16 22:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transact', '0006_ingestionbatch_categorised_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pattern', models.CharField(max_length=255)),
+                ('category', models.CharField(choices=[('Income', 'Income'), ('Shopping', 'Shopping'), ('Software', 'Software'), ('Transport', 'Transport')], max_length=100)),
+                ('priority', models.PositiveIntegerField(default=100)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['priority', 'id'],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+# The rules previously hard-coded in determine_transaction_category, in the order they were checked
+RULES = [
+    ("amazon", "Shopping", 10),
+    ("stripe", "Income", 20),
+    ("paypal", "Income", 20),
+    ("uber", "Transport", 30),
+    ("lyft", "Transport", 30),
+    ("aws", "Software", 40),
+    ("azure", "Software", 40),
+]
+
+
+def seed_rules(apps, schema_editor):
+    CategoryRule = apps.get_model("transact", "CategoryRule")
+    CategoryRule.objects.bulk_create(
+        [CategoryRule(pattern=pattern, category=category, priority=priority) for pattern, category, priority in RULES]
+    )
+
+
+def remove_rules(apps, schema_editor):
+    CategoryRule = apps.get_model("transact", "CategoryRule")
+    for pattern, category, priority in RULES:
+        CategoryRule.objects.filter(pattern=pattern, category=category, priority=priority).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transact", "0007_categoryrule"),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_rules, remove_rules),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.9 on 2026-10-16 22:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transact', '0008_seed_category_rules'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='lease_token',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['ingestion_status', 'updated_at'], name='transaction_status_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['lease_token'], name='transaction_lease_token'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.9 on 2026-10-16 22:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transact', '0010_transaction_retries'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['account', 'date', 'ingestion_status', 'category', 'amount'], name='transaction_account_date'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['batch_id', 'ingestion_status', 'transaction_id'], name='transaction_batch_status'),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='account',
+            field=models.ForeignKey(db_column='account_id', db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='transact.account'),
+        ),
+    ]
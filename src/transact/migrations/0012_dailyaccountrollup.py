@@ -0,0 +1,31 @@
+# Generated by Django 5.2.9 on 2026-10-16 23:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transact', '0011_transaction_summary_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyAccountRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('category', models.CharField(blank=True, max_length=100)),
+                ('ingestion_status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('debits', models.IntegerField(default=0)),
+                ('spend', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('income', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('account', models.ForeignKey(db_column='account_id', db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='transact.account')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('account', 'day', 'category', 'ingestion_status'), name='daily_account_rollup_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+from decimal import Decimal
+from itertools import batched
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+
+
+def populate_rollups(apps, schema_editor):
+    Transaction = apps.get_model("transact", "Transaction")
+    DailyAccountRollup = apps.get_model("transact", "DailyAccountRollup")
+    db = schema_editor.connection.alias
+
+    rows = (
+        Transaction.objects.using(db)
+        .annotate(day=TruncDate("date", tzinfo=ZoneInfo(settings.TIME_ZONE)), bucket=Coalesce("category", Value("")))
+        .values("account_id", "day", "bucket", "ingestion_status")
+        .annotate(
+            count=Count("*"),
+            debits=Count("amount", filter=Q(amount__lt=0)),
+            spend=Coalesce(Sum("amount", filter=Q(amount__lt=0)), Decimal("0")),
+            income=Coalesce(Sum("amount", filter=Q(amount__gt=0)), Decimal("0")),
+        )
+        .order_by()
+    )
+    for chunk in batched(rows.iterator(chunk_size=2000), 2000):
+        DailyAccountRollup.objects.using(db).bulk_create(
+            [DailyAccountRollup(category=row.pop("bucket"), **row) for row in chunk]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transact", "0012_dailyaccountrollup"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
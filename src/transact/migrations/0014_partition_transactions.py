@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.db import migrations
+
+from transact.partitions import is_partitioned, partition_table, unpartition_table
+
+
+def partition_transactions(apps, schema_editor):
+    # Opt-in, as converting copies every transaction. Enabling it later takes migrating back to 0013 and forward again.
+    if schema_editor.connection.vendor == "postgresql" and settings.TRANSACT_PARTITION_TRANSACTIONS:
+        partition_table(schema_editor, apps.get_model("transact", "Transaction"))
+
+
+def unpartition_transactions(apps, schema_editor):
+    if is_partitioned(schema_editor.connection.alias):
+        unpartition_table(schema_editor, apps.get_model("transact", "Transaction"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transact", "0013_populate_daily_account_rollups"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_transactions, unpartition_transactions),
+    ]
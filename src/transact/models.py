@@ -1,10 +1,23 @@
-from datetime import date
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
 from decimal import Decimal
+from functools import partial
+from itertools import batched
+from uuid import uuid4
+from zoneinfo import ZoneInfo
 
-from django.db import models
-from django.db.models import Count, Q, Sum
+from django.conf import settings
+from django.db import connections, models, router, transaction
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Coalesce, Trunc, TruncDate
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from . import partitions
+from .enums import Category, Interval
+from .versions import bump_account_versions, bump_rules_version
+
 
 class Account(models.Model):
     account_id = models.CharField(primary_key=True, max_length=100)
@@ -16,51 +29,30 @@ class Account(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
 
-class TransactionManager(models.Manager):
-    def account_summary(self, account_id: str, start_date: date, end_date: date) -> dict:
+class TransactionQuerySet(models.QuerySet):
+    def in_period(self, start_date: date, end_date: date) -> "TransactionQuerySet":
         """
-        Return the account summary for the given account and date range.
+        Return the transactions dated within the given days, in the current timezone.
 
-        :param account_id: The account ID to summarize.
-        :param start_date: The start date for the summary (inclusive).
-        :param end_date: The end date for the summary (inclusive).
-        :return: A dictionary containing the account summary.
-        """
-        applicable_transactions = self.filter(
-            account_id=account_id,
-            date__date__gte=start_date,
-            date__date__lte=end_date,
-        )
-
-        metrics = applicable_transactions.aggregate(
-            total_transactions=Count("transaction_id"),
-            total_spend=Sum("amount", filter=Q(amount__lt=0)),
-            total_income=Sum("amount", filter=Q(amount__gt=0)),
-        )
+        The days are turned into a half-open range of timestamps, so the date column is compared as-is and indexes
+        on it can be used, rather than casting every row to a date.
 
-        total_spend = abs(metrics["total_spend"] or Decimal("0.00"))
-        total_income = metrics["total_income"] or Decimal("0.00")
-
-        top_categories_data = (
-            applicable_transactions.filter(category__isnull=False)
-            .values("category")
-            .annotate(
-                total_spend=Sum("amount", filter=Q(amount__lt=0)),
-                transaction_count=Count("transaction_id"),
-            )
-            .order_by("-total_spend")[:5]
+        :param start_date: The first day of the period.
+        :param end_date: The last day of the period, inclusive.
+        """
+        tz = timezone.get_current_timezone()
+        return self.filter(
+            date__gte=datetime.combine(start_date, time.min, tzinfo=tz),
+            date__lt=datetime.combine(end_date + timedelta(days=1), time.min, tzinfo=tz),
         )
 
-        top_categories = [
-            {
-                "category": cat["category"],
-                "total_spend": abs(cat["total_spend"] or Decimal("0.00")),
-                "transaction_count": cat["transaction_count"],
-            }
-            for cat in top_categories_data
-        ]
+    def status_counts(self) -> dict:
+        """
+        Return the number of transactions in each ingestion status.
 
-        status_breakdown = applicable_transactions.values("ingestion_status").annotate(count=Count("transaction_id"))
+        :return: A dictionary of counts keyed by ingestion status, including statuses without transactions.
+        """
+        status_breakdown = self.values("ingestion_status").annotate(count=Count("*"))
 
         processing_status = {
             "pending": 0,
@@ -74,18 +66,281 @@ class TransactionManager(models.Manager):
             if status_key in processing_status:
                 processing_status[status_key] = status_item["count"]
 
+        return processing_status
+
+    def claim_pending(self, limit: int) -> list["Transaction"]:
+        """
+        Lease up to ``limit`` pending transactions of this queryset, moving them to processing under a new lease token.
+
+        Claims are atomic, so concurrent workers never lease the same transaction. Where the database supports it,
+        candidates are locked with ``SELECT ... FOR UPDATE SKIP LOCKED`` so that workers skip each other's rows
+        rather than wait on them. Elsewhere, e.g. on SQLite, the status change is a compare-and-set on the pending
+        status, so a worker losing a race on a row simply leases fewer rows.
+
+        :param limit: The maximum number of transactions to lease.
+        :return: The leased transactions, with their ID, batch ID, description, lease token and attempts loaded.
+        """
+        lease_token = uuid4()
+        # Claims are writes, so they always go to the primary database
+        db = self._db or router.db_for_write(self.model)
+        pending = self.using(db).filter(ingestion_status=self.model.IngestionStatus.PENDING)
+        with transaction.atomic(using=db):
+            candidates = pending.order_by("updated_at", "transaction_id")
+            if connections[db].features.has_select_for_update_skip_locked:
+                candidates = candidates.select_for_update(skip_locked=True)
+            transaction_ids = list(candidates.values_list("transaction_id", flat=True)[:limit])
+            if not transaction_ids:
+                return []
+
+            candidates = self.model._default_manager.using(db).filter(transaction_id__in=transaction_ids)
+            with DailyAccountRollup.objects.tracking(candidates):
+                candidates.filter(ingestion_status=self.model.IngestionStatus.PENDING).update(
+                    ingestion_status=self.model.IngestionStatus.PROCESSING,
+                    lease_token=lease_token,
+                    updated_at=timezone.now(),
+                )
+
+        leased = self.model._default_manager.using(db).filter(lease_token=lease_token)
+        leased = leased.only("transaction_id", "batch_id", "description", "lease_token", "attempts")
+        return list(leased.order_by("transaction_id"))
+
+
+class TransactionManager(models.Manager.from_queryset(TransactionQuerySet)):
+    def account_summary(self, account_id: str, start_date: date, end_date: date) -> dict:
+        """
+        Return the account summary for the given account and date range.
+
+        :param account_id: The account ID to summarize.
+        :param start_date: The start date for the summary (inclusive).
+        :param end_date: The end date for the summary (inclusive).
+        :return: A dictionary containing the account summary.
+        """
+        return self.account_summaries([account_id], start_date, end_date)[account_id]
+
+    def account_summaries(self, account_ids: Iterable[str], start_date: date, end_date: date) -> dict[str, dict]:
+        """
+        Return the summaries of the given accounts over the same date range, all from a single grouped query.
+
+        Summaries in the default timezone are answered from the daily rollups, which cover archived transactions as
+        well. They therefore differ from :meth:`summarise_transactions`, and from summaries in any other timezone, for
+        periods reaching into archived months.
+
+        :param account_ids: The account IDs to summarize.
+        :param start_date: The start date for the summaries (inclusive).
+        :param end_date: The end date for the summaries (inclusive).
+        :return: The account summaries keyed by account ID, including accounts without transactions.
+        """
+        account_ids = list(dict.fromkeys(account_ids))
+        if timezone.get_current_timezone_name() == settings.TIME_ZONE:
+            # Rollups are by day of the default timezone, so they answer summaries in any other timezone wrongly
+            groups = DailyAccountRollup.objects.summary_groups(account_ids, start_date, end_date)
+        else:
+            groups = self._summary_groups(account_ids, start_date, end_date)
+        return self._summarise(account_ids, start_date, end_date, groups)
+
+    def summarise_transactions(self, account_id: str, start_date: date, end_date: date) -> dict:
+        """
+        Return the account summary for the given account and date range, aggregated from the transactions themselves
+        rather than the daily rollups. Archived transactions are therefore left out, unlike in
+        :meth:`account_summaries`.
+
+        :param account_id: The account ID to summarize.
+        :param start_date: The start date for the summary (inclusive).
+        :param end_date: The end date for the summary (inclusive).
+        :return: A dictionary containing the account summary.
+        """
+        groups = self._summary_groups([account_id], start_date, end_date)
+        return self._summarise([account_id], start_date, end_date, groups)[account_id]
+
+    def _summary_groups(self, account_ids: list[str], start_date: date, end_date: date) -> models.QuerySet:
+        # A single scan grouped by account and category, with the breakdown by status counted conditionally.
+        # Grouping by status as well would make for many more groups to sort on SQLite.
+        return (
+            self.filter(account_id__in=account_ids)
+            .in_period(start_date, end_date)
+            .values("account_id", "category")
+            .annotate(
+                count=Count("*"),
+                spend=Sum("amount", filter=Q(amount__lt=0)),
+                income=Sum("amount", filter=Q(amount__gt=0)),
+                **{
+                    status: Count("ingestion_status", filter=Q(ingestion_status=status))
+                    for status in Transaction.IngestionStatus.values
+                },
+            )
+            .order_by()
+        )
+
+    def _summarise(
+        self, account_ids: list[str], start_date: date, end_date: date, groups: Iterable[dict]
+    ) -> dict[str, dict]:
+        groups_by_account = {account_id: [] for account_id in account_ids}
+        for group in groups:
+            groups_by_account[group["account_id"]].append(group)
+        nulls_largest = self._nulls_largest()
         return {
-            "account_id": account_id,
-            "date_range": {"start": start_date, "end": end_date},
+            account_id: summarise_groups(account_id, start_date, end_date, account_groups, nulls_largest)
+            for account_id, account_groups in groups_by_account.items()
+        }
+
+    def account_timeseries(
+        self, account_id: str, start_date: date, end_date: date, interval: Interval, by_category: bool = False
+    ) -> dict:
+        """
+        Return the account's figures over the given date range bucketed by day, week or month, from a single query
+        truncating dates in the database.
+
+        :param account_id: The account ID to summarize.
+        :param start_date: The start date for the series (inclusive).
+        :param end_date: The end date for the series (inclusive).
+        :param interval: The length of the buckets.
+        :param by_category: Whether to break every bucket down by category.
+        :return: A dictionary containing the series, with a bucket for every interval of the range.
+        """
+        interval = Interval(interval)
+        if timezone.get_current_timezone_name() == settings.TIME_ZONE:
+            # Rollups are by day of the default timezone, so they answer series in any other timezone wrongly
+            rollups = DailyAccountRollup.objects
+            groups = rollups.timeseries_groups(account_id, start_date, end_date, interval, by_category)
+        else:
+            tz = timezone.get_current_timezone()
+            groups = (
+                self.filter(account_id=account_id)
+                .in_period(start_date, end_date)
+                .annotate(bucket=Trunc("date", interval, output_field=models.DateField(), tzinfo=tz))
+                .values("bucket", *(["category"] if by_category else []))
+                .annotate(
+                    count=Count("*"),
+                    spend=Sum("amount", filter=Q(amount__lt=0)),
+                    income=Sum("amount", filter=Q(amount__gt=0)),
+                )
+                .order_by()
+            )
+        return fold_timeseries(account_id, start_date, end_date, interval, groups, by_category)
+
+    def _nulls_largest(self) -> bool:
+        return connections[self.db].features.nulls_order_largest
+
+
+def summarise_groups(
+    account_id: str, start_date: date, end_date: date, groups: Iterable[dict], nulls_largest: bool = False
+) -> dict:
+    """
+    Build an account summary from the account's transaction figures grouped by category.
+
+    :param account_id: The account ID summarized.
+    :param start_date: The start date of the summary (inclusive).
+    :param end_date: The end date of the summary (inclusive).
+    :param groups: Dictionaries holding a ``category``, then the ``count``, ``spend`` and ``income`` of its
+        transactions and their count in each ingestion status, keyed by status. Spend and income are sums of
+        negative and positive amounts, or None.
+    :param nulls_largest: Whether categories without spend rank first among the top categories, as they would when
+        sorted by the database. True for PostgreSQL, False for SQLite.
+    :return: A dictionary containing the account summary.
+    """
+    total_transactions = 0
+    total_spend = total_income = Decimal("0.00")
+    categories = {}
+    processing_status = {
+        "pending": 0,
+        "processing": 0,
+        "completed": 0,
+        "failed": 0,
+    }
+
+    for group in groups:
+        total_transactions += group["count"]
+        total_spend += group["spend"] or 0
+        total_income += group["income"] or 0
+        for status in processing_status:
+            processing_status[status] += group[status] or 0
+        if group["category"] is not None:
+            categories[group["category"]] = (group["spend"], group["count"])
+
+    # Spend is negative, so the categories which spent least come first, as they always have
+    def spend_order(item):
+        spend = item[1][0]
+        return (spend is None) == nulls_largest, spend or 0
+
+    top_categories = sorted(categories.items(), key=spend_order, reverse=True)[:5]
+
+    total_spend = abs(total_spend)
+    return {
+        "account_id": account_id,
+        "date_range": {"start": start_date, "end": end_date},
+        "metrics": {
+            "total_transactions": total_transactions,
+            "total_spend": total_spend,
+            "total_income": total_income,
+            "net": total_income - total_spend,
+        },
+        "top_categories": [
+            {"category": category, "total_spend": abs(spend or Decimal("0.00")), "transaction_count": count}
+            for category, (spend, count) in top_categories
+        ],
+        "processing_status": processing_status,
+    }
+
+
+def fold_timeseries(
+    account_id: str, start_date: date, end_date: date, interval: Interval, groups: Iterable[dict], by_category: bool
+) -> dict:
+    """
+    Build an account's time series from its transaction figures grouped by bucket, and by category if requested,
+    filling in the buckets without transactions.
+
+    :param account_id: The account ID summarized.
+    :param start_date: The start date of the series (inclusive).
+    :param end_date: The end date of the series (inclusive).
+    :param interval: The length of the buckets.
+    :param groups: Dictionaries holding the first day of a ``bucket``, its ``category`` when broken down by
+        category, and the ``count``, ``spend`` and ``income`` of its transactions. Spend and income are sums of
+        negative and positive amounts, or None.
+    :param by_category: Whether to break every bucket down by category.
+    :return: A dictionary containing the series.
+    """
+    buckets = {}
+    bucket_start = interval.truncate(start_date)
+    while bucket_start <= end_date:
+        buckets[bucket_start] = {
+            "start": bucket_start,
             "metrics": {
-                "total_transactions": metrics["total_transactions"] or 0,
-                "total_spend": total_spend,
-                "total_income": total_income,
-                "net": total_income - total_spend,
+                "total_transactions": 0,
+                "total_spend": Decimal("0.00"),
+                "total_income": Decimal("0.00"),
+                "net": Decimal("0.00"),
             },
-            "top_categories": top_categories,
-            "processing_status": processing_status,
+            **({"categories": []} if by_category else {}),
         }
+        bucket_start = interval.next(bucket_start)
+
+    for group in groups:
+        bucket = buckets[group["bucket"]]
+        spend, income = abs(group["spend"] or Decimal("0.00")), group["income"] or Decimal("0.00")
+        metrics = bucket["metrics"]
+        metrics["total_transactions"] += group["count"]
+        metrics["total_spend"] += spend
+        metrics["total_income"] += income
+        metrics["net"] += income - spend
+        if by_category:
+            bucket["categories"].append(
+                {
+                    "category": group["category"],
+                    "total_spend": spend,
+                    "total_income": income,
+                    "transaction_count": group["count"],
+                }
+            )
+
+    if by_category:
+        for bucket in buckets.values():
+            bucket["categories"].sort(key=lambda item: (item["category"] is None, item["category"] or ""))
+    return {
+        "account_id": account_id,
+        "date_range": {"start": start_date, "end": end_date},
+        "interval": interval,
+        "buckets": list(buckets.values()),
+    }
 
 
 class Transaction(models.Model):
@@ -98,7 +353,10 @@ class Transaction(models.Model):
         FAILED = "failed", _("Failed")
 
     transaction_id = models.CharField(primary_key=True, max_length=100)
-    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name="transactions", db_column="account_id")
+    # Indexed by the leading column of transaction_account_date
+    account = models.ForeignKey(
+        Account, on_delete=models.CASCADE, related_name="transactions", db_column="account_id", db_index=False
+    )
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     currency = models.CharField(max_length=3)
     date = models.DateTimeField()
@@ -107,5 +365,385 @@ class Transaction(models.Model):
     category = models.CharField(max_length=100, null=True, blank=True)  # Populated by enrichment
     batch_id = models.UUIDField()  # To track which ingestion request created this transaction
     ingestion_status = models.CharField(max_length=20, choices=IngestionStatus.choices, default=IngestionStatus.PENDING)
+    lease_token = models.UUIDField(null=True, blank=True)  # Identifies the worker categorising the transaction
+    attempts = models.PositiveIntegerField(default=0)  # Number of times categorisation was retried
+    next_retry_at = models.DateTimeField(null=True, blank=True)  # When a failed transaction is due for a retry
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    def save(self, *args, **kwargs):
+        # Set-based writes track the rollups themselves, e.g. claims, write backs and upserts
+        with DailyAccountRollup.objects.tracking(Transaction.objects.filter(pk=self.pk)):
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with DailyAccountRollup.objects.tracking(Transaction.objects.filter(pk=self.pk)):
+            return super().delete(*args, **kwargs)
+
+    class Meta:
+        indexes = [
+            # Covers account summaries, which only read these columns of an account's transactions over a period
+            models.Index(
+                fields=["account", "date", "ingestion_status", "category", "amount"], name="transaction_account_date"
+            ),
+            # Covers finding and splitting the transactions of a batch in a given status
+            models.Index(fields=["batch_id", "ingestion_status", "transaction_id"], name="transaction_batch_status"),
+            # Supports leasing the oldest pending transactions, and finding the ones left in processing
+            models.Index(fields=["ingestion_status", "updated_at"], name="transaction_status_updated"),
+            models.Index(fields=["lease_token"], name="transaction_lease_token"),
+            # Supports finding the failed transactions due for a retry
+            models.Index(fields=["ingestion_status", "next_retry_at"], name="transaction_status_retry"),
+        ]
+
+
+class IngestionBatch(models.Model):
+    """
+    An ingestion request, tracking its progress from the raw payload to inserted transactions.
+
+    Batches posted asynchronously keep their raw payload here until a worker has materialised it.
+    """
+
+    class Status(models.TextChoices):
+        STAGED = "staged", _("Staged")
+        INSERTING = "inserting", _("Inserting")
+        INSERTED = "inserted", _("Inserted")
+        FAILED = "failed", _("Failed")
+
+    batch_id = models.UUIDField(primary_key=True)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.STAGED)
+    content_type = models.CharField(max_length=100, blank=True)
+    payload = models.BinaryField(null=True)  # Raw request body, cleared once materialised
+    total_transactions = models.PositiveIntegerField(default=0)
+    inserted = models.PositiveIntegerField(default=0)
+    updated = models.PositiveIntegerField(default=0)
+    duplicates = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(null=True, blank=True)
+    categorised_at = models.DateTimeField(null=True, blank=True)  # When every categorisation sub-task finished
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class CategoryRuleQuerySet(models.QuerySet):
+    """Bumps the version of the category rules once the changes made through it are committed."""
+
+    def _changed(self) -> None:
+        transaction.on_commit(bump_rules_version, using=router.db_for_write(self.model))
+
+    def update(self, **kwargs) -> int:
+        rows = super().update(**kwargs)
+        self._changed()
+        return rows
+
+    def delete(self):
+        deleted = super().delete()
+        self._changed()
+        return deleted
+
+    def bulk_create(self, objs, *args, **kwargs):
+        created = super().bulk_create(objs, *args, **kwargs)
+        self._changed()
+        return created
+
+    def bulk_update(self, objs, *args, **kwargs) -> int:
+        rows = super().bulk_update(objs, *args, **kwargs)
+        self._changed()
+        return rows
+
+
+class CategoryRule(models.Model):
+    """
+    A rule categorising transactions whose description contains the given pattern, case-insensitively.
+
+    When several rules match a description, the one with the lowest priority number wins.
+    """
+
+    objects = CategoryRuleQuerySet.as_manager()
+
+    pattern = models.CharField(max_length=255)
+    category = models.CharField(max_length=100, choices=[(category.value, category.value) for category in Category])
+    priority = models.PositiveIntegerField(default=100)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["priority", "id"]
+
+    def __str__(self) -> str:
+        return f"{self.pattern} → {self.category}"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        transaction.on_commit(bump_rules_version, using=self._state.db)
+
+    def delete(self, *args, **kwargs):
+        using = self._state.db
+        deleted = super().delete(*args, **kwargs)
+        transaction.on_commit(bump_rules_version, using=using)
+        return deleted
+
+
+class DailyAccountRollupManager(models.Manager):
+    def rollup_rows(self, transactions: models.QuerySet) -> models.QuerySet:
+        """
+        Return the given transactions aggregated into rollup rows, by account, day, category and ingestion status.
+
+        :param transactions: The transactions to aggregate.
+        """
+        tz = ZoneInfo(settings.TIME_ZONE)
+        return (
+            transactions.annotate(day=TruncDate("date", tzinfo=tz), bucket=Coalesce("category", Value("")))
+            .values("account_id", "day", "bucket", "ingestion_status")
+            .annotate(
+                count=Count("*"),
+                debits=Count("amount", filter=Q(amount__lt=0)),
+                spend=Coalesce(Sum("amount", filter=Q(amount__lt=0)), Decimal("0")),
+                income=Coalesce(Sum("amount", filter=Q(amount__gt=0)), Decimal("0")),
+            )
+            .order_by()
+        )
+
+    # Columns identifying a rollup, and the figures it adds up
+    KEY = ("account_id", "day", "category", "ingestion_status")
+    FIGURES = ("count", "debits", "spend", "income")
+    # Number of rollups merged per statement when applying deltas
+    DELTA_BATCH_SIZE = 500
+    # First key of the PostgreSQL advisory locks taken on transaction IDs, the second being the hash of the ID
+    ID_LOCK_CLASS = 20251001
+
+    def add(self, transactions: models.QuerySet) -> set[str]:
+        """
+        Add the figures of the given transactions to their rollups.
+
+        The transactions are aggregated and merged into the rollups by a single ``INSERT ... SELECT ... ON CONFLICT``
+        statement, so they are never loaded.
+
+        :param transactions: The transactions to add.
+        :return: The IDs of the accounts whose rollups changed.
+        """
+        db = router.db_for_write(self.model)
+        connection = connections[db]
+        quote_name = connection.ops.quote_name
+        select, params = self.rollup_rows(transactions.using(db)).query.get_compiler(using=db).as_sql()
+
+        table = quote_name(self.model._meta.db_table)
+        with connection.cursor() as cursor:
+            # "WHERE true" lets SQLite tell the ON CONFLICT clause apart from a join constraint
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(quote_name(column) for column in self.KEY + self.FIGURES)}) "
+                f"SELECT account_id, day, bucket, ingestion_status, "
+                f"{', '.join(quote_name(figure) for figure in self.FIGURES)} "
+                f"FROM ({select}) AS deltas WHERE true "
+                f"ON CONFLICT ({', '.join(quote_name(column) for column in self.KEY)}) DO UPDATE SET "
+                + self._increments(table, quote_name)
+                + (" RETURNING account_id" if connection.features.can_return_columns_from_insert else ""),
+                params,
+            )
+            if connection.features.can_return_columns_from_insert:
+                return {account_id for (account_id,) in cursor.fetchall()}
+        return set(transactions.using(db).values_list("account_id", flat=True).distinct())
+
+    @contextmanager
+    def tracking(self, *querysets: models.QuerySet, transaction_ids: Iterable[str] = ()) -> Iterator[None]:
+        """
+        Keep the rollups of the given transactions up to date with the changes made to them within the block.
+
+        The transactions are locked in primary key order, and their figures aggregated by rollup before and after the
+        block. The difference is then merged into the rollups in key order, all in one database transaction, so that
+        concurrent writers lock rollups in the same order and never deadlock on them. Each queryset must select the
+        same transactions before and after the block, e.g. by their IDs, and transactions may be split across several
+        querysets to bound the size of each statement.
+
+        Transactions which may not exist yet, e.g. those of a delivery, have no row to lock. Their IDs are locked
+        instead on PostgreSQL, so that concurrent deliveries of the same new transactions do not both count them.
+
+        :param querysets: The transactions changed within the block.
+        :param transaction_ids: The IDs of the transactions the block may insert.
+        """
+        db = router.db_for_write(self.model)
+        connection = connections[db]
+        # Without a savepoint of its own, an error within the block rolls back the whole surrounding transaction
+        with transaction.atomic(using=db, savepoint=False):
+            if connection.vendor == "postgresql" and transaction_ids:
+                # Held until the end of the transaction, and taken in a consistent order so as not to deadlock
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT pg_advisory_xact_lock(%s, key) FROM "
+                        "(SELECT DISTINCT hashtext(id) AS key FROM UNNEST(%s::text[]) AS id ORDER BY key) AS keys",
+                        [self.ID_LOCK_CLASS, list(transaction_ids)],
+                    )
+            if connection.features.has_select_for_update and querysets:
+                # Concurrent changes to the same transactions would otherwise be counted twice, or not at all
+                locked = Q()
+                for transactions in querysets:
+                    locked |= Q(pk__in=transactions.values("pk"))
+                list(Transaction.objects.using(db).filter(locked).select_for_update().order_by("pk").values("pk"))
+
+            before = self._figures(querysets, db)
+            yield
+            after = self._figures(querysets, db)
+
+            deltas, zero = {}, (0,) * len(self.FIGURES)
+            for key in sorted(before.keys() | after.keys()):
+                delta = [a - b for a, b in zip(after.get(key, zero), before.get(key, zero))]
+                if any(delta):
+                    deltas[key] = delta
+            self._merge(deltas, db)
+
+            # Accounts are bumped even if their rollups add up the same, as summaries in other time zones may differ
+            account_ids = {account_id for account_id, *_ in before.keys() | after.keys()}
+            if account_ids:
+                transaction.on_commit(partial(bump_account_versions, account_ids), using=db)
+
+    def _figures(self, querysets: Iterable[models.QuerySet], db: str) -> dict[tuple, tuple]:
+        """Return the figures of the given transactions by rollup key."""
+        figures, zero = {}, (0,) * len(self.FIGURES)
+        for transactions in querysets:
+            for row in self.rollup_rows(transactions.using(db)):
+                key = (row["account_id"], row["day"], row["bucket"], row["ingestion_status"])
+                figures[key] = tuple(total + row[figure] for total, figure in zip(figures.get(key, zero), self.FIGURES))
+        return figures
+
+    def _merge(self, deltas: dict[tuple, list], db: str) -> None:
+        """Add the given deltas to their rollups, in the order given."""
+        connection = connections[db]
+        quote_name = connection.ops.quote_name
+        table = quote_name(self.model._meta.db_table)
+        row = f"({', '.join(['%s'] * len(self.KEY + self.FIGURES))})"
+        with connection.cursor() as cursor:
+            for chunk in batched(deltas.items(), self.DELTA_BATCH_SIZE):
+                cursor.execute(
+                    f"INSERT INTO {table} ({', '.join(quote_name(column) for column in self.KEY + self.FIGURES)}) "
+                    f"VALUES {', '.join([row] * len(chunk))} "
+                    f"ON CONFLICT ({', '.join(quote_name(column) for column in self.KEY)}) DO UPDATE SET "
+                    + self._increments(table, quote_name),
+                    [value for key, delta in chunk for value in (*key, *delta)],
+                )
+
+    def _increments(self, table: str, quote_name) -> str:
+        return ", ".join(
+            f"{quote_name(figure)} = {table}.{quote_name(figure)} + EXCLUDED.{quote_name(figure)}"
+            for figure in self.FIGURES
+        )
+
+    def rebuild(self, account_ids: Iterable[str] | None = None) -> None:
+        """
+        Recompute the rollups of the given accounts, or of every account, from their transactions.
+
+        Rollups of days before the oldest partition of a partitioned transactions table are kept as they are, as they
+        are all that is left of archived transactions.
+
+        :param account_ids: The IDs of the accounts to rebuild, None for all.
+        """
+        rollups, transactions = self.all(), Transaction.objects.all()
+        if account_ids is not None:
+            account_ids = set(account_ids)
+            rollups = rollups.filter(account_id__in=account_ids)
+            transactions = transactions.filter(account_id__in=account_ids)
+        db = router.db_for_write(self.model)
+        if oldest := partitions.oldest_partition(db):
+            rollups = rollups.filter(day__gte=oldest)
+            transactions = transactions.filter(date__gte=partitions.month_bounds(oldest)[0])
+        with transaction.atomic(using=db):
+            changed = account_ids or set(rollups.values_list("account_id", flat=True).distinct())
+            rollups.delete()
+            changed |= self.add(transactions)
+            transaction.on_commit(partial(bump_account_versions, changed), using=db)
+
+    def summary_groups(self, account_ids: Iterable[str], start_date: date, end_date: date) -> list[dict]:
+        """
+        Return the figures of the accounts' transactions over the given days grouped by account and category, as
+        expected by :func:`summarise_groups`.
+
+        :param account_ids: The account IDs to summarize.
+        :param start_date: The first day of the period.
+        :param end_date: The last day of the period, inclusive.
+        """
+        groups = (
+            self.filter(account_id__in=account_ids, day__gte=start_date, day__lte=end_date, count__gt=0)
+            .values("account_id", "category")
+            .annotate(
+                total_count=Sum("count"),
+                total_debits=Sum("debits"),
+                total_spend=Sum("spend"),
+                total_income=Sum("income"),
+                **{
+                    status: Sum("count", filter=Q(ingestion_status=status))
+                    for status in Transaction.IngestionStatus.values
+                },
+            )
+            .order_by()
+        )
+        return [
+            {
+                **group,
+                "category": group["category"] or None,
+                "count": group["total_count"],
+                # Categories without negative amounts have no spend rather than a spend of zero, as they sort apart
+                "spend": group["total_spend"] if group["total_debits"] else None,
+                "income": group["total_income"],
+            }
+            for group in groups
+        ]
+
+    def timeseries_groups(
+        self, account_id: str, start_date: date, end_date: date, interval: Interval, by_category: bool
+    ) -> list[dict]:
+        """
+        Return the figures of the account's transactions over the given days grouped by bucket, and by category if
+        requested, as expected by :func:`fold_timeseries`.
+
+        :param account_id: The account ID to summarize.
+        :param start_date: The first day of the period.
+        :param end_date: The last day of the period, inclusive.
+        :param interval: The length of the buckets.
+        :param by_category: Whether to group by category as well.
+        """
+        groups = (
+            self.filter(account_id=account_id, day__gte=start_date, day__lte=end_date, count__gt=0)
+            .annotate(bucket=Trunc("day", interval, output_field=models.DateField()))
+            .values("bucket", *(["category"] if by_category else []))
+            .annotate(total_count=Sum("count"), total_spend=Sum("spend"), total_income=Sum("income"))
+            .order_by()
+        )
+        return [
+            {
+                **group,
+                "category": group.get("category") or None,
+                "count": group["total_count"],
+                "spend": group["total_spend"],
+                "income": group["total_income"],
+            }
+            for group in groups
+        ]
+
+
+class DailyAccountRollup(models.Model):
+    """
+    The figures of an account's transactions dated on a day, in the ``TIME_ZONE`` setting, in a category and status.
+
+    Rollups are kept up to date as transactions are ingested and categorised, so that account summaries add up a row
+    per day and category rather than every transaction. The ``rebuild_rollups`` command recomputes them, e.g. after
+    changing ``TIME_ZONE``.
+    """
+
+    objects = DailyAccountRollupManager()
+
+    # Indexed by the leading column of daily_account_rollup_key
+    account = models.ForeignKey(
+        Account, on_delete=models.CASCADE, related_name="rollups", db_column="account_id", db_index=False
+    )
+    day = models.DateField()
+    category = models.CharField(max_length=100, blank=True)  # Empty for uncategorised transactions
+    ingestion_status = models.CharField(max_length=20, choices=Transaction.IngestionStatus.choices)
+    count = models.IntegerField(default=0)
+    debits = models.IntegerField(default=0)  # Number of transactions with a negative amount
+    spend = models.DecimalField(max_digits=14, decimal_places=2, default=0)  # Sum of the negative amounts
+    income = models.DecimalField(max_digits=14, decimal_places=2, default=0)  # Sum of the positive amounts
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["account", "day", "category", "ingestion_status"], name="daily_account_rollup_key"
+            ),
+        ]
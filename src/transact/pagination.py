@@ -0,0 +1,74 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q, QuerySet
+from rest_framework import exceptions, pagination, request, response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(pagination.BasePagination):
+    """
+    Paginates transactions by ``(date, transaction_id)``, the last row of a page being encoded in the cursor to the
+    next one.
+
+    Every page is fetched by seeking past the cursor in the order of the index on the date, rather than skipping
+    the rows of the pages before with OFFSET, so deep pages cost as little as the first. Only the next page is linked.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset: QuerySet, request: request.Request, view=None) -> list:
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        after = self.decode_cursor(request)
+        if after is not None:
+            date, transaction_id = after
+            # The first filter bounds the range scanned on the index, the second skips the rows seen on its first day.
+            # They come before the queryset's own filters, as SQLite only seeks to the first lower bound on a column.
+            seek = queryset.model._default_manager.filter(date__gte=date)
+            seek = seek.filter(Q(date__gt=date) | Q(transaction_id__gt=transaction_id)) & queryset
+            # Combining querysets drops the fields deferred by the right-hand one
+            seek.query.deferred_loading = queryset.query.deferred_loading
+            queryset = seek
+
+        page = list(queryset.order_by("date", "transaction_id")[: self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        del page[self.page_size :]
+        self.last = page[-1] if page else None
+        return page
+
+    def get_page_size(self, request: request.Request) -> int:
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return settings.TRANSACT_TRANSACTION_PAGE_SIZE
+        return min(max(page_size, 1), settings.TRANSACT_TRANSACTION_MAX_PAGE_SIZE)
+
+    def decode_cursor(self, request: request.Request) -> tuple[datetime, str] | None:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            date, transaction_id = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            return datetime.fromisoformat(date), str(transaction_id)
+        except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+            raise exceptions.NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, date: datetime, transaction_id: str) -> str:
+        return base64.urlsafe_b64encode(json.dumps([date.isoformat(), transaction_id]).encode()).decode()
+
+    def get_next_link(self) -> str | None:
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.last.date, self.last.transaction_id)
+        )
+
+    def get_paginated_response(self, data) -> response.Response:
+        return response.Response({"next": self.get_next_link(), "results": data})
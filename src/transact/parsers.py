@@ -0,0 +1,91 @@
+import io
+import json
+import re
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speed-up
+    orjson = None
+
+# orjson decodes integers wider than 64 bits as floats, beyond the range of 64-bit integers, rather than failing. Only
+# bodies with runs of as many digits as such an integer can hold one, which are then checked for such floats.
+_LONG_DIGITS = re.compile(rb"\d{19}")
+_WIDE = 2**63
+
+
+def _has_wide_float(data) -> bool:
+    """Return whether the decoded JSON holds a float beyond the range of 64-bit integers."""
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+        elif isinstance(value, float) and abs(value) >= _WIDE:
+            return True
+    return False
+
+
+class ORJSONParser(JSONParser):
+    """
+    Parses JSON with orjson when it is installed, falling back to DRF's parser otherwise.
+
+    Bodies orjson rejects, or decodes integers of as floats because they are too wide for 64 bits, are re-parsed by
+    the standard library, so that exactly the same payloads are accepted, decoded to the same values and rejected with
+    the same errors as with DRF's ``JSONParser``.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", "utf-8")
+        if orjson is None or encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        try:
+            data = orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+        # The standard library keeps wide integers exact
+        if _LONG_DIGITS.search(body) and _has_wide_float(data):
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+        return data
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parses newline-delimited JSON lazily.
+
+    Rather than materialising the whole body, the parser returns a generator yielding ``(line_number, record)``
+    pairs as lines are read off the request stream, so callers can process arbitrarily large bodies in constant memory.
+    """
+
+    media_type = "application/x-ndjson"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """
+        Return a generator over the decoded records of the stream.
+
+        :param stream: The request stream to read lines from.
+        :param media_type: The media type of the request.
+        :param parser_context: The DRF parser context.
+        :return: A generator of ``(line_number, record)`` tuples.
+        """
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", "utf-8")
+        return self._iter_records(stream, encoding) if stream is not None else iter(())
+
+    def _iter_records(self, stream, encoding: str):
+        for line_number, raw_line in enumerate(stream, start=1):
+            line = raw_line.decode(encoding).strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise ParseError(f"NDJSON parse error on line {line_number}: {e}")
+            yield line_number, record
@@ -0,0 +1,342 @@
+"""
+Monthly range partitioning of the transactions table on PostgreSQL, by the ``date`` of the transactions.
+
+The table is converted by migration 0014 when ``TRANSACT_PARTITION_TRANSACTIONS`` is set, into one partition per
+month of ``TIME_ZONE`` and a default partition catching transactions of months without one yet. Queries filtering on
+a period of dates, e.g. summaries, time series and listings, are pruned to the partitions of the months it spans.
+
+PostgreSQL only enforces unique constraints which include the partition key, so the primary key of a partitioned
+table is ``(transaction_id, date)``. Transaction IDs are kept unique by a separate, unpartitioned key table instead,
+which loaders claim new IDs in before inserting their transactions, see :func:`claim_transaction_ids`. A trigger adds
+the IDs of transactions inserted by any other means, and removes those of deleted ones. IDs of archived transactions
+are kept, so that redeliveries of archived transactions are not ingested again.
+"""
+
+import gzip
+import logging
+import os
+import re
+from collections.abc import Iterable
+from contextlib import closing
+from datetime import date, datetime, time
+from functools import partial
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from .enums import Interval
+from .versions import bump_account_versions
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstd archives are optional
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+TABLE = "transact_transaction"
+DEFAULT_PARTITION = f"{TABLE}_default"
+KEY_TABLE = f"{TABLE}_key"
+KEY_SYNC_FUNCTION = f"{KEY_TABLE}_sync"
+PARTITION_NAME = re.compile(rf"^{TABLE}_p(\d{{4}})_(\d{{2}})$")
+
+COMPRESSIONS = ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+
+
+def partition_name(month: date) -> str:
+    return f"{TABLE}_p{month:%Y_%m}"
+
+
+def month_bounds(month: date) -> tuple[datetime, datetime]:
+    """Return the half-open range of timestamps of the given month of ``TIME_ZONE``."""
+    tz = ZoneInfo(settings.TIME_ZONE)
+    start = Interval.MONTH.truncate(month)
+    end = Interval.MONTH.next(start)
+    return datetime.combine(start, time.min, tzinfo=tz), datetime.combine(end, time.min, tzinfo=tz)
+
+
+def current_month() -> date:
+    return Interval.MONTH.truncate(timezone.localdate(timezone=ZoneInfo(settings.TIME_ZONE)))
+
+
+def is_partitioned(using: str = DEFAULT_DB_ALIAS) -> bool:
+    """
+    Return whether the transactions table of the given database is partitioned.
+
+    It is checked afresh on every call, a single catalog lookup, so that processes running while the table is
+    converted, e.g. Celery workers, load transactions as suits the table from then on without a restart.
+
+    :param using: The database alias.
+    """
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))", [TABLE])
+        (partitioned,) = cursor.fetchone()
+    return partitioned
+
+
+def claim_transaction_ids(transaction_ids: Iterable[str], using: str = DEFAULT_DB_ALIAS) -> set[str]:
+    """
+    Record the given transaction IDs in the key table of a partitioned transactions table, returning those which
+    were not recorded yet and can be inserted.
+
+    The claims are held until the end of the surrounding transaction, so that a concurrent load of the same IDs, e.g.
+    a redelivery under another date, waits for it and then finds them taken.
+
+    :param transaction_ids: The IDs of the transactions about to be inserted.
+    :param using: The database alias.
+    """
+    transaction_ids = list(transaction_ids)
+    if not transaction_ids:
+        return set()
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {connection.ops.quote_name(KEY_TABLE)} (transaction_id) SELECT UNNEST(%s::text[]) "
+            "ON CONFLICT DO NOTHING RETURNING transaction_id",
+            [sorted(transaction_ids)],
+        )
+        return {transaction_id for (transaction_id,) in cursor.fetchall()}
+
+
+def monthly_partitions(using: str = DEFAULT_DB_ALIAS) -> dict[date, bool]:
+    """
+    Return the months having a partition, including partitions detached by an archival which did not complete.
+
+    :param using: The database alias.
+    :return: Whether each month's partition is attached to the transactions table, keyed by month.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relname, i.inhparent IS NOT NULL
+            FROM pg_class c LEFT JOIN pg_inherits i ON i.inhrelid = c.oid AND i.inhparent = to_regclass(%s)
+            WHERE c.relkind = 'r' AND c.relnamespace = to_regnamespace(current_schema()) AND c.relname LIKE %s
+            """,
+            [TABLE, f"{TABLE}\\_p%"],
+        )
+        partitions = {}
+        for name, attached in cursor.fetchall():
+            if match := PARTITION_NAME.match(name):
+                partitions[date(int(match[1]), int(match[2]), 1)] = attached
+    return partitions
+
+
+def oldest_partition(using: str = DEFAULT_DB_ALIAS) -> date | None:
+    """
+    Return the month of the oldest partition attached to the transactions table, before which transactions may have
+    been archived, or None if the table is not partitioned.
+
+    :param using: The database alias.
+    """
+    if not is_partitioned(using):
+        return None
+    return min((month for month, attached in monthly_partitions(using).items() if attached), default=None)
+
+
+def create_partitions(months_ahead: int, using: str = DEFAULT_DB_ALIAS) -> list[str]:
+    """
+    Create the missing partitions of the current month and the given number of months after it.
+
+    :param months_ahead: The number of months after the current one to create partitions for.
+    :param using: The database alias.
+    :return: The names of the created partitions.
+    """
+    month, existing = current_month(), monthly_partitions(using)
+    created = []
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        for _ in range(months_ahead + 1):
+            if month not in existing:
+                created.append(_create_partition(cursor, month))
+            month = Interval.MONTH.next(month)
+    return created
+
+
+def _create_partition(cursor, month: date, parent: str = TABLE) -> str:
+    quote_name = cursor.db.ops.quote_name
+    name = partition_name(month)
+    start, end = month_bounds(month)
+    cursor.execute(
+        f"CREATE TABLE {quote_name(name)} (LIKE {quote_name(parent)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+    )
+    # Transactions of the month which landed in the default partition move to the new one, which could not be
+    # attached otherwise. Inserts into the default partition wait until the partition is attached, as one landing in
+    # between would make attaching it fail.
+    cursor.execute(f"LOCK TABLE {quote_name(DEFAULT_PARTITION)} IN SHARE ROW EXCLUSIVE MODE")
+    cursor.execute(
+        f"WITH moved AS (DELETE FROM {quote_name(DEFAULT_PARTITION)} WHERE date >= %s AND date < %s RETURNING *) "
+        f"INSERT INTO {quote_name(name)} SELECT * FROM moved",
+        [start, end],
+    )
+    # Bounds cannot be passed as parameters to DDL statements
+    cursor.execute(
+        f"ALTER TABLE {quote_name(parent)} ATTACH PARTITION {quote_name(name)} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+    if parent == TABLE:
+        # The moved transactions were in no partition when the deletion triggers fired, which dropped their keys
+        cursor.execute(
+            f"INSERT INTO {quote_name(KEY_TABLE)} (transaction_id) SELECT transaction_id FROM {quote_name(name)} "
+            "ON CONFLICT DO NOTHING"
+        )
+    return name
+
+
+def archive_partition(
+    month: date, directory: Path, compression: str, using: str = DEFAULT_DB_ALIAS
+) -> tuple[Path, int]:
+    """
+    Detach the partition of the given month, export its transactions to a compressed CSV file, then drop it.
+
+    The file is only moved into place once fully written, and the partition only dropped after that, so an archival
+    which fails midway can be run again. Daily rollups are left as they are, so summaries of archived months remain,
+    and are kept by :meth:`DailyAccountRollupManager.rebuild`.
+
+    :param month: The month to archive, which must have a partition.
+    :param directory: The directory to write ``<partition>.csv.gz`` or ``<partition>.csv.zst`` to.
+    :param compression: "gzip" or "zstd".
+    :param using: The database alias.
+    :return: The path of the file and the number of archived transactions.
+    """
+    connection = connections[using]
+    quote_name = connection.ops.quote_name
+    name = partition_name(month)
+    path = Path(directory) / f"{name}.csv.{'zst' if compression == 'zstd' else 'gz'}"
+
+    if monthly_partitions(using)[month]:
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {quote_name(TABLE)} DETACH PARTITION {quote_name(name)}")
+
+    # Nothing writes to a detached partition, so it is exported as it stands
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT DISTINCT account_id FROM {quote_name(name)}")
+        account_ids = {account_id for (account_id,) in cursor.fetchall()}
+        cursor.execute(f"SELECT COUNT(*) FROM {quote_name(name)}")
+        (count,) = cursor.fetchone()
+        partial_path = path.with_name(f"{path.name}.partial")
+        with open(partial_path, "wb") as file:
+            with closing(_compressed_writer(file, compression)) as writer:
+                _copy_to(cursor, f"COPY {quote_name(name)} TO STDOUT WITH (FORMAT csv, HEADER)", writer)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(partial_path, path)
+
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE {quote_name(name)}")
+        # Summaries in other timezones, and series, of the accounts are computed from their transactions
+        transaction.on_commit(partial(bump_account_versions, account_ids), using=using)
+    logger.info("Archived %d transactions of %s to %s", count, name, path)
+    return path, count
+
+
+def _compressed_writer(file, compression: str):
+    if compression == "zstd":
+        return zstandard.ZstdCompressor().stream_writer(file, closefd=False)
+    return gzip.GzipFile(fileobj=file, mode="wb")
+
+
+def _copy_to(cursor, sql: str, file) -> None:
+    raw_cursor = cursor.cursor
+    if hasattr(raw_cursor, "copy_expert"):
+        # psycopg2
+        raw_cursor.copy_expert(sql, file)
+    else:
+        # psycopg 3
+        with raw_cursor.copy(sql) as copy:
+            for data in copy:
+                file.write(data)
+
+
+def partition_table(schema_editor, model) -> None:
+    """
+    Convert the transactions table to monthly partitions, from the month of its oldest transaction to
+    ``TRANSACT_PARTITION_MONTHS_AHEAD`` months after the current one, copying its rows over.
+
+    :param schema_editor: The schema editor of the database to convert.
+    :param model: The transaction model, e.g. as of the migration.
+    """
+    _rebuild_table(schema_editor, model, partitioned=True)
+
+
+def unpartition_table(schema_editor, model) -> None:
+    """
+    Convert the partitioned transactions table back to a single table, copying the rows of its partitions over.
+    Detached partitions are left alone.
+
+    :param schema_editor: The schema editor of the database to convert.
+    :param model: The transaction model, e.g. as of the migration.
+    """
+    _rebuild_table(schema_editor, model, partitioned=False)
+
+
+def _rebuild_table(schema_editor, model, partitioned: bool) -> None:
+    quote_name = schema_editor.quote_name
+    table, rebuilt = model._meta.db_table, f"{model._meta.db_table}_rebuilt"
+    primary_key = "transaction_id, date" if partitioned else "transaction_id"
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE {quote_name(rebuilt)} (LIKE {quote_name(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+            + (" PARTITION BY RANGE (date)" if partitioned else "")
+        )
+        cursor.execute(f"ALTER TABLE {quote_name(rebuilt)} ADD PRIMARY KEY ({primary_key})")
+        if partitioned:
+            cursor.execute(f"CREATE TABLE {quote_name(DEFAULT_PARTITION)} PARTITION OF {quote_name(rebuilt)} DEFAULT")
+            cursor.execute(f"SELECT MIN(date) FROM {quote_name(table)}")
+            (oldest,) = cursor.fetchone()
+            month, last = current_month(), current_month()
+            if oldest is not None:
+                month = min(month, Interval.MONTH.truncate(timezone.localdate(oldest, ZoneInfo(settings.TIME_ZONE))))
+            for _ in range(settings.TRANSACT_PARTITION_MONTHS_AHEAD):
+                last = Interval.MONTH.next(last)
+            while month <= last:
+                _create_partition(cursor, month, parent=rebuilt)
+                month = Interval.MONTH.next(month)
+
+        # Secondary indexes are built once the rows are copied, rather than maintained row by row
+        cursor.execute(f"INSERT INTO {quote_name(rebuilt)} SELECT * FROM {quote_name(table)}")
+        cursor.execute(f"DROP TABLE {quote_name(table)}")
+        cursor.execute(f"ALTER TABLE {quote_name(rebuilt)} RENAME TO {quote_name(table)}")
+        cursor.execute(
+            f"ALTER TABLE {quote_name(table)} RENAME CONSTRAINT {quote_name(f'{rebuilt}_pkey')} "
+            f"TO {quote_name(f'{table}_pkey')}"
+        )
+
+    for index in model._meta.indexes:
+        schema_editor.add_index(model, index)
+    account = model._meta.get_field("account")
+    schema_editor.execute(schema_editor._create_fk_sql(model, account, "_fk_%(to_table)s_%(to_column)s"))
+
+    if partitioned:
+        id_type = model._meta.pk.db_type(schema_editor.connection)
+        schema_editor.execute(f"CREATE TABLE {quote_name(KEY_TABLE)} (transaction_id {id_type} PRIMARY KEY)")
+        schema_editor.execute(f"INSERT INTO {quote_name(KEY_TABLE)} SELECT transaction_id FROM {quote_name(table)}")
+        # Transactions moving to another partition are deleted then inserted, and keep their key as the deletion
+        # triggers fire once the whole statement ran
+        schema_editor.execute(
+            f"""
+            CREATE FUNCTION {quote_name(KEY_SYNC_FUNCTION)}() RETURNS trigger LANGUAGE plpgsql AS $$
+            BEGIN
+                IF TG_OP = 'INSERT' THEN
+                    INSERT INTO {quote_name(KEY_TABLE)} (transaction_id) VALUES (NEW.transaction_id)
+                    ON CONFLICT DO NOTHING;
+                ELSIF NOT EXISTS (SELECT 1 FROM {quote_name(table)} WHERE transaction_id = OLD.transaction_id) THEN
+                    DELETE FROM {quote_name(KEY_TABLE)} WHERE transaction_id = OLD.transaction_id;
+                END IF;
+                RETURN NULL;
+            END
+            $$
+            """
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {quote_name(KEY_SYNC_FUNCTION)} AFTER INSERT OR DELETE ON {quote_name(table)} "
+            f"FOR EACH ROW EXECUTE FUNCTION {quote_name(KEY_SYNC_FUNCTION)}()"
+        )
+    else:
+        schema_editor.execute(f"DROP TABLE IF EXISTS {quote_name(KEY_TABLE)}")
+        schema_editor.execute(f"DROP FUNCTION IF EXISTS {quote_name(KEY_SYNC_FUNCTION)}()")
@@ -0,0 +1,44 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speed-up
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Renders JSON with orjson when it is installed, falling back to DRF's renderer otherwise.
+
+    Output is that of DRF's compact ``JSONRenderer`` but for floats: dates, times, decimals and any other type orjson
+    would format differently are handed to DRF's own encoder, and anything orjson cannot encode at all, as well as
+    indented output, is rendered by DRF itself. Floats are formatted by orjson, which differs in two ways:
+
+    * exponents have no leading zero, e.g. ``1e-7`` rather than ``1e-07``, which decodes to the same value;
+    * NaN and infinities are rendered as ``null``, whereas DRF refuses to render them under ``STRICT_JSON``.
+    """
+
+    # Dates and dataclasses are left to DRF's encoder, and non-string keys are stringified as the json module does
+    OPTIONS = (
+        orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS if orjson else 0
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        renderer_context = renderer_context or {}
+        if (
+            orjson is None
+            or data is None
+            or not self.compact
+            or self.ensure_ascii
+            or self.get_indent(accepted_media_type, renderer_context) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=encoders.JSONEncoder().default, option=self.OPTIONS)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Escape the line and paragraph separators as DRF does, as they are not valid in JavaScript strings
+        return ret.replace("\u2028".encode(), b"\\u2028").replace("\u2029".encode(), b"\\u2029")
@@ -0,0 +1,132 @@
+"""
+Routing of reporting reads to read replicas, keeping them off the primary which takes the ingestion writes.
+
+Reads only go to a replica within :func:`replica_reads`, which the report views wrap their queries in, and never
+within a transaction on the primary, so that ingestion, categorisation and anything reading its own writes stay on
+the primary. Replicas lagging behind the primary by more than ``TRANSACT_REPLICA_MAX_LAG`` seconds are skipped.
+"""
+
+import logging
+import random
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_replica_reads = ContextVar("replica_reads", default=False)
+
+# Replication lag in seconds, or None if unknown
+LAG_QUERIES = {
+    "postgresql": (
+        "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+    ),
+}
+
+
+@contextmanager
+def replica_reads(enabled: bool = True) -> Iterator[None]:
+    """
+    Let the reads made within the block go to a read replica.
+
+    :param enabled: False to keep the reads on the primary, e.g. for accounts which just changed.
+    """
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class _LagMonitor:
+    """Checks how far behind the primary each replica is, at most once per ``interval`` seconds per replica."""
+
+    interval = 1.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked = {}
+
+    def lag(self, alias: str) -> float | None:
+        with self._lock:
+            checked_at, lag = self._checked.get(alias, (None, None))
+        if checked_at is not None and time.monotonic() - checked_at < self.interval:
+            return lag
+
+        lag = self._measure(alias)
+        with self._lock:
+            self._checked[alias] = (time.monotonic(), lag)
+        return lag
+
+    def _measure(self, alias: str) -> float | None:
+        connection = connections[alias]
+        query = LAG_QUERIES.get(connection.vendor)
+        if query is None:
+            # Local stand-ins for replicas, e.g. a second connection to the same SQLite file, never lag
+            return 0.0
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(query)
+                (lag,) = cursor.fetchone()
+        except DatabaseError:
+            logger.warning("Could not check the replication lag of %s", alias, exc_info=True)
+            return None
+        return float(lag) if lag is not None else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._checked.clear()
+
+
+lag_monitor = _LagMonitor()
+
+
+class ReplicaRouter:
+    """
+    Sends the reads made within :func:`replica_reads` to a random replica of ``TRANSACT_READ_REPLICAS`` which is
+    keeping up with the primary, and everything else to the primary.
+    """
+
+    def db_for_read(self, model, **hints) -> str | None:
+        replicas = settings.TRANSACT_READ_REPLICAS
+        if not replicas or not _replica_reads.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+
+        max_lag = settings.TRANSACT_REPLICA_MAX_LAG
+        candidates = list(replicas)
+        random.shuffle(candidates)
+        for alias in candidates:
+            if max_lag:
+                lag = lag_monitor.lag(alias)
+                if lag is None or lag > max_lag:
+                    metrics.incr("replicas.lagging")
+                    continue
+            metrics.incr("replicas.reads")
+            return alias
+
+        metrics.incr("replicas.fallbacks")
+        return None
+
+    def db_for_write(self, model, **hints) -> str:
+        # Instances read from a replica are saved to the primary all the same
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool | None:
+        databases = {DEFAULT_DB_ALIAS, *settings.TRANSACT_READ_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db: str, app_label: str, **hints) -> bool | None:
+        # Replicas follow the primary's schema
+        if db in settings.TRANSACT_READ_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,152 @@
+import hashlib
+import threading
+import time
+from collections import deque
+from collections.abc import Iterable
+
+from django.conf import settings
+
+from . import metrics
+from .caching import is_shared_cache
+from .models import CategoryRule
+from .versions import get_rules_version
+
+
+class RuleMatcher:
+    """
+    Finds the category of the highest-precedence rule whose pattern occurs in a text, once both are normalised.
+
+    The patterns are compiled into a single Aho-Corasick automaton, so matching a text takes time proportional to its
+    length and the number of occurrences found, whatever the number of rules. Each state of the automaton holds the
+    best rule ending there or at any of its suffixes, so only one comparison is needed per character.
+    """
+
+    def __init__(self, rules: Iterable[tuple[str, str]], version: str = ""):
+        """
+        :param rules: ``(pattern, category)`` pairs, from the highest precedence to the lowest.
+        :param version: An identifier of the set of rules, changing whenever they do.
+        """
+        self.version = version
+        # Per state: the transitions by character, the failure link, and the best (rank, category) recognised
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._best: list[tuple[int, str] | None] = [None]
+        self.size = 0
+
+        for rank, (pattern, category) in enumerate(rules):
+            pattern = normalise_description(pattern)
+            if pattern:
+                self._add(pattern, rank, category)
+                self.size += 1
+        self._link()
+
+    def _add(self, pattern: str, rank: int, category: str) -> None:
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._best.append(None)
+            state = next_state
+
+        # A repeated pattern keeps its first, highest precedence rule
+        if self._best[state] is None:
+            self._best[state] = (rank, category)
+
+    def _link(self) -> None:
+        """Compute the failure links breadth-first, folding the best rule of each suffix into its states."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[next_state] = fail
+                self._best[next_state] = _min_rule(self._best[next_state], self._best[fail])
+
+    def match(self, text: str | None) -> str | None:
+        """
+        Return the category of the highest-precedence rule whose pattern occurs in the text, if any.
+
+        :param text: The text to search, e.g. a transaction description.
+        """
+        goto, fail, best_by_state = self._goto, self._fail, self._best
+        best = None
+        state = 0
+        for char in normalise_description(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if best_by_state[state] is not None:
+                best = _min_rule(best, best_by_state[state])
+        return best[1] if best is not None else None
+
+
+def normalise_description(text: str | None) -> str:
+    """
+    Return the form of a text which rules are matched against: lowercase, with whitespace runs collapsed.
+
+    Texts with the same normal form are always put in the same category.
+    """
+    return " ".join((text or "").lower().split())
+
+
+def _min_rule(a: tuple[int, str] | None, b: tuple[int, str] | None) -> tuple[int, str] | None:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a, b)
+
+
+class _MatcherCache:
+    """
+    Holds the matcher compiled from the active category rules, for the lifetime of a worker process.
+
+    At most every ``TRANSACT_CATEGORY_RULES_RELOAD_INTERVAL`` seconds, the version of the rules in the shared cache
+    is compared to the one the matcher was loaded at, and the rules are loaded again if it was bumped since, see
+    :func:`~transact.versions.bump_rules_version`. A cache local to the process misses the bumps of the others, so
+    the rules are then loaded at every check. Either way, the matcher is only recompiled if the rules differ.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._matcher = None
+        self._rules_version = None
+        self._checked_at = 0.0
+
+    def get(self) -> RuleMatcher:
+        with self._lock:
+            now = time.monotonic()
+            if self._matcher is None or now - self._checked_at >= settings.TRANSACT_CATEGORY_RULES_RELOAD_INTERVAL:
+                self._checked_at = now
+                rules_version = get_rules_version() if is_shared_cache() else None
+                if self._matcher is None or rules_version is None or rules_version != self._rules_version:
+                    rules = CategoryRule.objects.filter(is_active=True).order_by("priority", "id")
+                    rules = list(rules.values_list("pattern", "category"))
+                    # Categories are cached by the matcher's version, which stays the same for the same rules
+                    version = hashlib.blake2b(repr(rules).encode(), digest_size=8).hexdigest()
+                    if self._matcher is None or version != self._matcher.version:
+                        self._matcher = RuleMatcher(rules, version=version)
+                        metrics.incr("category_rules.reloads")
+                    self._rules_version = rules_version
+            return self._matcher
+
+    def clear(self) -> None:
+        with self._lock:
+            self._matcher = None
+            self._rules_version = None
+
+
+rule_matchers = _MatcherCache()
+
+
+def get_rule_matcher() -> RuleMatcher:
+    """Return the matcher compiled from the active category rules, recompiling it if they changed."""
+    return rule_matchers.get()
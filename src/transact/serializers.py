@@ -1,10 +1,13 @@
-from uuid import uuid4
+from collections.abc import Mapping
+from datetime import date
 
-from django.db import transaction
+from django.conf import settings
 from rest_framework import serializers
 
-from .models import Account, Transaction
-from .task import categorise_transactions
+from .enums import Interval
+from .ingestion import ingest_batch
+from .models import Account, IngestionBatch, Transaction
+from .validation import validate_rows
 
 
 class AccountSerializer(serializers.ModelSerializer):
@@ -16,6 +19,8 @@ class AccountSerializer(serializers.ModelSerializer):
 
 
 class TransactionSerializer(serializers.ModelSerializer):
+    # Declared explicitly to drop the per-row uniqueness check, as existing transactions are upserted
+    transaction_id = serializers.CharField(max_length=100)
     # Use IntegerField for the ID reference to avoid DRF validating existence immediately
     account_id = serializers.CharField()
     iso_currency_code = serializers.CharField(source="currency")
@@ -26,6 +31,28 @@ class TransactionSerializer(serializers.ModelSerializer):
         fields = ["transaction_id", "account_id", "amount", "iso_currency_code", "date", "merchant_name", "name"]
 
 
+class TransactionListSerializer(serializers.ModelSerializer):
+    """Serializer for transactions read back out of the API, named as they are ingested."""
+
+    account_id = serializers.CharField()
+    iso_currency_code = serializers.CharField(source="currency")
+    name = serializers.CharField(source="description")
+
+    class Meta:
+        model = Transaction
+        fields = [
+            "transaction_id",
+            "account_id",
+            "amount",
+            "iso_currency_code",
+            "date",
+            "merchant_name",
+            "name",
+            "category",
+            "ingestion_status",
+        ]
+
+
 class TopCategorySerializer(serializers.Serializer):
     """Serializer for top spending categories."""
 
@@ -69,44 +96,136 @@ class AccountSummarySerializer(serializers.Serializer):
     processing_status = ProcessingStatusSerializer()
 
 
+class DateRangeRequestSerializer(serializers.Serializer):
+    """Serializer for the date range of a report request, ending today by default."""
+
+    start_date = serializers.DateField()
+    end_date = serializers.DateField(default=date.today)
+
+    def validate(self, attrs: dict) -> dict:
+        if attrs["start_date"] > attrs["end_date"]:
+            raise serializers.ValidationError("start_date cannot be after end_date")
+        return attrs
+
+
+class AccountSummariesRequestSerializer(DateRangeRequestSerializer):
+    """Serializer for a request for the summaries of several accounts over the same date range."""
+
+    account_ids = serializers.ListField(
+        child=serializers.CharField(max_length=100),
+        allow_empty=False,
+        max_length=settings.TRANSACT_SUMMARY_MAX_ACCOUNTS,
+    )
+
+
+class TimeseriesCategorySerializer(serializers.Serializer):
+    """Serializer for the figures of a category within a bucket of a time series."""
+
+    category = serializers.CharField(allow_null=True)
+    total_spend = serializers.DecimalField(max_digits=12, decimal_places=2)
+    total_income = serializers.DecimalField(max_digits=12, decimal_places=2)
+    transaction_count = serializers.IntegerField()
+
+
+class TimeseriesBucketSerializer(serializers.Serializer):
+    """Serializer for a bucket of a time series, starting on the given day."""
+
+    start = serializers.DateField()
+    metrics = MetricsSerializer()
+    categories = TimeseriesCategorySerializer(many=True, required=False)
+
+
+class AccountTimeseriesSerializer(serializers.Serializer):
+    """Serializer for an account's figures bucketed by day, week or month."""
+
+    account_id = serializers.CharField()
+    date_range = DateRangeSerializer()
+    interval = serializers.CharField()
+    buckets = TimeseriesBucketSerializer(many=True)
+
+
+class AccountTimeseriesRequestSerializer(DateRangeRequestSerializer):
+    """Serializer for the query parameters of a time series request."""
+
+    interval = serializers.ChoiceField(choices=[interval.value for interval in Interval], default=Interval.DAY)
+    by_category = serializers.BooleanField(default=False)
+
+    def validate(self, attrs: dict) -> dict:
+        attrs = super().validate(attrs)
+        interval, buckets = Interval(attrs["interval"]), 0
+        bucket_start = interval.truncate(attrs["start_date"])
+        while bucket_start <= attrs["end_date"]:
+            buckets += 1
+            if buckets > settings.TRANSACT_TIMESERIES_MAX_BUCKETS:
+                raise serializers.ValidationError(
+                    f"The range spans more than {settings.TRANSACT_TIMESERIES_MAX_BUCKETS} intervals, "
+                    "use a longer interval or a shorter range"
+                )
+            bucket_start = interval.next(bucket_start)
+        return attrs
+
+
 class CompositeCreationSerializer(serializers.Serializer):
     accounts = AccountSerializer(many=True)
     transactions = TransactionSerializer(many=True)
 
-    def create(self, validated_data: dict) -> dict:
+    def to_internal_value(self, data) -> dict:
         """
-        Create Accounts and Transactions in bulk, maintaining the relationships between them.
+        Validate the payload, checking large row lists column by column rather than row by row.
 
-        :param validated_data: The validated data containing accounts and transactions.
-        :return: A dictionary with created accounts and transactions.
+        :param data: The incoming payload.
+        :return: The validated accounts and transactions.
         """
-        accounts_data = validated_data.get("accounts", [])
-        transactions_data = validated_data.get("transactions", [])
+        if not isinstance(data, Mapping) or not all(isinstance(data.get(name), list) for name in self.fields):
+            # Leave malformed payloads to DRF so that they get its usual errors
+            return super().to_internal_value(data)
 
-        request_account_ids = [account["account_id"] for account in accounts_data]
-        accounts_to_create = []
+        validated_data, errors = {}, {}
+        for name, field in self.fields.items():
+            try:
+                validated_data[name] = validate_rows(type(field.child), data[name])
+            except serializers.ValidationError as exc:
+                errors[name] = exc.detail
 
-        with transaction.atomic():
-            # We first handle the accounts via upserts
-            # In this case, insert new accounts and ignore existing ones
-            existing_accounts = Account.objects.filter(account_id__in=request_account_ids)
-            existing_account_ids = set(acc.account_id for acc in existing_accounts)
+        if errors:
+            raise serializers.ValidationError(errors)
+        return validated_data
 
-            for account in accounts_data:
-                if account["account_id"] not in existing_account_ids:
-                    accounts_to_create.append(Account(**account))
+    def create(self, validated_data: dict) -> dict:
+        """
+        Create Accounts and Transactions in bulk, maintaining the relationships between them.
+        A ``batch_id`` may be given through the serializer context, e.g. for batches staged beforehand.
 
-            if accounts_to_create:
-                Account.objects.bulk_create(accounts_to_create)
+        :param validated_data: The validated data containing accounts and transactions.
+        :return: A dictionary with the batch ID and the inserted, updated and duplicate transaction counts.
+        """
+        return ingest_batch(
+            validated_data.get("accounts", []),
+            validated_data.get("transactions", []),
+            batch_id=self.context.get("batch_id"),
+        )
 
-            # Bulk create the transactions now that all necessary accounts exist
-            batch_id = str(uuid4())
-            Transaction.objects.bulk_create([Transaction(**data, batch_id=batch_id) for data in transactions_data])
 
-        # Trigger asynchronous categorization for this batch
-        categorise_transactions.delay(batch_id=batch_id)
+class BatchStatusSerializer(serializers.ModelSerializer):
+    """Serializer for the progress of an ingestion batch."""
 
-        return {
-            "total_transactions": len(accounts_data + transactions_data),
-            "batch_id": batch_id,
-        }
+    categorisation = serializers.SerializerMethodField()
+
+    class Meta:
+        model = IngestionBatch
+        fields = [
+            "batch_id",
+            "status",
+            "total_transactions",
+            "inserted",
+            "updated",
+            "duplicates",
+            "errors",
+            "categorisation",
+            "categorised_at",
+            "created_at",
+            "updated_at",
+        ]
+
+    def get_categorisation(self, batch: IngestionBatch) -> dict:
+        return ProcessingStatusSerializer(Transaction.objects.filter(batch_id=batch.batch_id).status_counts()).data
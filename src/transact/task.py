@@ -1,16 +1,35 @@
 # your_app/tasks.py
 import logging
-import random
-import time
+import math
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+from functools import partial
+from itertools import batched
 
-from celery import shared_task
+from celery import chord, group, shared_task
 from celery.utils.log import get_task_logger
+from django.conf import settings
+from django.db.models import F, QuerySet
+from django.utils import timezone
 
-from .enums import Category
-from .models import Transaction
+from . import metrics
+from .caching import TwoTierCache
+from .classifier import NaiveBayesClassifier, get_classifier
+from .enrichment import get_enrichment_backend
+from .models import DailyAccountRollup, IngestionBatch, Transaction
+from .partitions import create_partitions, is_partitioned
+from .rules import get_rule_matcher, normalise_description
 
 logger = get_task_logger(__name__)
 
+# Categories of normalised descriptions, memoized per worker and across workers
+category_cache = TwoTierCache(
+    "category_cache",
+    maxsize=settings.TRANSACT_CATEGORY_CACHE_SIZE,
+    local_ttl=settings.TRANSACT_CATEGORY_CACHE_LOCAL_TTL,
+    ttl=settings.TRANSACT_CATEGORY_CACHE_TTL,
+)
+
 
 @shared_task
 def categorise_transactions(batch_id: str):
@@ -18,51 +37,316 @@ def categorise_transactions(batch_id: str):
     A background task to categorise transactions in a given batch.
     Only processes transactions with 'pending' status.
 
+    Batches larger than the categorisation chunk size are fanned out as a chord of sub-tasks over disjoint ranges
+    of transaction IDs, so that they are spread over every worker. Either way the batch is marked as categorised
+    once all of its transactions have been processed.
+
+    In the "claim" categorisation mode, the batch is instead left to drain tasks leasing pending transactions of any
+    batch, which are enqueued in proportion to its size.
+
     :param batch_id: The batch ID of the transactions to categorise.
     """
-    transactions = Transaction.objects.filter(batch_id=batch_id)
+    pending = Transaction.objects.filter(batch_id=batch_id, ingestion_status=Transaction.IngestionStatus.PENDING)
+    chunk_size = settings.TRANSACT_CATEGORISATION_CHUNK_SIZE
 
-    for transaction in transactions:
-        if transaction.ingestion_status == Transaction.IngestionStatus.PENDING:
-            logger.info("Processing transaction: %s", transaction.transaction_id)
-            transaction.ingestion_status = Transaction.IngestionStatus.PROCESSING
-            transaction.save()
+    if settings.TRANSACT_CATEGORISATION_MODE == "claim":
+        # Transactions are only counted up to as many as the most drain tasks enqueued would claim in a chunk each
+        most = settings.TRANSACT_CATEGORISATION_DRAIN_TASKS
+        drainers = max(math.ceil(pending[: most * chunk_size].count() / chunk_size), 1)
+        logger.info("Enqueuing %d drain tasks for batch %s", drainers, batch_id)
+        group(drain_pending_transactions.s() for _ in range(drainers)).apply_async()
+        return
 
-            time.sleep(random.uniform(0.5, 1))  # Simulate random processing latency
+    ranges = transaction_id_ranges(pending, chunk_size)
 
-            try:
-                transaction.category = determine_transaction_category(transaction.description)
-            except Exception as e:
-                logger.exception("Error categorising transaction %s: %s", transaction.transaction_id, e)
-                transaction.ingestion_status = Transaction.IngestionStatus.FAILED
-                transaction.save()
-                continue
+    if len(ranges) <= 1:
+        categorise_transaction_range(batch_id)
+        mark_batch_categorised(None, batch_id=batch_id)
+        return
 
-            transaction.ingestion_status = Transaction.IngestionStatus.COMPLETED
-            transaction.save()
-            logger.info("Categorised transaction %s as %s", transaction.transaction_id, transaction.category)
+    logger.info("Fanning out batch %s over %d sub-tasks", batch_id, len(ranges))
+    header = group(categorise_transaction_range.s(batch_id, first_id, last_id) for first_id, last_id in ranges)
+    chord(header)(mark_batch_categorised.s(batch_id=batch_id))
+
+
+@shared_task
+def categorise_transaction_range(batch_id: str, first_id: str | None = None, last_id: str | None = None):
+    """
+    A background task to categorise the pending transactions of a batch within a range of transaction IDs.
+
+    Transactions are leased a chunk at a time, so that a redelivered or duplicate task never processes the same
+    transactions again.
+
+    :param batch_id: The batch ID of the transactions to categorise.
+    :param first_id: The first transaction ID of the range (inclusive), or None to start from the first.
+    :param last_id: The last transaction ID of the range (inclusive), or None to go to the last.
+    """
+    pending = Transaction.objects.filter(batch_id=batch_id)
+    if first_id is not None:
+        pending = pending.filter(transaction_id__gte=first_id)
+    if last_id is not None:
+        pending = pending.filter(transaction_id__lte=last_id)
+
+    while transactions := pending.claim_pending(settings.TRANSACT_CATEGORISATION_CHUNK_SIZE):
+        categorise_chunk(transactions)
+
+
+@shared_task
+def drain_pending_transactions(max_chunks: int | None = None) -> int:
+    """
+    A background task leasing and categorising chunks of pending transactions from any batch, until none are left.
+
+    Any number of these tasks can run at once, each leasing different transactions. After ``max_chunks`` chunks, the
+    task hands over to a fresh one rather than hogging its worker.
+
+    :param max_chunks: The maximum number of chunks to categorise, defaulting to TRANSACT_CATEGORISATION_DRAIN_CHUNKS.
+    :return: The number of categorised transactions.
+    """
+    max_chunks = max_chunks or settings.TRANSACT_CATEGORISATION_DRAIN_CHUNKS
+    categorised = 0
+    for _ in range(max_chunks):
+        transactions = Transaction.objects.claim_pending(settings.TRANSACT_CATEGORISATION_CHUNK_SIZE)
+        if not transactions:
+            break
+        categorise_chunk(transactions)
+        mark_finished_batches_categorised({transaction.batch_id for transaction in transactions})
+        categorised += len(transactions)
+    else:
+        drain_pending_transactions.delay(max_chunks)
+
+    return categorised
+
+
+def categorise_chunk(transactions: list[Transaction]) -> None:
+    """
+    Categorise the given leased transactions, writing back their categories and final statuses in one update.
+
+    Transactions whose lease was taken over in the meantime are left untouched.
+
+    :param transactions: Transactions leased together by ``claim_pending``.
+    """
+    lease_token = transactions[0].lease_token
+    now = timezone.now()
+    categories = categorise_descriptions(transaction.description for transaction in transactions)
+    for transaction in transactions:
+        transaction.category = categories[transaction.description]
+        if transaction.category is None:
+            transaction.ingestion_status = Transaction.IngestionStatus.FAILED
+            transaction.next_retry_at = next_retry_at(transaction.attempts, now)
+            if transaction.next_retry_at is None:
+                metrics.incr("recovery.permanently_failed")
         else:
-            logger.warning(
-                "Skipping transaction %s with status %s", transaction.transaction_id, transaction.ingestion_status
-            )
+            transaction.ingestion_status = Transaction.IngestionStatus.COMPLETED
+            transaction.next_retry_at = None
+        transaction.lease_token = None
+        transaction.updated_at = now
+
+    leased = Transaction.objects.filter(transaction_id__in=[transaction.transaction_id for transaction in transactions])
+    with DailyAccountRollup.objects.tracking(leased):
+        Transaction.objects.filter(lease_token=lease_token).bulk_update(
+            transactions, ["category", "ingestion_status", "lease_token", "next_retry_at", "updated_at"]
+        )
+
+    failed = sum(transaction.ingestion_status == Transaction.IngestionStatus.FAILED for transaction in transactions)
+    logger.info("Categorised %d transactions, %d failed", len(transactions) - failed, failed)
+
+
+def next_retry_at(attempts: int, now: datetime) -> datetime | None:
+    """
+    Return when a transaction failing after the given number of retries should be retried, backing off exponentially.
+
+    :param attempts: The number of times the transaction was already retried.
+    :param now: The time of the failure.
+    :return: The time of the next retry, or None once TRANSACT_CATEGORISATION_MAX_RETRIES are exhausted.
+    """
+    if attempts >= settings.TRANSACT_CATEGORISATION_MAX_RETRIES:
+        return None
+    delay = min(settings.TRANSACT_RETRY_BASE_DELAY * 2**attempts, settings.TRANSACT_RETRY_MAX_DELAY)
+    return now + timedelta(seconds=delay)
+
+
+@shared_task
+def recover_transactions() -> dict:
+    """
+    A periodic task putting failed transactions due for a retry, and transactions stuck in processing, back to pending.
+
+    Transactions are considered stuck once they have been processing for longer than TRANSACT_PROCESSING_TIMEOUT,
+    e.g. because their worker crashed; their lease is revoked so that a late worker cannot write them back. Recovered
+    transactions have their attempt counter incremented and are reset a chunk at a time with set-based updates, then
+    their batches are enqueued for categorisation again. Stuck transactions out of retries are marked as failed for
+    good. Staged batches inserting for as long are staged again and enqueued for materialisation, which upserts any
+    transactions their previous worker inserted as duplicates.
+
+    :return: The number of recovered and permanently failed transactions, and of restaged batches.
+    """
+    now = timezone.now()
+    stuck_before = now - timedelta(seconds=settings.TRANSACT_PROCESSING_TIMEOUT)
+    stuck = Transaction.objects.filter(
+        ingestion_status=Transaction.IngestionStatus.PROCESSING, updated_at__lt=stuck_before
+    )
+    due = Transaction.objects.filter(ingestion_status=Transaction.IngestionStatus.FAILED, next_retry_at__lte=now)
+
+    counts = {"stuck": 0, "retried": 0, "permanently_failed": 0, "restaged": 0}
+    inserting = IngestionBatch.objects.filter(status=IngestionBatch.Status.INSERTING, updated_at__lt=stuck_before)
+    for batch_id in inserting.values_list("batch_id", flat=True):
+        # Compare-and-set, so that a batch is restaged once even if recovery runs concurrently
+        if inserting.filter(batch_id=batch_id).update(status=IngestionBatch.Status.STAGED, updated_at=now):
+            materialise_batch.delay(batch_id=str(batch_id))
+            counts["restaged"] += 1
+
+    enqueued = set()
+    for name, candidates in (("stuck", stuck), ("retried", due)):
+        while rows := list(
+            candidates.values_list("transaction_id", "batch_id")[: settings.TRANSACT_CATEGORISATION_CHUNK_SIZE]
+        ):
+            transaction_ids = [transaction_id for transaction_id, _ in rows]
+            chunk = candidates.filter(transaction_id__in=transaction_ids)
+            with DailyAccountRollup.objects.tracking(Transaction.objects.filter(transaction_id__in=transaction_ids)):
+                recovered = chunk.filter(attempts__lt=settings.TRANSACT_CATEGORISATION_MAX_RETRIES).update(
+                    ingestion_status=Transaction.IngestionStatus.PENDING,
+                    lease_token=None,
+                    attempts=F("attempts") + 1,
+                    next_retry_at=None,
+                    updated_at=now,
+                )
+                # Whatever is left of the chunk is out of retries
+                exhausted = chunk.update(
+                    ingestion_status=Transaction.IngestionStatus.FAILED,
+                    lease_token=None,
+                    next_retry_at=None,
+                    updated_at=now,
+                )
+            counts[name] += recovered
+            counts["permanently_failed"] += exhausted
+
+            batch_ids = {batch_id for _, batch_id in rows} - enqueued
+            if recovered and batch_ids:
+                IngestionBatch.objects.filter(batch_id__in=batch_ids).update(categorised_at=None)
+                for batch_id in batch_ids:
+                    categorise_transactions.delay(batch_id=str(batch_id))
+                enqueued |= batch_ids
+
+    for name, count in counts.items():
+        metrics.incr(f"recovery.{name}", count)
+    if any(counts.values()):
+        logger.info("Recovered transactions: %s", counts)
+    return counts
+
+
+@shared_task
+def create_transaction_partitions() -> list[str]:
+    """
+    A periodic task creating the monthly partitions of the transactions table ``TRANSACT_PARTITION_MONTHS_AHEAD``
+    months ahead, if it is partitioned, so that new transactions never land in the default partition.
+
+    :return: The names of the created partitions.
+    """
+    if not is_partitioned():
+        return []
+    created = create_partitions(settings.TRANSACT_PARTITION_MONTHS_AHEAD)
+    if created:
+        logger.info("Created transaction partitions: %s", ", ".join(created))
+    return created
+
+
+def mark_finished_batches_categorised(batch_ids: set) -> None:
+    """
+    Mark the given batches as categorised if none of their transactions are left pending or processing.
+
+    :param batch_ids: The IDs of the batches to check.
+    """
+    unfinished = Transaction.objects.filter(
+        batch_id__in=batch_ids,
+        ingestion_status__in=[Transaction.IngestionStatus.PENDING, Transaction.IngestionStatus.PROCESSING],
+    )
+    IngestionBatch.objects.filter(batch_id__in=batch_ids, categorised_at__isnull=True).exclude(
+        batch_id__in=unfinished.values("batch_id")
+    ).update(categorised_at=timezone.now())
+
+
+@shared_task
+def mark_batch_categorised(results, batch_id: str):
+    """
+    A chord callback recording that every transaction of a batch has been categorised.
+
+    :param results: The results of the categorisation sub-tasks, unused.
+    :param batch_id: The batch ID of the categorised transactions.
+    """
+    IngestionBatch.objects.filter(batch_id=batch_id).update(categorised_at=timezone.now())
+    logger.info("Finished categorising batch %s", batch_id)
+
+
+def transaction_id_ranges(transactions: QuerySet, chunk_size: int) -> list[tuple[str, str]]:
+    """
+    Split the given transactions into disjoint, ordered ranges of at most ``chunk_size`` transaction IDs.
+
+    :param transactions: The transactions to split.
+    :param chunk_size: The maximum number of transactions per range.
+    :return: A list of ``(first_id, last_id)`` tuples, both inclusive.
+    """
+    transaction_ids = transactions.order_by("transaction_id").values_list("transaction_id", flat=True)
+    return [
+        (chunk[0], chunk[-1]) for chunk in batched(transaction_ids.iterator(chunk_size=chunk_size), chunk_size)
+    ]
+
+
+@shared_task
+def materialise_batch(batch_id: str):
+    """
+    A background task to validate and insert the rows of a batch staged by an asynchronous ingestion request.
+    Categorisation of the inserted transactions is enqueued once they are committed.
+
+    :param batch_id: The ID of the staged batch.
+    """
+    # Imported here as the ingestion module enqueues this module's tasks
+    from .ingestion import materialise_batch_payload
+
+    result = materialise_batch_payload(batch_id)
+    if result is None:
+        logger.warning("Batch %s was not materialised", batch_id)
+    else:
+        logger.info("Materialised batch %s: %s", batch_id, result)
+
+
+def categorise_descriptions(descriptions: Iterable[str]) -> dict[str, str | None]:
+    """
+    Categorise the given descriptions, only sending the ones not categorised before to the enrichment backend.
+
+    Descriptions the backend finds no category for are left to the trained classifier, if any, which categorises
+    them only when confident enough. Results are cached by normalised description under the version of the category
+    rules and of the classifier, so that any change to either invalidates them.
+
+    :param descriptions: The transaction descriptions.
+    :return: The category of each description, or None for those which could not be categorised.
+    """
+    classifier = get_classifier()
+    version = get_rule_matcher().version
+    if classifier is not None:
+        version = f"{version}+{classifier.version}"
+    keys = {description: f"{version}:{normalise_description(description)}" for description in descriptions}
+    categories = category_cache.get_many(keys.values(), partial(_categorise_cache_keys, classifier=classifier))
+    return {description: categories.get(key) for description, key in keys.items()}
+
+
+def _categorise_cache_keys(keys: list[str], classifier: NaiveBayesClassifier | None) -> dict[str, str | None]:
+    descriptions = {key: key.split(":", 1)[1] for key in keys}
+    categories = get_enrichment_backend().categorise_many(list(set(descriptions.values())))
+    if classifier is not None:
+        # Fall back behind the rules for the descriptions they found no category for, but not the ones which errored
+        misses = [description for description, category in categories.items() if category is None]
+        categories.update(classifier.categorise_many(misses, settings.TRANSACT_CLASSIFIER_THRESHOLD))
+    return {key: categories[description] for key, description in descriptions.items() if description in categories}
 
 
 def determine_transaction_category(description: str) -> str:
     """
-    Determine a transaction's category based on the given input.
+    Determine a transaction's category from the category rules stored in the database.
     Can be swapped out for a more complex ML model or external service.
 
     :param description: The transaction description.
     :return: The determined category.
     """
-    description_lower = description.lower()
-    if "amazon" in description_lower:
-        return Category.SHOPPING
-    elif "stripe" in description_lower or "paypal" in description_lower:
-        return Category.INCOME
-    elif "uber" in description_lower or "lyft" in description_lower:
-        return Category.TRANSPORT
-    elif "aws" in description_lower or "azure" in description_lower:
-        return Category.SOFTWARE
-
-    raise ValueError("Unable to determine category from description")
+    category = get_rule_matcher().match(description)
+    if category is None:
+        raise ValueError("Unable to determine category from description")
+    return category
@@ -0,0 +1,126 @@
+import json
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from transact.models import IngestionBatch, Transaction
+from transact.task import materialise_batch, recover_transactions
+
+PAYLOAD = {
+    "accounts": [{"account_id": "acc_async", "name": "Async", "type": "checking"}],
+    "transactions": [
+        {
+            "transaction_id": f"async_t{i}",
+            "account_id": "acc_async",
+            "amount": "-10.00",
+            "iso_currency_code": "USD",
+            "date": "2025-10-01T10:00:00Z",
+            "merchant_name": "Uber",
+            "name": "Uber ride",
+        }
+        for i in range(3)
+    ],
+}
+
+
+@patch("transact.ingestion.categorise_transactions.delay")
+@patch("transact.views.materialise_batch.delay")
+class AsyncIngestionTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(username="integration"))
+
+    def post_async(self, body, content_type="application/json"):
+        return self.client.post(
+            reverse("bulk-account-transactions"), data=body, content_type=content_type, HTTP_PREFER="respond-async"
+        )
+
+    def get_status(self, batch_id):
+        return self.client.get(reverse("batch-status", kwargs={"batch_id": batch_id}))
+
+    def test_payload_is_staged_then_materialised(self, mock_materialise, mock_categorise):
+        resp = self.post_async(json.dumps(PAYLOAD))
+
+        self.assertEqual(resp.status_code, 202, resp.content)
+        batch_id = resp.json()["batch_id"]
+        self.assertEqual(resp["Location"], reverse("batch-status", kwargs={"batch_id": batch_id}))
+        mock_materialise.assert_called_once_with(batch_id=batch_id)
+        self.assertFalse(Transaction.objects.exists())
+        self.assertEqual(self.get_status(batch_id).json()["status"], IngestionBatch.Status.STAGED)
+
+        materialise_batch(batch_id)
+        # Redelivered tasks leave the batch alone
+        materialise_batch(batch_id)
+
+        mock_categorise.assert_called_once_with(batch_id=batch_id)
+        status = self.get_status(batch_id).json()
+        self.assertEqual(status["status"], IngestionBatch.Status.INSERTED)
+        self.assertEqual((status["total_transactions"], status["inserted"]), (4, 3))
+        self.assertEqual(status["categorisation"], {"pending": 3, "processing": 0, "completed": 0, "failed": 0})
+        self.assertIsNone(IngestionBatch.objects.get(batch_id=batch_id).payload)
+
+    def test_invalid_payload_marks_batch_failed(self, mock_materialise, mock_categorise):
+        payload = {**PAYLOAD, "transactions": [{**PAYLOAD["transactions"][0], "amount": "abc"}]}
+        batch_id = self.post_async(json.dumps(payload)).json()["batch_id"]
+
+        materialise_batch(batch_id)
+
+        status = self.get_status(batch_id).json()
+        self.assertEqual(status["status"], IngestionBatch.Status.FAILED)
+        self.assertIn("amount", status["errors"]["transactions"][0])
+        self.assertFalse(Transaction.objects.exists())
+        mock_categorise.assert_not_called()
+
+    def test_ndjson_payload_is_materialised(self, mock_materialise, mock_categorise):
+        lines = [{"account": PAYLOAD["accounts"][0]}, *({"transaction": t} for t in PAYLOAD["transactions"])]
+        body = "\n".join(json.dumps(line) for line in lines)
+
+        with patch("transact.ingestion.categorise_transactions.delay") as mock_stream_categorise:
+            batch_id = self.post_async(body, content_type="application/x-ndjson").json()["batch_id"]
+            materialise_batch(batch_id)
+
+        mock_stream_categorise.assert_called_once_with(batch_id=batch_id)
+        self.assertEqual(Transaction.objects.filter(batch_id=batch_id).count(), 3)
+
+    def test_batches_stuck_inserting_are_staged_again(self, mock_materialise, mock_categorise):
+        batch_id = self.post_async(json.dumps(PAYLOAD)).json()["batch_id"]
+        # A worker claimed the batch, then died before recording the outcome
+        batches = IngestionBatch.objects.filter(batch_id=batch_id)
+        batches.update(status=IngestionBatch.Status.INSERTING, updated_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(recover_transactions()["restaged"], 0)
+
+        batches.update(updated_at=timezone.now() - timedelta(minutes=11))
+        mock_materialise.reset_mock()
+        self.assertEqual(recover_transactions()["restaged"], 1)
+
+        mock_materialise.assert_called_once_with(batch_id=batch_id)
+        self.assertEqual(batches.get().status, IngestionBatch.Status.STAGED)
+        materialise_batch(batch_id)
+        self.assertEqual(batches.get().status, IngestionBatch.Status.INSERTED)
+        self.assertEqual(Transaction.objects.filter(batch_id=batch_id).count(), 3)
+
+    @override_settings(TRANSACT_MAX_STAGED_BODY_SIZE=64)
+    def test_staged_payload_size_is_bounded(self, mock_materialise, mock_categorise):
+        resp = self.post_async(json.dumps(PAYLOAD))
+
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(IngestionBatch.objects.exists())
+        mock_materialise.assert_not_called()
+
+    def test_unsupported_media_type_is_rejected(self, mock_materialise, mock_categorise):
+        resp = self.post_async("accounts=1", content_type="application/x-www-form-urlencoded")
+        self.assertEqual(resp.status_code, 415)
+        mock_materialise.assert_not_called()
+
+    def test_synchronous_batches_have_a_status(self, mock_materialise, mock_categorise):
+        resp = self.client.post(reverse("bulk-account-transactions"), data=PAYLOAD, format="json")
+        self.assertEqual(resp.status_code, 201)
+
+        status = self.get_status(resp.json()["batch_id"]).json()
+        self.assertEqual(status["status"], IngestionBatch.Status.INSERTED)
+        self.assertEqual(status["categorisation"]["pending"], 3)
@@ -0,0 +1,104 @@
+import io
+import os
+import tempfile
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from transact.classifier import NaiveBayesClassifier, classifiers, hash_ngrams
+from transact.enums import Category
+from transact.models import Account, Transaction
+from transact.task import categorise_descriptions, category_cache
+
+SAMPLES = (
+    [(f"Uber trip {i}", Category.TRANSPORT) for i in range(50)]
+    + [(f"AMAZON MKTPLACE order {i}", Category.SHOPPING) for i in range(50)]
+    + [(f"ACME PAYROLL {i}", Category.INCOME) for i in range(50)]
+)
+
+
+class NaiveBayesClassifierTest(SimpleTestCase):
+    def test_ngrams_are_hashed_stably(self):
+        rows, features = hash_ngrams(["Uber", "  UBER "], 2**10, (3, 3))
+
+        # " uber " has four 3-grams, the same for both descriptions once normalised
+        np.testing.assert_array_equal(rows, [0, 0, 0, 0, 1, 1, 1, 1])
+        np.testing.assert_array_equal(features[:4], features[4:])
+        self.assertTrue(((features >= 0) & (features < 2**10)).all())
+
+    def test_descriptions_are_categorised_above_the_threshold(self):
+        classifier = NaiveBayesClassifier.fit(SAMPLES, n_features=2**12)
+
+        categories, confidence = classifier.predict(["uber eats", "amazon.com", "payroll deposit", "zz", ""])
+        self.assertEqual(categories[:3], [Category.TRANSPORT, Category.SHOPPING, Category.INCOME])
+        self.assertGreater(confidence[:3].min(), 0.9)
+        self.assertLess(confidence[3], 0.9)
+        self.assertEqual((categories[4], confidence[4]), (None, 0))
+
+        self.assertEqual(
+            classifier.categorise_many(["uber eats", "zz"], threshold=0.9),
+            {"uber eats": Category.TRANSPORT, "zz": None},
+        )
+
+    def test_saved_model_is_loaded_identically(self):
+        classifier = NaiveBayesClassifier.fit(SAMPLES, n_features=2**12)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "classifier.npz")
+            classifier.save(path)
+            loaded = NaiveBayesClassifier.load(path)
+
+        self.assertEqual((loaded.version, loaded.classes), (classifier.version, classifier.classes))
+        np.testing.assert_array_equal(loaded.predict(["uber eats"])[1], classifier.predict(["uber eats"])[1])
+
+
+@patch("transact.enrichment.time.sleep", lambda *_: None)
+class ClassifierFallbackTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        category_cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "classifier.npz")
+        settings = override_settings(TRANSACT_CLASSIFIER_PATH=self.path, TRANSACT_CLASSIFIER_THRESHOLD=0.9)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(classifiers.clear)
+
+    def test_classifier_categorises_rule_misses(self):
+        self.assertEqual(categorise_descriptions(["ACME PAYROLL March"]), {"ACME PAYROLL March": None})
+
+        NaiveBayesClassifier.fit(SAMPLES, n_features=2**12).save(self.path)
+        categories = categorise_descriptions(["ACME PAYROLL March", "Uber ride", "zz"])
+
+        # Rules take precedence, and a new model is not answered from the categories cached before it
+        self.assertEqual(
+            categories, {"ACME PAYROLL March": Category.INCOME, "Uber ride": Category.TRANSPORT, "zz": None}
+        )
+
+    def test_command_trains_from_completed_transactions(self):
+        account = Account.objects.create(account_id="acc_classifier", name="Classifier", type="checking")
+        for i, (description, category) in enumerate(SAMPLES):
+            Transaction.objects.create(
+                transaction_id=f"classifier_t{i}",
+                account=account,
+                amount=Decimal("-10.00"),
+                currency="USD",
+                date=datetime.now(ZoneInfo("UTC")),
+                description=description,
+                category=category,
+                ingestion_status=Transaction.IngestionStatus.COMPLETED,
+                batch_id=uuid.uuid4(),
+            )
+
+        stdout = io.StringIO()
+        call_command("train_classifier", features=12, stdout=stdout)
+
+        self.assertIn("Validation on", stdout.getvalue())
+        self.assertEqual(categorise_descriptions(["payroll deposit"]), {"payroll deposit": Category.INCOME})
@@ -0,0 +1,110 @@
+import gzip
+import io
+import json
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from unittest import skipIf
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from transact.middleware import zstandard
+from transact.models import Transaction
+from transact.parsers import ORJSONParser, orjson
+from transact.renderers import ORJSONRenderer
+from transact.tests.test_ingestion import account_record, to_ndjson, transaction_record
+
+
+@skipIf(orjson is None, "orjson is not installed")
+class ORJSONCodecTest(SimpleTestCase):
+    def test_rendering_matches_drf(self):
+        data = {
+            "amount": Decimal("-10.50"),
+            "date": datetime(2025, 10, 1, 10, 0, 0, 123456, tzinfo=timezone.utc),
+            "day": date(2025, 10, 1),
+            "errors": [ErrorDetail("Invalid amount.", code="invalid")],
+            "counts": {1: "one", 2: None},
+            "name": "Café     \U0001f600",
+            "nested": [{"pending": True, "ratio": 0.1}],
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_floats_are_formatted_by_orjson(self):
+        self.assertEqual(JSONRenderer().render({"ratio": 1e-7}), b'{"ratio":1e-07}')
+        self.assertEqual(ORJSONRenderer().render({"ratio": 1e-7}), b'{"ratio":1e-7}')
+
+        with self.assertRaises(ValueError):
+            JSONRenderer().render({"ratio": float("nan")})
+        rendered = ORJSONRenderer().render({"ratio": float("nan"), "max": float("inf")})
+        self.assertEqual(rendered, b'{"ratio":null,"max":null}')
+
+    def test_pretty_printing_is_left_to_drf(self):
+        data = {"amount": Decimal("1.00")}
+        context = "application/json; indent=4"
+        self.assertEqual(ORJSONRenderer().render(data, context), JSONRenderer().render(data, context))
+
+    def test_parsing_matches_drf(self):
+        for body in [b'{"amount": "1.00", "count": 12345678901234567890123}', '{"name": "Café"}'.encode()]:
+            self.assertEqual(ORJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body)))
+
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b'{"amount": NaN}'))
+
+    def test_only_wide_integers_are_parsed_by_the_standard_library(self):
+        for body in [b'{"transaction_id": "12345678901234567890123"}', b'{"count": 18446744073709551615}']:
+            with self.subTest(body=body), patch.object(JSONParser, "parse") as mock_parse:
+                self.assertEqual(ORJSONParser().parse(io.BytesIO(body)), orjson.loads(body))
+            mock_parse.assert_not_called()
+
+        data = ORJSONParser().parse(io.BytesIO(b'[-12345678901234567890123, 1e300]'))
+        self.assertEqual(data, [-12345678901234567890123, 1e300])
+        self.assertIsInstance(data[0], int)
+
+
+@patch("transact.ingestion.categorise_transactions.delay")
+class CompressedRequestTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(username="integration"))
+        self.url = reverse("bulk-account-transactions")
+        self.body = to_ndjson(
+            [account_record("acc_compressed"), transaction_record("compressed_t1", "acc_compressed")]
+        ).encode()
+
+    def post(self, body: bytes, encoding: str, content_type: str = "application/x-ndjson"):
+        return self.client.post(
+            self.url, data=body, content_type=content_type, headers={"Content-Encoding": encoding}
+        )
+
+    def test_gzip_body_is_decompressed(self, mock_delay):
+        resp = self.post(gzip.compress(self.body), "gzip")
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertTrue(Transaction.objects.filter(transaction_id="compressed_t1").exists())
+
+    @skipIf(zstandard is None, "zstandard is not installed")
+    def test_zstd_body_is_decompressed(self, mock_delay):
+        resp = self.post(zstandard.ZstdCompressor().compress(self.body), "zstd")
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertTrue(Transaction.objects.filter(transaction_id="compressed_t1").exists())
+
+    def test_json_body_is_decompressed(self, mock_delay):
+        body = json.dumps({"accounts": [], "transactions": [], "total_transactions": 0}).encode()
+        resp = self.post(gzip.compress(body), "gzip", content_type="application/json")
+        self.assertEqual(resp.status_code, 201, resp.content)
+
+    def test_invalid_bodies_are_rejected(self, mock_delay):
+        self.assertEqual(self.post(b"not gzip at all", "gzip").status_code, 400)
+        self.assertEqual(self.post(self.body, "br").status_code, 415)
+
+    @override_settings(TRANSACT_MAX_DECOMPRESSED_BODY_SIZE=64)
+    def test_decompressed_size_is_bounded(self, mock_delay):
+        resp = self.post(gzip.compress(self.body), "gzip")
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(Transaction.objects.filter(transaction_id="compressed_t1").exists())
+        mock_delay.assert_not_called()
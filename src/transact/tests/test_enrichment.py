@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import httpx
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from transact import metrics
+from transact.enrichment import AsyncHTTPBackend, get_enrichment_backend
+from transact.enums import Category
+from transact.management.commands.enrichment_stub_server import StubEnrichmentServer
+from transact.rules import RuleMatcher
+from transact.task import categorise_descriptions, category_cache
+
+
+class StubServerMixin:
+    def start_stub(self, **options) -> tuple[StubEnrichmentServer, str]:
+        """Run a stub enrichment service on a free port in a background thread, returning it and its URL."""
+        matcher = RuleMatcher([("uber", Category.TRANSPORT), ("amazon", Category.SHOPPING)])
+        stub = StubEnrichmentServer(matcher, **options)
+        loop = asyncio.new_event_loop()
+        server = loop.run_until_complete(stub.start("127.0.0.1", 0))
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+
+        def stop():
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            server.close()
+            loop.run_until_complete(server.wait_closed())
+            loop.close()
+
+        self.addCleanup(stop)
+        return stub, f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/categorise"
+
+
+class AsyncHTTPBackendTest(StubServerMixin, SimpleTestCase):
+    def setUp(self):
+        metrics.reset()
+
+    def test_requests_are_sent_concurrently(self):
+        stub, url = self.start_stub(min_latency=0.1, max_latency=0.1)
+        descriptions = [f"uber ride {i}" for i in range(20)] + [f"amazon order {i}" for i in range(19)] + ["coffee"]
+
+        started = time.perf_counter()
+        categories = AsyncHTTPBackend(url, concurrency=20).categorise_many(descriptions)
+
+        # Forty requests of 100ms each would take four seconds one after the other
+        self.assertLess(time.perf_counter() - started, 1.5)
+        self.assertEqual(stub.requests, 40)
+        self.assertEqual(categories["uber ride 3"], Category.TRANSPORT)
+        self.assertEqual(categories["amazon order 3"], Category.SHOPPING)
+        self.assertIsNone(categories["coffee"])
+
+    def test_failed_requests_are_retried_then_left_out(self):
+        stub, url = self.start_stub(min_latency=0, max_latency=0, failure_rate=1)
+
+        with self.assertLogs("transact.enrichment", "WARNING"):
+            categories = AsyncHTTPBackend(url, retries=2, backoff=0).categorise_many(["uber ride", "amazon order"])
+
+        self.assertEqual(categories, {})
+        self.assertEqual(stub.requests, 6)
+        snapshot = metrics.snapshot()
+        self.assertEqual((snapshot["enrichment.retries"], snapshot["enrichment.failures"]), (4, 2))
+
+    def test_slow_requests_time_out(self):
+        _, url = self.start_stub(min_latency=1, max_latency=1)
+
+        started = time.perf_counter()
+        with self.assertLogs("transact.enrichment", "WARNING") as logs:
+            categories = AsyncHTTPBackend(url, timeout=0.05, retries=0).categorise_many(["uber ride"])
+
+        self.assertEqual(categories, {})
+        self.assertIn("ReadTimeout", logs.output[0])
+        self.assertLess(time.perf_counter() - started, 0.5)
+
+    def test_malformed_responses_are_retried(self):
+        responses = [
+            httpx.Response(200, content=content)
+            for content in (b'{"categ', b'{"detail": "Missing"}', b'{"category": "Transport"}')
+        ]
+        backend = AsyncHTTPBackend("http://enrichment.invalid/categorise", backoff=0)
+
+        with patch.object(httpx.AsyncClient, "post", side_effect=responses) as mock_post:
+            self.assertEqual(backend.categorise_many(["uber ride"]), {"uber ride": "Transport"})
+        self.assertEqual(mock_post.call_count, 3)
+        self.assertEqual(metrics.snapshot()["enrichment.retries"], 2)
+
+    def test_negative_retries_are_rejected(self):
+        with self.assertRaises(ValueError):
+            AsyncHTTPBackend("http://enrichment.invalid/categorise", retries=-1)
+
+
+class EnrichmentBackendSettingTest(StubServerMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        category_cache.clear()
+        get_enrichment_backend.cache_clear()
+        self.addCleanup(get_enrichment_backend.cache_clear)
+
+    def test_configured_backend_categorises_descriptions(self):
+        _, url = self.start_stub(min_latency=0, max_latency=0)
+
+        with override_settings(
+            TRANSACT_ENRICHMENT_BACKEND="transact.enrichment.AsyncHTTPBackend",
+            TRANSACT_ENRICHMENT_OPTIONS={"url": url},
+        ):
+            categories = categorise_descriptions(["Uber  Ride", "Coffee"])
+
+        self.assertEqual(categories, {"Uber  Ride": Category.TRANSPORT, "Coffee": None})
@@ -0,0 +1,92 @@
+import io
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from transact.models import Account, IngestionBatch, Transaction
+from transact.tests.test_ingestion import account_record, to_ndjson, transaction_record
+
+CSV_HEADER = (
+    "transaction_id,account_id,amount,iso_currency_code,date,merchant_name,name,"
+    "account_name,account_type,account_subtype,account_mask\n"
+)
+
+
+def csv_line(transaction_id: str, account_id: str, amount: str = "-10.00") -> str:
+    return f"{transaction_id},{account_id},{amount},USD,2025-10-01T10:00:00Z,Uber,Uber ride,Import,checking,,1234\n"
+
+
+@patch("transact.ingestion.categorise_transactions.delay")
+class ImportTransactionsCommandTest(TestCase):
+    def write(self, content: str, suffix: str) -> str:
+        file = tempfile.NamedTemporaryFile("w", suffix=suffix, delete=False)
+        with file:
+            file.write(content)
+        self.addCleanup(os.unlink, file.name)
+        return file.name
+
+    def import_file(self, path: str, **options) -> str:
+        stdout = io.StringIO()
+        call_command("import_transactions", path, stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def test_csv_is_imported_in_chunks(self, mock_delay):
+        content = CSV_HEADER + "".join(csv_line(f"import_t{i}", f"acc_import_{i % 2}") for i in range(30))
+        # Chunks of about 1 KiB split the 30 lines in a few batches
+        output = self.import_file(self.write(content, ".csv"), workers=1, chunk_size=1 / 1024)
+
+        self.assertIn("Imported 30 transactions of 2 accounts", output)
+        self.assertIn("transactions/sec", output)
+        self.assertIn("Peak memory", output)
+        self.assertEqual(Transaction.objects.filter(transaction_id__startswith="import_t").count(), 30)
+        account = Account.objects.get(account_id="acc_import_1")
+        self.assertEqual((account.name, account.subtype, account.mask), ("Import", None, "1234"))
+
+        # Each chunk is its own batch, enqueued for categorisation
+        batch_count = IngestionBatch.objects.count()
+        self.assertGreater(batch_count, 1)
+        self.assertEqual(mock_delay.call_count, batch_count)
+
+    def test_ndjson_is_imported_by_worker_processes(self, mock_delay):
+        records = [account_record("acc_import_nd")]
+        records += [transaction_record(f"import_nd_t{i}", "acc_import_nd") for i in range(10)]
+        output = self.import_file(self.write(to_ndjson(records), ".ndjson"), workers=2)
+
+        self.assertIn("Imported 10 transactions of 1 accounts in 1 batches", output)
+        self.assertEqual(Transaction.objects.filter(account_id="acc_import_nd").count(), 10)
+        mock_delay.assert_called_once()
+
+        # Importing the same file again only finds duplicates
+        output = self.import_file(self.write(to_ndjson(records), ".ndjson"), workers=1)
+        self.assertIn("0 inserted, 0 updated, 10 duplicates", output)
+        mock_delay.assert_called_once()
+
+    def test_ndjson_accounts_are_upserted_before_any_transaction(self, mock_delay):
+        records = [transaction_record(f"import_late_t{i}", "acc_import_late") for i in range(10)]
+        records.append(account_record("acc_import_late"))
+        # The account comes in the last of several chunks
+        output = self.import_file(self.write(to_ndjson(records), ".ndjson"), workers=1, chunk_size=1 / 1024)
+
+        self.assertIn("Upserted 1 accounts", output)
+        self.assertEqual(Transaction.objects.filter(account_id="acc_import_late").count(), 10)
+
+    def test_transactions_of_unknown_accounts_stop_the_import(self, mock_delay):
+        records = [account_record("acc_import_known"), transaction_record("import_unknown_t1", "acc_import_known")]
+        records.append(transaction_record("import_unknown_t2", "acc_import_unknown"))
+
+        with self.assertRaisesMessage(CommandError, "unknown accounts, stopping the import: acc_import_unknown"):
+            self.import_file(self.write(to_ndjson(records), ".ndjson"), workers=1)
+        self.assertTrue(Account.objects.filter(account_id="acc_import_known").exists())
+        self.assertFalse(Transaction.objects.filter(transaction_id__startswith="import_unknown_").exists())
+        mock_delay.assert_not_called()
+
+    def test_invalid_rows_stop_the_import(self, mock_delay):
+        content = CSV_HEADER + csv_line("import_bad_t1", "acc_import_bad") + csv_line("import_bad_t2", "x", "oops")
+
+        with self.assertRaisesMessage(CommandError, "Line 3 (transactions)"):
+            self.import_file(self.write(content, ".csv"), workers=1)
+        self.assertFalse(Transaction.objects.filter(transaction_id__startswith="import_bad_").exists())
+        mock_delay.assert_not_called()
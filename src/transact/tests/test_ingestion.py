@@ -0,0 +1,169 @@
+import json
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from transact import metrics
+from transact.caching import BoundedTTLCache
+from transact.ingestion import upsert_accounts
+from transact.models import Account, Transaction
+
+
+def to_ndjson(records: list[dict]) -> str:
+    return "\n".join(json.dumps(record) for record in records) + "\n"
+
+
+def account_record(account_id: str) -> dict:
+    return {"account": {"account_id": account_id, "name": "Stream", "type": "checking", "subtype": None, "mask": "1234"}}
+
+
+def transaction_record(transaction_id: str, account_id: str, amount: str = "-10.00") -> dict:
+    return {
+        "transaction": {
+            "transaction_id": transaction_id,
+            "account_id": account_id,
+            "amount": amount,
+            "iso_currency_code": "USD",
+            "date": "2025-10-01T10:00:00Z",
+            "merchant_name": "Uber",
+            "name": "Uber ride",
+        }
+    }
+
+
+@patch("transact.ingestion.categorise_transactions.delay")
+class StreamingIngestionViewTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(username="integration"))
+        self.url = reverse("bulk-account-transactions")
+
+    def post_ndjson(self, records: list[dict]):
+        return self.client.post(self.url, data=to_ndjson(records), content_type="application/x-ndjson")
+
+    @override_settings(TRANSACT_INGESTION_CHUNK_SIZE=2)
+    def test_stream_is_ingested_in_chunks_under_one_batch(self, mock_delay):
+        records = [account_record("acc_stream_1")]
+        records += [transaction_record(f"stream_t{i}", "acc_stream_1") for i in range(5)]
+
+        with patch("transact.loaders.Transaction.objects.bulk_create", wraps=Transaction.objects.bulk_create) as spy:
+            resp = self.post_ndjson(records)
+
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertEqual(resp.json()["total_transactions"], 6)
+
+        # Five transactions with a chunk size of two are written in three inserts
+        self.assertEqual(spy.call_count, 3)
+
+        batch_id = resp.json()["batch_id"]
+        self.assertEqual(Transaction.objects.filter(batch_id=batch_id).count(), 5)
+        self.assertTrue(Account.objects.filter(account_id="acc_stream_1").exists())
+        mock_delay.assert_called_once_with(batch_id=batch_id)
+
+    @override_settings(TRANSACT_INGESTION_CHUNK_SIZE=2)
+    def test_invalid_row_rolls_back_the_whole_stream(self, mock_delay):
+        records = [account_record("acc_stream_2")]
+        records += [transaction_record(f"stream_bad_t{i}", "acc_stream_2") for i in range(3)]
+        records.append(transaction_record("stream_bad_t3", "acc_stream_2", amount="not-a-number"))
+
+        resp = self.post_ndjson(records)
+
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("amount", resp.json()["transactions"]["5"])
+        self.assertFalse(Transaction.objects.filter(transaction_id__startswith="stream_bad_").exists())
+        self.assertFalse(Account.objects.filter(account_id="acc_stream_2").exists())
+        mock_delay.assert_not_called()
+
+    def test_malformed_lines_are_rejected(self, mock_delay):
+        resp = self.client.post(self.url, data='{"account": \n', content_type="application/x-ndjson")
+        self.assertEqual(resp.status_code, 400)
+
+        resp = self.post_ndjson([{"ledger": {}}])
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("non_field_errors", resp.json())
+        mock_delay.assert_not_called()
+
+
+# The local-memory cache of the tests stands in for a cache shared by every process
+@patch("transact.ingestion.is_shared_cache", return_value=True)
+class AccountUpsertTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+
+    def account(self, **overrides) -> dict:
+        account = {"account_id": "acc_upsert", "name": "Upsert", "type": "checking", "subtype": None, "mask": "1111"}
+        return {**account, **overrides}
+
+    def test_changed_accounts_are_updated(self, mock_shared):
+        upsert_accounts([self.account()])
+        upsert_accounts([self.account(name="Renamed", mask="2222"), self.account(account_id="acc_upsert_2")])
+
+        account = Account.objects.get(account_id="acc_upsert")
+        self.assertEqual((account.name, account.mask), ("Renamed", "2222"))
+        self.assertTrue(Account.objects.filter(account_id="acc_upsert_2").exists())
+
+    def test_known_accounts_skip_the_database(self, mock_shared):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertNumQueries(1):
+                upsert_accounts([self.account()])
+
+        with self.assertNumQueries(0):
+            upsert_accounts([self.account()])
+
+        # A changed account is upserted again
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(1):
+            upsert_accounts([self.account(subtype="personal")])
+        self.assertEqual(Account.objects.get(account_id="acc_upsert").subtype, "personal")
+
+        snapshot = metrics.snapshot()
+        self.assertEqual((snapshot["known_accounts.hits"], snapshot["known_accounts.misses"]), (1, 2))
+        self.assertAlmostEqual(snapshot["known_accounts.hit_rate"], 1 / 3)
+
+    def test_accounts_changed_by_another_process_are_upserted_again(self, mock_shared):
+        for account in (self.account(), self.account(name="Elsewhere"), self.account()):
+            with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(1):
+                upsert_accounts([account])
+
+        self.assertEqual(Account.objects.get(account_id="acc_upsert").name, "Upsert")
+
+    def test_process_local_caches_are_not_trusted(self, mock_shared):
+        mock_shared.return_value = False
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(1):
+                upsert_accounts([self.account()])
+
+        self.assertNotIn("known_accounts.hits", metrics.snapshot())
+
+    def test_rolled_back_accounts_are_not_remembered(self, mock_shared):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    upsert_accounts([self.account()])
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+
+        self.assertEqual(callbacks, [])
+        self.assertIsNone(cache.get("known_account:acc_upsert"))
+
+
+class BoundedTTLCacheTest(SimpleTestCase):
+    def test_entries_are_bounded_and_expire(self):
+        cache = BoundedTTLCache("test_cache", maxsize=2, ttl=60)
+        cache.set_many({"a": 1, "b": 2})
+        cache.get("a")
+        cache.set("c", 3)
+
+        # "b" was the least recently used entry
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), (1, None, 3))
+
+        with patch("transact.caching.time.monotonic", return_value=time.monotonic() + 61):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 1)
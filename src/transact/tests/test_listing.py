@@ -0,0 +1,109 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from transact.models import Account
+from transact.tests.test_reports import create_transaction
+
+utc = ZoneInfo("UTC")
+
+
+class AccountTransactionsTestCase(TestCase):
+    def setUp(self):
+        self.account = Account.objects.create(account_id="acc_listing", name="Listing", type="checking")
+        other = Account.objects.create(account_id="acc_other", name="Other", type="checking")
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(username="reconciliation"))
+        start = datetime(2025, 10, 1, tzinfo=utc)
+        # Three transactions a day, so that pages end in the middle of a day
+        for i in range(25):
+            create_transaction(self.account, f"listing_{i:02}", f"-{i}.25", start + timedelta(days=i // 3))
+        create_transaction(other, "listing_other", "-1.00", start)
+        create_transaction(self.account, "listing_late", "-1.00", datetime(2025, 11, 1, tzinfo=utc))
+        self.params = {"start_date": "2025-10-01", "end_date": "2025-10-31"}
+
+
+class TransactionListingTest(AccountTransactionsTestCase):
+    def test_pages_follow_date_and_transaction_id(self):
+        url = reverse("account-transactions", kwargs={"account_id": "acc_listing"})
+        params = {**self.params, "page_size": 10}
+        transaction_ids = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                page = self.client.get(url, params).json()
+            # A single query, loading only the fields listed
+            self.assertEqual(len(queries), 1)
+            self.assertNotIn("lease_token", queries[0]["sql"])
+            self.assertLessEqual(len(page["results"]), 10)
+            transaction_ids += [row["transaction_id"] for row in page["results"]]
+            url, params = page["next"], None
+
+        self.assertEqual(transaction_ids, [f"listing_{i:02}" for i in range(25)])
+
+    def test_rows_are_named_as_ingested(self):
+        url = reverse("account-transactions", kwargs={"account_id": "acc_listing"})
+
+        row = self.client.get(url, self.params).json()["results"][1]
+
+        self.assertEqual(
+            row,
+            {
+                "transaction_id": "listing_01",
+                "account_id": "acc_listing",
+                "amount": "-1.25",
+                "iso_currency_code": "USD",
+                "date": "2025-10-01T00:00:00Z",
+                "merchant_name": None,
+                "name": "Uber ride",
+                "category": None,
+                "ingestion_status": "pending",
+            },
+        )
+
+    def test_invalid_requests(self):
+        url = reverse("account-transactions", kwargs={"account_id": "acc_listing"})
+
+        self.assertEqual(self.client.get(url, {**self.params, "cursor": "not-a-cursor"}).status_code, 404)
+        self.assertEqual(self.client.get(url, {"end_date": "2025-10-31"}).status_code, 400)
+
+
+class TransactionExportTest(AccountTransactionsTestCase):
+    def export(self, **params):
+        url = reverse("account-transactions-export", kwargs={"account_id": "acc_listing"})
+        response = self.client.get(url, {**self.params, **params})
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content).decode()
+
+    def listing(self) -> list[dict]:
+        url = reverse("account-transactions", kwargs={"account_id": "acc_listing"})
+        return self.client.get(url, {**self.params, "page_size": 100}).json()["results"]
+
+    @override_settings(TRANSACT_EXPORT_CHUNK_SIZE=7)
+    def test_csv_export(self):
+        response, content = self.export()
+
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertIn('filename="acc_listing_2025-10-01_2025-10-31.csv"', response["Content-Disposition"])
+        expected = [{key: "" if value is None else value for key, value in row.items()} for row in self.listing()]
+        self.assertEqual(list(csv.DictReader(io.StringIO(content))), expected)
+
+    @override_settings(TRANSACT_EXPORT_CHUNK_SIZE=7)
+    def test_ndjson_export(self):
+        response, content = self.export(output="ndjson")
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual([json.loads(line) for line in content.splitlines()], self.listing())
+
+    def test_invalid_output(self):
+        url = reverse("account-transactions-export", kwargs={"account_id": "acc_listing"})
+
+        self.assertEqual(self.client.get(url, {**self.params, "output": "xlsx"}).status_code, 400)
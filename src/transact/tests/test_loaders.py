@@ -0,0 +1,129 @@
+import csv
+import io
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+
+from transact.loaders import BulkCreateLoader, CopyLoader, _IterableStream, get_transaction_loader
+from transact.models import Account, Transaction
+
+tz = ZoneInfo("UTC")
+
+
+def validated_row(transaction_id: str, amount: str = "-10.00", merchant_name: str | None = "Uber") -> dict:
+    return {
+        "transaction_id": transaction_id,
+        "account_id": "acc_loader",
+        "amount": Decimal(amount),
+        "currency": "USD",
+        "date": datetime(2025, 10, 1, 10, tzinfo=tz),
+        "merchant_name": merchant_name,
+        "description": "Uber ride",
+    }
+
+
+class LoaderSelectionTest(TestCase):
+    @override_settings(TRANSACT_COPY_LOADER_THRESHOLD=100)
+    def test_copy_loader_is_only_used_on_postgresql_above_threshold(self):
+        self.assertIsInstance(get_transaction_loader(99), BulkCreateLoader)
+
+        with patch.object(connection, "vendor", "postgresql"):
+            self.assertIsInstance(get_transaction_loader(99), BulkCreateLoader)
+            self.assertIsInstance(get_transaction_loader(100), CopyLoader)
+
+        with patch.object(connection, "vendor", "sqlite"):
+            self.assertIsInstance(get_transaction_loader(100_000), BulkCreateLoader)
+
+    def test_copy_rows_tell_nulls_and_blanks_apart(self):
+        rows = [validated_row("t1", merchant_name=None), validated_row("t2", merchant_name="")]
+        stream = _IterableStream(CopyLoader()._encode(["transaction_id", "merchant_name", "amount"], rows))
+
+        lines = stream.read().decode().splitlines()
+        self.assertEqual(lines, ['"t1",,"-10.00","0"', '"t2","","-10.00","1"'])
+        self.assertEqual(list(csv.reader(io.StringIO(lines[1]))), [["t2", "", "-10.00", "1"]])
+
+
+class TransactionLoaderTestMixin:
+    loader_class = None
+
+    def setUp(self):
+        Account.objects.create(account_id="acc_loader", name="Loader", type="checking")
+
+    def test_load_upserts_by_transaction_id(self):
+        loader = self.loader_class()
+        first_batch, second_batch = str(uuid.uuid4()), str(uuid.uuid4())
+
+        result = loader.load([validated_row("load_t1"), validated_row("load_t2")], first_batch)
+        self.assertEqual((result.inserted, result.updated, result.duplicates), (2, 0, 0))
+
+        rows = [
+            validated_row("load_t1"),
+            validated_row("load_t2", amount="-1.00"),
+            validated_row("load_t2", amount="-20.00"),
+            validated_row("load_t3", merchant_name=None),
+        ]
+        result = loader.load(rows, second_batch)
+        self.assertEqual((result.inserted, result.updated, result.duplicates), (1, 1, 2))
+
+        t2 = Transaction.objects.get(transaction_id="load_t2")
+        t3 = Transaction.objects.get(transaction_id="load_t3")
+        self.assertEqual(t2.amount, Decimal("-20.00"))
+        self.assertEqual(str(t2.batch_id), first_batch)
+        self.assertEqual(str(t3.batch_id), second_batch)
+        self.assertIsNone(t3.merchant_name)
+        self.assertEqual(t3.ingestion_status, Transaction.IngestionStatus.PENDING)
+
+    def test_changed_description_is_categorised_again(self):
+        loader = self.loader_class()
+        first_batch, second_batch = str(uuid.uuid4()), str(uuid.uuid4())
+        loader.load([validated_row("load_t1"), validated_row("load_t2")], first_batch)
+        Transaction.objects.update(category="Transport", ingestion_status=Transaction.IngestionStatus.COMPLETED)
+
+        rows = [{**validated_row("load_t1"), "description": "Uber Eats"}, validated_row("load_t2", amount="-2.00")]
+        result = loader.load(rows, second_batch)
+        self.assertEqual((result.inserted, result.updated, result.duplicates), (0, 2, 0))
+
+        t1 = Transaction.objects.get(transaction_id="load_t1")
+        t2 = Transaction.objects.get(transaction_id="load_t2")
+        self.assertEqual((t1.description, str(t1.batch_id), t1.category), ("Uber Eats", second_batch, None))
+        self.assertEqual(t1.ingestion_status, Transaction.IngestionStatus.PENDING)
+        self.assertEqual((t2.amount, str(t2.batch_id), t2.category), (Decimal("-2.00"), first_batch, "Transport"))
+        self.assertEqual(t2.ingestion_status, Transaction.IngestionStatus.COMPLETED)
+
+
+class BulkCreateLoaderTest(TransactionLoaderTestMixin, TestCase):
+    loader_class = BulkCreateLoader
+
+
+@skipUnless(connection.vendor == "postgresql", "COPY is only available on PostgreSQL")
+class CopyLoaderTest(TransactionLoaderTestMixin, TestCase):
+    loader_class = CopyLoader
+
+    def test_staging_table_is_reused_within_a_transaction(self):
+        loader = self.loader_class()
+        first_batch, second_batch = str(uuid.uuid4()), str(uuid.uuid4())
+
+        with transaction.atomic():
+            first = loader.load([validated_row("load_t1"), validated_row("load_t2")], first_batch)
+            second = loader.load([validated_row("load_t2", amount="-3.00"), validated_row("load_t3")], second_batch)
+
+        self.assertEqual((first.inserted, first.updated, first.duplicates), (2, 0, 0))
+        self.assertEqual((second.inserted, second.updated, second.duplicates), (1, 1, 0))
+        rows = Transaction.objects.order_by("transaction_id")
+        self.assertEqual(
+            list(rows.values_list("transaction_id", "amount", "batch_id")),
+            [
+                ("load_t1", Decimal("-10.00"), uuid.UUID(first_batch)),
+                ("load_t2", Decimal("-3.00"), uuid.UUID(first_batch)),
+                ("load_t3", Decimal("-10.00"), uuid.UUID(second_batch)),
+            ],
+        )
+        # Columns which are not staged take the defaults of new transactions
+        self.assertFalse(rows.filter(created_at__isnull=True).exists())
+        self.assertEqual(set(rows.values_list("ingestion_status", "attempts")), {("pending", 0)})
@@ -0,0 +1,180 @@
+import csv
+import gzip
+import io
+import tempfile
+import threading
+import time
+import uuid
+from datetime import date, datetime
+from pathlib import Path
+from unittest import skipIf, skipUnless
+from zoneinfo import ZoneInfo
+
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from transact import partitions
+from transact.loaders import BulkCreateLoader, CopyLoader
+from transact.models import Account, DailyAccountRollup, Transaction
+from transact.partitions import month_bounds, monthly_partitions, partition_name
+from transact.tests.test_loaders import validated_row
+from transact.tests.test_reports import create_transaction
+
+utc = ZoneInfo("UTC")
+
+
+class PartitionNamingTest(SimpleTestCase):
+    @override_settings(TIME_ZONE="Europe/Paris")
+    def test_partitions_span_months_of_the_time_zone(self):
+        paris = ZoneInfo("Europe/Paris")
+
+        self.assertEqual(partition_name(date(2025, 3, 1)), "transact_transaction_p2025_03")
+        self.assertEqual(
+            month_bounds(date(2025, 12, 15)),
+            (datetime(2025, 12, 1, tzinfo=paris), datetime(2026, 1, 1, tzinfo=paris)),
+        )
+
+
+@skipIf(connection.vendor == "postgresql", "Partitioning is available on PostgreSQL")
+class UnpartitionedCommandsTest(TestCase):
+    def test_commands_require_a_partitioned_table(self):
+        with self.assertRaisesMessage(CommandError, "not partitioned"):
+            call_command("create_partitions", stdout=io.StringIO())
+        with tempfile.TemporaryDirectory() as directory, self.assertRaisesMessage(CommandError, "not partitioned"):
+            call_command("archive_partitions", before="2025-10", output_dir=directory, stdout=io.StringIO())
+
+    def test_only_past_months_can_be_archived(self):
+        for before in ("October", "2999-01"):
+            with self.subTest(before=before), self.assertRaises(CommandError):
+                call_command("archive_partitions", before=before, output_dir=".", stdout=io.StringIO())
+
+
+@skipUnless(connection.vendor == "postgresql", "Partitioning is only available on PostgreSQL")
+class PartitionedTransactionsTest(TestCase):
+    """The transactions table is partitioned within each test, which rolls the conversion back."""
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            # Deferred foreign key checks of rows written within the transaction would prevent altering their table
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        self.account = Account.objects.create(account_id="acc_loader", name="Partitioned", type="checking")
+        create_transaction(self.account, "partition_sep", "-5.00", datetime(2025, 9, 30, 23, tzinfo=utc))
+        create_transaction(self.account, "partition_oct", "-7.00", datetime(2025, 10, 1, tzinfo=utc))
+
+        with connection.schema_editor() as schema_editor:
+            partitions.partition_table(schema_editor, Transaction)
+
+    def partition_of(self, transaction_id: str) -> str:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT tableoid::regclass::text FROM transact_transaction WHERE transaction_id = %s", [transaction_id]
+            )
+            return cursor.fetchone()[0]
+
+    def test_rows_are_copied_to_monthly_partitions(self):
+        self.assertTrue(partitions.is_partitioned())
+        months = monthly_partitions()
+        self.assertEqual(min(months), date(2025, 9, 1))
+        self.assertTrue(all(months.values()))
+        self.assertEqual(self.partition_of("partition_sep"), "transact_transaction_p2025_09")
+        self.assertEqual(self.partition_of("partition_oct"), "transact_transaction_p2025_10")
+
+    def test_summaries_are_pruned_to_the_partitions_of_their_period(self):
+        summary = Transaction.objects.filter(account_id="acc_loader").in_period(date(2025, 10, 1), date(2025, 10, 31))
+
+        plan = summary.explain()
+
+        self.assertIn("transact_transaction_p2025_10", plan)
+        self.assertNotIn("transact_transaction_p2025_09", plan)
+        self.assertEqual(list(summary.values_list("transaction_id", flat=True)), ["partition_oct"])
+
+    def test_loaders_move_transactions_whose_date_changed(self):
+        for loader in (BulkCreateLoader(), CopyLoader()):
+            with self.subTest(loader=type(loader).__name__):
+                moved = {**validated_row("partition_sep"), "date": datetime(2025, 10, 2, tzinfo=utc)}
+                new = validated_row(f"partition_new_{type(loader).__name__}")
+
+                result = loader.load([moved, new], str(uuid.uuid4()))
+                self.assertEqual((result.inserted, result.updated, result.duplicates), (1, 1, 0))
+                self.assertEqual(self.partition_of("partition_sep"), "transact_transaction_p2025_10")
+                self.assertEqual(Transaction.objects.filter(transaction_id="partition_sep").count(), 1)
+
+                result = loader.load([moved, new], str(uuid.uuid4()))
+                self.assertEqual((result.inserted, result.updated, result.duplicates), (0, 0, 2))
+                Transaction.objects.filter(pk="partition_sep").update(date=datetime(2025, 9, 30, tzinfo=utc))
+
+    def test_new_partitions_take_over_the_transactions_of_their_month_from_the_default_partition(self):
+        far = partitions.current_month().replace(year=partitions.current_month().year + 2)
+        create_transaction(self.account, "partition_far", "-1.00", month_bounds(far)[0])
+        self.assertEqual(self.partition_of("partition_far"), "transact_transaction_default")
+
+        call_command("create_partitions", months=24, stdout=io.StringIO())
+
+        self.assertEqual(self.partition_of("partition_far"), partition_name(far))
+        self.assertEqual(partitions.claim_transaction_ids(["partition_far"]), set())
+        self.assertEqual(partitions.create_partitions(24), [])
+
+    def test_archive_exports_and_drops_old_partitions(self):
+        rollups = DailyAccountRollup.objects.filter(account_id="acc_loader")
+        spend = sorted(rollups.values_list("day", "spend"))
+
+        with tempfile.TemporaryDirectory() as directory:
+            call_command(
+                "archive_partitions", before="2025-10", output_dir=directory, compression="gzip", stdout=io.StringIO()
+            )
+
+            with gzip.open(Path(directory) / "transact_transaction_p2025_09.csv.gz", "rt") as file:
+                rows = list(csv.DictReader(file))
+        self.assertEqual([row["transaction_id"] for row in rows], ["partition_sep"])
+        self.assertNotIn(date(2025, 9, 1), monthly_partitions())
+        self.assertEqual(list(Transaction.objects.values_list("transaction_id", flat=True)), ["partition_oct"])
+        # Summaries of archived months are still answered from the rollups, which rebuilding keeps
+        self.assertEqual(sorted(rollups.values_list("day", "spend")), spend)
+        DailyAccountRollup.objects.rebuild(["acc_loader"])
+        self.assertEqual(sorted(rollups.values_list("day", "spend")), spend)
+
+
+@skipUnless(connection.vendor == "postgresql", "Partitioning is only available on PostgreSQL")
+class ConcurrentRedeliveryTest(TransactionTestCase):
+    """Concurrent loads of a transaction under different dates leave a single row, as the unpartitioned table would."""
+
+    def setUp(self):
+        account = Account.objects.create(account_id="acc_loader", name="Partitioned", type="checking")
+        create_transaction(account, "concurrent_seed", "-1.00", datetime(2025, 9, 1, tzinfo=utc))
+        with connection.schema_editor() as schema_editor:
+            partitions.partition_table(schema_editor, Transaction)
+        self.addCleanup(self.unpartition)
+
+    def unpartition(self):
+        with connection.schema_editor() as schema_editor:
+            partitions.unpartition_table(schema_editor, Transaction)
+
+    def test_redelivery_under_another_date_updates_the_first_delivery(self):
+        for loader_class in (BulkCreateLoader, CopyLoader):
+            with self.subTest(loader=loader_class.__name__):
+                transaction_id = f"concurrent_{loader_class.__name__}"
+                first = {**validated_row(transaction_id), "date": datetime(2025, 9, 15, tzinfo=utc)}
+                second = {**validated_row(transaction_id), "date": datetime(2025, 10, 15, tzinfo=utc)}
+                claimed = threading.Event()
+
+                def deliver_first():
+                    try:
+                        with transaction.atomic():
+                            loader_class().load([first], str(uuid.uuid4()))
+                            claimed.set()
+                            # Holds on to the claim while the second delivery runs into it
+                            time.sleep(0.5)
+                    finally:
+                        connection.close()
+
+                thread = threading.Thread(target=deliver_first)
+                thread.start()
+                self.assertTrue(claimed.wait(5))
+                with transaction.atomic():
+                    result = loader_class().load([second], str(uuid.uuid4()))
+                thread.join()
+
+                self.assertEqual((result.inserted, result.updated, result.duplicates), (0, 1, 0))
+                rows = Transaction.objects.filter(transaction_id=transaction_id)
+                self.assertEqual(list(rows.values_list("date", flat=True)), [second["date"]])
@@ -0,0 +1,494 @@
+import io
+import threading
+import time
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from transact import metrics
+from transact.ingestion import ingest_batch, upsert_transactions
+from transact.models import Account, DailyAccountRollup, Transaction
+from transact.task import drain_pending_transactions
+from transact.tests.test_loaders import validated_row
+from transact.versions import get_account_version
+
+utc = ZoneInfo("UTC")
+
+
+def create_transaction(account: Account, transaction_id: str, amount: str, when: datetime, **fields) -> Transaction:
+    fields.setdefault("description", "Uber ride")
+    return Transaction.objects.create(
+        transaction_id=transaction_id,
+        account=account,
+        amount=Decimal(amount),
+        currency="USD",
+        date=when,
+        batch_id=uuid.uuid4(),
+        **fields,
+    )
+
+
+class AccountSummaryTest(TestCase):
+    def setUp(self):
+        self.account = Account.objects.create(account_id="acc_summary", name="Summary", type="checking")
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(username="reports"))
+
+    def test_period_includes_whole_days(self):
+        create_transaction(self.account, "summary_before", "-1.00", datetime(2025, 9, 30, 23, 59, 59, tzinfo=utc))
+        create_transaction(self.account, "summary_first", "-2.00", datetime(2025, 10, 1, tzinfo=utc))
+        create_transaction(self.account, "summary_last", "5.00", datetime(2025, 10, 31, 23, 59, 59, 999999, tzinfo=utc))
+        create_transaction(self.account, "summary_after", "-8.00", datetime(2025, 11, 1, tzinfo=utc))
+
+        summary = Transaction.objects.account_summary("acc_summary", date(2025, 10, 1), date(2025, 10, 31))
+
+        self.assertEqual(summary["metrics"]["total_transactions"], 2)
+        self.assertEqual(summary["metrics"]["total_spend"], Decimal("2.00"))
+        self.assertEqual(summary["metrics"]["total_income"], Decimal("5.00"))
+        self.assertEqual(summary["processing_status"]["pending"], 2)
+
+    @override_settings(TIME_ZONE="America/New_York")
+    def test_days_are_those_of_the_current_timezone(self):
+        # 02:00 UTC on 1 October is still 30 September in New York
+        create_transaction(self.account, "summary_tz", "-3.00", datetime(2025, 10, 1, 2, tzinfo=utc))
+
+        summary = Transaction.objects.account_summary("acc_summary", date(2025, 9, 30), date(2025, 9, 30))
+        self.assertEqual(summary["metrics"]["total_transactions"], 1)
+        summary = Transaction.objects.account_summary("acc_summary", date(2025, 10, 1), date(2025, 10, 1))
+        self.assertEqual(summary["metrics"]["total_transactions"], 0)
+
+    def test_summary_is_folded_from_a_single_query(self):
+        day = datetime(2025, 10, 10, tzinfo=utc)
+        create_transaction(self.account, "summary_t1", "-10.00", day, category="Transport")
+        create_transaction(self.account, "summary_t2", "-5.00", day, category="Transport", ingestion_status="failed")
+        create_transaction(self.account, "summary_t3", "-40.00", day, category="Shopping", ingestion_status="completed")
+        create_transaction(self.account, "summary_t4", "2500.00", day, category="Income", ingestion_status="completed")
+        create_transaction(self.account, "summary_t5", "-1.00", day)
+
+        with self.assertNumQueries(1):
+            summary = Transaction.objects.account_summary("acc_summary", date(2025, 10, 1), date(2025, 10, 31))
+
+        # Categories are ranked by their negative spend, descending, so the ones which spent least come first. The
+        # ones without spend are placed wherever the database sorts nulls.
+        spending = [
+            {"category": "Transport", "total_spend": Decimal("15.00"), "transaction_count": 2},
+            {"category": "Shopping", "total_spend": Decimal("40.00"), "transaction_count": 1},
+        ]
+        income = {"category": "Income", "total_spend": Decimal("0.00"), "transaction_count": 1}
+        top_categories = [income, *spending] if connection.features.nulls_order_largest else [*spending, income]
+
+        self.assertEqual(
+            summary,
+            {
+                "account_id": "acc_summary",
+                "date_range": {"start": date(2025, 10, 1), "end": date(2025, 10, 31)},
+                "metrics": {
+                    "total_transactions": 5,
+                    "total_spend": Decimal("56.00"),
+                    "total_income": Decimal("2500.00"),
+                    "net": Decimal("2444.00"),
+                },
+                "top_categories": top_categories,
+                "processing_status": {"pending": 2, "processing": 0, "completed": 2, "failed": 1},
+            },
+        )
+
+    def test_summary_endpoint(self):
+        create_transaction(self.account, "summary_api", "-4.50", datetime(2025, 10, 5, tzinfo=utc), category="Travel")
+
+        response = self.client.get(
+            reverse("account-summary", kwargs={"account_id": "acc_summary"}),
+            {"start_date": "2025-10-01", "end_date": "2025-10-31"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["top_categories"][0]["category"], "Travel")
+
+
+@patch("transact.ingestion.categorise_transactions.delay")
+class DailyAccountRollupTest(TestCase):
+    """Rollups answer summaries exactly as the transactions would, whatever happened to the transactions."""
+
+    def assertSummariesMatch(self, start_date=date(2025, 9, 1), end_date=date(2025, 11, 30)):
+        self.assertEqual(
+            Transaction.objects.account_summary("acc_rollup", start_date, end_date),
+            Transaction.objects.summarise_transactions("acc_rollup", start_date, end_date),
+        )
+
+    def ingest(self, *transactions: tuple[str, str, str]):
+        ingest_batch(
+            [{"account_id": "acc_rollup", "name": "Rollup", "type": "checking"}],
+            [
+                {
+                    "transaction_id": transaction_id,
+                    "account_id": "acc_rollup",
+                    "amount": Decimal(amount),
+                    "currency": "USD",
+                    "date": datetime.fromisoformat(when),
+                    "description": description,
+                }
+                for transaction_id, amount, when, description in transactions
+            ],
+        )
+
+    @patch("transact.enrichment.time.sleep", lambda *_: None)
+    def test_rollups_follow_ingestion_and_categorisation(self, mock_delay):
+        self.ingest(
+            ("rollup_t1", "-10.00", "2025-10-01T10:00:00+00:00", "Uber ride"),
+            ("rollup_t2", "-20.00", "2025-10-01T23:30:00+00:00", "Amazon order"),
+            ("rollup_t3", "1000.00", "2025-10-02T09:00:00+00:00", "Stripe payout"),
+            ("rollup_t4", "-5.00", "2025-10-03T09:00:00+00:00", "Coffee"),
+        )
+        self.assertSummariesMatch()
+        self.assertEqual(DailyAccountRollup.objects.filter(account_id="acc_rollup").count(), 3)
+
+        # A redelivery moving a transaction to another day and changing its amount
+        self.ingest(("rollup_t1", "-12.50", "2025-10-05T10:00:00+00:00", "Uber ride"))
+        self.assertSummariesMatch()
+
+        self.assertEqual(drain_pending_transactions(), 4)
+        self.assertSummariesMatch()
+        self.assertSummariesMatch(date(2025, 10, 1), date(2025, 10, 1))
+
+        summary = Transaction.objects.account_summary("acc_rollup", date(2025, 10, 1), date(2025, 10, 31))
+        self.assertEqual(summary["processing_status"], {"pending": 0, "processing": 0, "completed": 3, "failed": 1})
+        self.assertEqual(summary["metrics"]["total_spend"], Decimal("37.50"))
+
+        Transaction.objects.get(transaction_id="rollup_t2").delete()
+        self.assertSummariesMatch()
+
+    def test_rebuild_command(self, mock_delay):
+        self.ingest(("rollup_t1", "-10.00", "2025-10-01T10:00:00+00:00", "Uber ride"))
+        # Writes outside of the ORM instances and loaders are not tracked
+        Transaction.objects.filter(transaction_id="rollup_t1").update(amount=Decimal("-99.00"), category="Transport")
+        DailyAccountRollup.objects.create(account_id="acc_rollup", day=date(2025, 9, 1), ingestion_status="pending")
+
+        stdout = io.StringIO()
+        call_command("rebuild_rollups", "--account", "acc_rollup", stdout=stdout)
+
+        self.assertIn("Rebuilt 1 rollups", stdout.getvalue())
+        self.assertSummariesMatch()
+
+    @override_settings(TIME_ZONE="UTC")
+    def test_summaries_in_another_timezone_are_answered_from_transactions(self, mock_delay):
+        self.ingest(("rollup_t1", "-10.00", "2025-10-01T02:00:00+00:00", "Uber ride"))
+
+        with timezone.override("America/New_York"):
+            summary = Transaction.objects.account_summary("acc_rollup", date(2025, 9, 30), date(2025, 9, 30))
+        self.assertEqual(summary["metrics"]["total_transactions"], 1)
+
+
+@skipUnless(connection.vendor == "postgresql", "Concurrent deliveries only wait for each other on PostgreSQL")
+class ConcurrentRollupTest(TransactionTestCase):
+    """Concurrent deliveries of the same new transactions count them in the rollups once."""
+
+    def setUp(self):
+        Account.objects.create(account_id="acc_loader", name="Concurrent", type="checking")
+
+    def test_concurrent_deliveries_count_new_transactions_once(self):
+        # Both the BulkCreateLoader and the CopyLoader
+        for threshold in (1000, 1):
+            with self.subTest(threshold=threshold), override_settings(TRANSACT_COPY_LOADER_THRESHOLD=threshold):
+                rows = [validated_row(f"concurrent_{threshold}_{i}") for i in range(3)]
+                delivered = threading.Event()
+
+                def deliver_first():
+                    try:
+                        with transaction.atomic():
+                            upsert_transactions(rows, str(uuid.uuid4()))
+                            delivered.set()
+                            # Holds on to its transactions while the second delivery runs into them
+                            time.sleep(0.5)
+                    finally:
+                        connection.close()
+
+                thread = threading.Thread(target=deliver_first)
+                thread.start()
+                self.assertTrue(delivered.wait(5))
+                with transaction.atomic():
+                    result = upsert_transactions(rows, str(uuid.uuid4()))
+                thread.join()
+
+                self.assertEqual((result.inserted, result.duplicates), (0, 3))
+                start_date = end_date = date(2025, 10, 1)
+                self.assertEqual(
+                    Transaction.objects.account_summary("acc_loader", start_date, end_date),
+                    Transaction.objects.summarise_transactions("acc_loader", start_date, end_date),
+                )
+
+
+class SummaryCacheTest(TestCase):
+    def setUp(self):
+        # The test cache is local to the process, which would turn the response cache off
+        self.enterContext(patch("transact.views.is_shared_cache", return_value=True))
+        cache.clear()
+        metrics.reset()
+        self.account = Account.objects.create(account_id="acc_cached", name="Cached", type="checking")
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(username="cached"))
+        self.url = reverse("account-summary", kwargs={"account_id": "acc_cached"})
+        self.params = {"start_date": "2025-10-01", "end_date": "2025-10-31"}
+
+    def test_summaries_are_cached_until_the_account_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            create_transaction(self.account, "cached_t1", "-4.50", datetime(2025, 10, 5, tzinfo=utc))
+        first = self.client.get(self.url, self.params)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url, self.params)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second["ETag"], first["ETag"])
+
+        # Another range is cached apart
+        other = self.client.get(self.url, {**self.params, "start_date": "2025-10-06"})
+        self.assertNotEqual(other["ETag"], first["ETag"])
+        self.assertEqual(other.json()["metrics"]["total_transactions"], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_transaction(self.account, "cached_t2", "-1.50", datetime(2025, 10, 6, tzinfo=utc))
+        third = self.client.get(self.url, self.params)
+
+        self.assertNotEqual(third["ETag"], first["ETag"])
+        self.assertEqual(third.json()["metrics"]["total_transactions"], 2)
+        snapshot = metrics.snapshot()
+        self.assertEqual((snapshot["summary_cache.hits"], snapshot["summary_cache.misses"]), (1, 3))
+
+    def test_unchanged_summaries_are_not_sent_again(self):
+        etag = self.client.get(self.url, self.params)["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, self.params, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(metrics.snapshot()["summary_cache.not_modified"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_transaction(self.account, "cached_t1", "-4.50", datetime(2025, 10, 5, tzinfo=utc))
+        response = self.client.get(self.url, self.params, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_reports_are_not_cached_in_a_cache_local_to_the_process(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            create_transaction(self.account, "cached_t1", "-4.50", datetime(2025, 10, 5, tzinfo=utc))
+
+        with patch("transact.views.is_shared_cache", return_value=False):
+            self.client.get(self.url, self.params)
+            # Versions bumped by the workers would not reach this process, so every request is answered afresh
+            with self.assertNumQueries(1):
+                response = self.client.get(self.url, self.params)
+        self.assertNotIn("ETag", response)
+        self.assertEqual(response.json()["metrics"]["total_transactions"], 1)
+
+    def test_versions_are_not_bumped_by_rolled_back_changes(self):
+        version = get_account_version("acc_cached")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                create_transaction(self.account, "cached_t1", "-4.50", datetime(2025, 10, 5, tzinfo=utc))
+                raise RuntimeError
+        self.assertEqual(get_account_version("acc_cached"), version)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            DailyAccountRollup.objects.rebuild(["acc_cached"])
+        self.assertEqual(get_account_version("acc_cached"), version + 1)
+
+
+class BulkSummaryTest(TestCase):
+    def setUp(self):
+        self.enterContext(patch("transact.views.is_shared_cache", return_value=True))
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(username="dashboard"))
+        self.url = reverse("accounts-summary")
+        for account_id in ("acc_bulk1", "acc_bulk2", "acc_bulk3"):
+            Account.objects.create(account_id=account_id, name=account_id, type="checking")
+        for i, (account_id, amount, category) in enumerate(
+            [
+                ("acc_bulk1", "-4.50", "Travel"),
+                ("acc_bulk1", "-10.00", "Shopping"),
+                ("acc_bulk1", "100.00", None),
+                ("acc_bulk2", "-7.25", "Travel"),
+            ]
+        ):
+            when = datetime(2025, 10, 5, tzinfo=utc)
+            create_transaction(Account(account_id=account_id), f"bulk_{i}", amount, when, category=category)
+
+    def test_summaries_are_computed_in_one_query(self):
+        payload = {"account_ids": ["acc_bulk2", "acc_bulk1", "acc_bulk3", "acc_bulk2"], "start_date": "2025-10-01"}
+
+        with self.assertNumQueries(1):
+            response = self.client.post(self.url, {**payload, "end_date": "2025-10-31"}, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        summaries = response.json()["summaries"]
+        self.assertEqual([summary["account_id"] for summary in summaries], ["acc_bulk2", "acc_bulk1", "acc_bulk3"])
+        for summary in summaries:
+            single = self.client.get(
+                reverse("account-summary", kwargs={"account_id": summary["account_id"]}),
+                {"start_date": "2025-10-01", "end_date": "2025-10-31"},
+            )
+            self.assertEqual(summary, single.json())
+        self.assertEqual(summaries[2]["metrics"]["total_transactions"], 0)
+
+        # Every summary is now cached
+        with self.assertNumQueries(0):
+            self.client.post(self.url, {**payload, "end_date": "2025-10-31"}, format="json")
+
+    @override_settings(TIME_ZONE="UTC")
+    def test_summaries_in_another_timezone_match_single_summaries(self):
+        start_date, end_date = date(2025, 10, 1), date(2025, 10, 31)
+        with timezone.override("America/New_York"):
+            summaries = Transaction.objects.account_summaries(["acc_bulk1", "acc_bulk2"], start_date, end_date)
+            for account_id, summary in summaries.items():
+                self.assertEqual(summary, Transaction.objects.summarise_transactions(account_id, start_date, end_date))
+
+    def test_invalid_requests(self):
+        for payload in (
+            {"account_ids": [], "start_date": "2025-10-01"},
+            {"account_ids": ["acc_bulk1"], "start_date": "2025-10-31", "end_date": "2025-10-01"},
+            {"account_ids": ["acc_bulk1"], "start_date": "October"},
+        ):
+            with self.subTest(payload=payload):
+                self.assertEqual(self.client.post(self.url, payload, format="json").status_code, 400)
+
+
+class TimeseriesTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.account = Account.objects.create(account_id="acc_series", name="Series", type="checking")
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(username="charts"))
+        self.url = reverse("account-timeseries", kwargs={"account_id": "acc_series"})
+        for i, (amount, day, category) in enumerate(
+            [("-4.50", 1, "Travel"), ("-10.00", 2, "Shopping"), ("100.00", 2, None), ("-7.25", 20, "Travel")]
+        ):
+            when = datetime(2025, 10, day, 12, tzinfo=utc)
+            create_transaction(self.account, f"series_{i}", amount, when, category=category)
+
+    def test_weekly_series_by_category(self):
+        params = {"start_date": "2025-10-01", "end_date": "2025-10-31", "interval": "week", "by_category": "true"}
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, params)
+
+        self.assertEqual(response.status_code, 200)
+        buckets = response.json()["buckets"]
+        # Weeks start on Mondays, and weeks without transactions are filled in
+        self.assertEqual(
+            [bucket["start"] for bucket in buckets],
+            ["2025-09-29", "2025-10-06", "2025-10-13", "2025-10-20", "2025-10-27"],
+        )
+        self.assertEqual(
+            buckets[0]["metrics"],
+            {"total_transactions": 3, "total_spend": "14.50", "total_income": "100.00", "net": "85.50"},
+        )
+        self.assertEqual(
+            buckets[0]["categories"],
+            [
+                {"category": "Shopping", "total_spend": "10.00", "total_income": "0.00", "transaction_count": 1},
+                {"category": "Travel", "total_spend": "4.50", "total_income": "0.00", "transaction_count": 1},
+                {"category": None, "total_spend": "0.00", "total_income": "100.00", "transaction_count": 1},
+            ],
+        )
+        self.assertEqual(buckets[1], {"start": "2025-10-06", "metrics": buckets[1]["metrics"], "categories": []})
+        self.assertEqual(buckets[1]["metrics"]["total_transactions"], 0)
+        self.assertEqual(buckets[3]["metrics"]["total_spend"], "7.25")
+
+    @override_settings(TIME_ZONE="UTC")
+    def test_series_from_rollups_match_series_from_transactions(self):
+        for interval in ("day", "week", "month"):
+            for by_category in (False, True):
+                args = ("acc_series", date(2025, 9, 15), date(2025, 11, 15), interval, by_category)
+                with self.subTest(interval=interval, by_category=by_category):
+                    from_rollups = Transaction.objects.account_timeseries(*args)
+                    # Another name for the same timezone, so that the transactions are bucketed instead
+                    with timezone.override("Etc/UTC"):
+                        self.assertEqual(Transaction.objects.account_timeseries(*args), from_rollups)
+
+    def test_monthly_series(self):
+        params = {"start_date": "2025-09-15", "end_date": "2025-11-15", "interval": "month"}
+        response = self.client.get(self.url, params)
+
+        buckets = response.json()["buckets"]
+        self.assertEqual([bucket["start"] for bucket in buckets], ["2025-09-01", "2025-10-01", "2025-11-01"])
+        self.assertEqual([bucket["metrics"]["total_transactions"] for bucket in buckets], [0, 4, 0])
+        self.assertNotIn("categories", buckets[1])
+
+    @override_settings(TRANSACT_TIMESERIES_MAX_BUCKETS=100)
+    def test_invalid_requests(self):
+        for params in (
+            {"start_date": "2025-10-01", "interval": "hour"},
+            {"start_date": "2025-10-31", "end_date": "2025-10-01"},
+            {"start_date": "2025-01-01", "end_date": "2025-12-31"},
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
+        response = self.client.get(self.url, {"start_date": "2025-01-01", "end_date": "2025-12-31", "interval": "week"})
+        self.assertEqual(response.status_code, 200)
+
+
+class QueryPlanTest(TestCase):
+    """The summary, listing and task queries are answered from indexes rather than by scanning the table."""
+
+    def explain(self, queryset) -> str:
+        with transaction.atomic():
+            if connection.vendor == "postgresql":
+                # The test tables are tiny, so sequential scans would otherwise always win
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+            return queryset.explain()
+
+    def summary_queryset(self):
+        return (
+            Transaction.objects.filter(account_id="acc_plan")
+            .in_period(date(2025, 10, 1), date(2025, 10, 31))
+            .values("category", "ingestion_status")
+            .annotate(count=Count("*"), spend=Sum("amount", filter=Q(amount__lt=0)))
+        )
+
+    def listing_queryset(self):
+        # A page of the transaction listing after the first, seeking to the cursor before filtering on the period
+        after = datetime(2025, 10, 5, tzinfo=utc)
+        return (
+            Transaction.objects.filter(date__gte=after)
+            .filter(Q(date__gt=after) | Q(transaction_id__gt="plan_1"))
+            .filter(account_id="acc_plan")
+            .in_period(date(2025, 10, 1), date(2025, 10, 31))
+            .order_by("date", "transaction_id")[:100]
+        )
+
+    @skipUnless(connection.vendor == "sqlite", "SQLite query plan")
+    def test_sqlite_plans(self):
+        self.assertIn("USING COVERING INDEX transaction_account_date", self.explain(self.summary_queryset()))
+
+        # Only the transactions of the same day are sorted by ID
+        plan = self.explain(self.listing_queryset())
+        self.assertIn("USING INDEX transaction_account_date", plan)
+        self.assertNotIn("TEMP B-TREE FOR ORDER BY", plan)
+
+        failed = Transaction.objects.filter(batch_id=uuid.uuid4(), ingestion_status=Transaction.IngestionStatus.FAILED)
+        plan = self.explain(failed.order_by("transaction_id").values_list("transaction_id"))
+        self.assertIn("USING COVERING INDEX transaction_batch_status", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    @skipUnless(connection.vendor == "postgresql", "PostgreSQL query plan")
+    def test_postgresql_plans(self):
+        self.assertIn("transaction_account_date", self.explain(self.summary_queryset()))
+        self.assertIn("transaction_account_date", self.explain(self.listing_queryset()))
+
+        failed = Transaction.objects.filter(batch_id=uuid.uuid4(), ingestion_status=Transaction.IngestionStatus.FAILED)
+        self.assertIn("transaction_batch_status", self.explain(failed.values_list("transaction_id")))
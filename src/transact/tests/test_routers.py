@@ -0,0 +1,126 @@
+from datetime import datetime
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from transact import metrics
+from transact.models import Account, Transaction
+from transact.routers import ReplicaRouter, lag_monitor, replica_reads
+from transact.tests.test_reports import create_transaction
+from transact.versions import bump_account_versions
+
+utc = ZoneInfo("UTC")
+
+
+@override_settings(TRANSACT_READ_REPLICAS=["replica"], TRANSACT_REPLICA_MAX_LAG=5)
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        metrics.reset()
+        lag_monitor.clear()
+        self.addCleanup(lag_monitor.clear)
+        self.router = ReplicaRouter()
+
+    @patch.object(lag_monitor, "_measure", return_value=0.5)
+    def test_only_reads_within_replica_reads_go_to_replicas(self, mock_measure):
+        self.assertIsNone(self.router.db_for_read(Transaction))
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Transaction), "replica")
+            self.assertEqual(self.router.db_for_write(Transaction), "default")
+            with replica_reads(False):
+                self.assertIsNone(self.router.db_for_read(Transaction))
+        self.assertFalse(self.router.allow_migrate("replica", "transact"))
+        self.assertIsNone(self.router.allow_migrate("default", "transact"))
+
+    def test_lagging_replicas_are_skipped(self):
+        for lag in (10.0, None):
+            lag_monitor.clear()
+            with self.subTest(lag=lag), patch.object(lag_monitor, "_measure", return_value=lag), replica_reads():
+                self.assertIsNone(self.router.db_for_read(Transaction))
+        self.assertEqual(metrics.snapshot()["replicas.fallbacks"], 2)
+
+    def test_lag_is_checked_at_most_once_per_interval(self):
+        with patch.object(lag_monitor, "_measure", return_value=0.0) as mock_measure, replica_reads():
+            for _ in range(3):
+                self.assertEqual(self.router.db_for_read(Transaction), "replica")
+        self.assertEqual(mock_measure.call_count, 1)
+
+    def test_changed_accounts_stay_on_the_primary_until_the_next_lag_check_could_see_them(self):
+        # A replica measured just before the change may still be up to the maximum lag behind a whole interval later
+        with patch.object(cache, "set_many") as mock_set_many:
+            bump_account_versions(["acc_lagging"])
+        self.assertEqual(mock_set_many.call_args.kwargs["timeout"], 6)
+
+    @override_settings(TRANSACT_REPLICA_MAX_LAG=0)
+    def test_lag_guard_can_be_disabled(self):
+        with patch.object(lag_monitor, "_measure") as mock_measure, replica_reads():
+            self.assertEqual(self.router.db_for_read(Transaction), "replica")
+        mock_measure.assert_not_called()
+
+
+@override_settings(TRANSACT_READ_REPLICAS=["replica"])
+class ReplicaReadsTest(TransactionTestCase):
+    """Report views read from a replica, here a test mirror of the default database."""
+
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        # The test cache is local to the process, which would keep every report on the primary
+        self.enterContext(patch("transact.versions.is_shared_cache", return_value=True))
+        cache.clear()
+        lag_monitor.clear()
+        self.addCleanup(lag_monitor.clear)
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(username="replica"))
+        account = Account.objects.create(account_id="acc_replica", name="Replica", type="checking")
+        create_transaction(account, "replica_t1", "-4.50", datetime(2025, 10, 5, tzinfo=utc))
+        self.params = {"start_date": "2025-10-01", "end_date": "2025-10-31"}
+
+    def get(self, name: str, **params):
+        url = reverse(name, kwargs={"account_id": "acc_replica"})
+        with (
+            CaptureQueriesContext(connections["default"]) as primary,
+            CaptureQueriesContext(connections["replica"]) as replica,
+        ):
+            response = self.client.get(url, {**self.params, **params})
+            if response.streaming:
+                b"".join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        return response, len(primary), len(replica)
+
+    @override_settings(TRANSACT_REPLICA_MAX_LAG=0)
+    def test_reports_read_from_replicas(self):
+        for name in ("account-summary", "account-timeseries", "account-transactions", "account-transactions-export"):
+            with self.subTest(name=name):
+                _, primary, replica = self.get(name)
+                self.assertEqual((primary, replica), (0, 1))
+
+    def test_recently_changed_accounts_are_read_from_the_primary(self):
+        # The transaction was just created, so replicas may not have caught up with it
+        response, primary, replica = self.get("account-summary")
+        self.assertEqual((primary, replica), (1, 0))
+        self.assertEqual(response.json()["metrics"]["total_transactions"], 1)
+
+        cache.delete("account_changed:acc_replica")
+        with patch.object(lag_monitor, "_measure", return_value=0.0):
+            _, primary, replica = self.get("account-summary", end_date="2025-10-30")
+        self.assertEqual((primary, replica), (0, 1))
+
+    def test_reports_are_read_from_the_primary_if_changes_cannot_be_told(self):
+        self.enterContext(patch("transact.versions._unmarked_until", 0.0))
+        cache.delete("account_changed:acc_replica")
+        with patch("transact.versions.is_shared_cache", return_value=False):
+            _, primary, replica = self.get("account-summary")
+        self.assertEqual((primary, replica), (1, 0))
+
+        # Markers which could not be written send this process's reads to the primary until they would have expired
+        with patch.object(cache, "set_many", side_effect=ConnectionError), self.assertLogs("transact.versions"):
+            bump_account_versions(["acc_replica"])
+        _, primary, replica = self.get("account-summary", end_date="2025-10-30")
+        self.assertEqual((primary, replica), (1, 0))
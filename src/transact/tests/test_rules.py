@@ -0,0 +1,92 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from transact.enums import Category
+from transact.models import CategoryRule
+from transact.rules import RuleMatcher, rule_matchers
+from transact.task import determine_transaction_category
+
+
+class RuleMatcherTest(SimpleTestCase):
+    def test_highest_precedence_rule_wins(self):
+        matcher = RuleMatcher([("amazon", "Shopping"), ("web service", "Software"), ("ice", "Food")])
+
+        self.assertEqual(matcher.match("Amazon Web Service"), "Shopping")
+        self.assertEqual(matcher.match("Google web services"), "Software")
+        # Patterns are found as substrings of each other and across failure links
+        self.assertEqual(matcher.match("Ice cream"), "Food")
+        self.assertEqual(matcher.match("Invoice"), "Food")
+        self.assertIsNone(matcher.match("Coffee"))
+        self.assertIsNone(matcher.match(None))
+
+    def test_overlapping_patterns(self):
+        matcher = RuleMatcher([("he", "A"), ("she", "B"), ("hers", "C"), ("his", "D")])
+
+        self.assertEqual(matcher.match("ushers"), "A")
+        self.assertEqual(matcher.match("ahishe"), "A")
+        self.assertEqual(matcher.match("ahis"), "D")
+        self.assertEqual(RuleMatcher([("hers", "C"), ("she", "B")]).match("ushers"), "C")
+
+
+class CategoryRuleTest(TestCase):
+    def setUp(self):
+        rule_matchers.clear()
+        self.addCleanup(rule_matchers.clear)
+
+    def test_seeded_rules_match_the_previous_categorisation(self):
+        cases = {
+            "Amazon Marketplace": Category.SHOPPING,
+            "Amazon Web Service": Category.SHOPPING,
+            "Stripe Payments": Category.INCOME,
+            "Paypal": Category.INCOME,
+            "Uber ride": Category.TRANSPORT,
+            "Lyft Rides": Category.TRANSPORT,
+            "AWS bill": Category.SOFTWARE,
+            "Microsoft Azure": Category.SOFTWARE,
+        }
+        for description, category in cases.items():
+            self.assertEqual(determine_transaction_category(description), category)
+
+        with self.assertRaises(ValueError):
+            determine_transaction_category("Coffee")
+
+    @override_settings(TRANSACT_CATEGORY_RULES_RELOAD_INTERVAL=0)
+    def test_matcher_is_reloaded_when_rules_change(self):
+        with self.assertRaises(ValueError):
+            determine_transaction_category("Coffee")
+
+        rule = CategoryRule.objects.create(pattern="coffee", category=Category.SHOPPING)
+        self.assertEqual(determine_transaction_category("Coffee"), Category.SHOPPING)
+
+        # Without a shared cache to hold the rules version, each check loads the rules
+        with self.assertNumQueries(1):
+            determine_transaction_category("Coffee")
+
+        rule.is_active = False
+        rule.save()
+        with self.assertRaises(ValueError):
+            determine_transaction_category("Coffee")
+
+    @override_settings(TRANSACT_CATEGORY_RULES_RELOAD_INTERVAL=0)
+    def test_matcher_is_reloaded_when_rules_version_is_bumped(self):
+        self.enterContext(patch("transact.rules.is_shared_cache", return_value=True))
+        cache.clear()
+        self.addCleanup(cache.clear)
+        rule = CategoryRule.objects.create(pattern="coffee", category=Category.SHOPPING)
+        self.assertEqual(determine_transaction_category("Coffee"), Category.SHOPPING)
+
+        # Unchanged rules are not loaded again
+        with self.assertNumQueries(0):
+            determine_transaction_category("Coffee")
+
+        # Bulk updates keep the number of rules and do not touch updated_at
+        with self.captureOnCommitCallbacks(execute=True):
+            CategoryRule.objects.filter(pk=rule.pk).update(category=Category.TRANSPORT)
+        self.assertEqual(determine_transaction_category("Coffee"), Category.TRANSPORT)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rule.delete()
+        with self.assertRaises(ValueError):
+            determine_transaction_category("Coffee")
@@ -1,5 +1,6 @@
 from django.test import TestCase
 from decimal import Decimal
+from unittest.mock import patch
 from django.urls import reverse
 
 from transact.serializers import CompositeCreationSerializer
@@ -76,3 +77,54 @@ class CompositeCreationSerializerTest(TestCase):
         # batch_id should be the same on both transactions
         self.assertEqual(str(tx1.batch_id), result["batch_id"])
         self.assertEqual(str(tx2.batch_id), result["batch_id"])
+
+    @patch("transact.ingestion.categorise_transactions.delay")
+    def test_redelivered_batch_is_idempotent(self, mock_delay):
+        """Redelivering a batch should skip unchanged transactions, update changed ones and only enqueue new ones."""
+        account = {"account_id": "acc_redeliver", "name": "Redeliver", "type": "checking"}
+        transaction = {
+            "transaction_id": "redeliver_t1",
+            "account_id": "acc_redeliver",
+            "amount": "-12.34",
+            "iso_currency_code": "USD",
+            "date": "2025-10-01T10:00:00Z",
+            "merchant_name": "Coffee",
+            "name": "Coffee purchase",
+        }
+
+        serializer = CompositeCreationSerializer(data={"accounts": [account], "transactions": [transaction]})
+        self.assertTrue(serializer.is_valid(), msg=serializer.errors)
+        first = serializer.save()
+        self.assertEqual((first["inserted"], first["updated"], first["duplicates"]), (1, 0, 0))
+
+        changed = {**transaction, "amount": "-15.00"}
+        new = {**transaction, "transaction_id": "redeliver_t2"}
+        payload = {"accounts": [account], "transactions": [transaction, changed, new, new]}
+
+        serializer = CompositeCreationSerializer(data=payload)
+        self.assertTrue(serializer.is_valid(), msg=serializer.errors)
+        # Savepoint and its release, the account upsert, one lookup, insert and upsert for the transactions
+        # between the aggregation of their rollups before and after, the merge of the difference, then the batch record
+        with self.assertNumQueries(10):
+            second = serializer.save()
+
+        # The changed row supersedes the unchanged one, and the new row is repeated
+        self.assertEqual((second["inserted"], second["updated"], second["duplicates"]), (1, 1, 2))
+
+        t1 = Transaction.objects.get(transaction_id="redeliver_t1")
+        t2 = Transaction.objects.get(transaction_id="redeliver_t2")
+        self.assertEqual(t1.amount, Decimal("-15.00"))
+        self.assertEqual(str(t1.batch_id), first["batch_id"])
+        self.assertEqual(str(t2.batch_id), second["batch_id"])
+
+        self.assertEqual(
+            [call.kwargs for call in mock_delay.call_args_list],
+            [{"batch_id": first["batch_id"]}, {"batch_id": second["batch_id"]}],
+        )
+
+        # A pure redelivery inserts nothing and enqueues nothing
+        serializer = CompositeCreationSerializer(data=payload)
+        self.assertTrue(serializer.is_valid(), msg=serializer.errors)
+        third = serializer.save()
+        self.assertEqual((third["inserted"], third["updated"], third["duplicates"]), (0, 0, 4))
+        self.assertEqual(mock_delay.call_count, 2)
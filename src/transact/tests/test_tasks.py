@@ -1,14 +1,26 @@
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 from decimal import Decimal
 from unittest.mock import patch
 from zoneinfo import ZoneInfo
 
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
 
+from transact import metrics
 from transact.enums import Category
-from transact.models import Account, Transaction
-from transact.task import categorise_transactions
+from transact.models import Account, CategoryRule, IngestionBatch, Transaction
+from transact.rules import rule_matchers
+from transact.task import (
+    categorise_chunk,
+    categorise_descriptions,
+    categorise_transaction_range,
+    categorise_transactions,
+    category_cache,
+    drain_pending_transactions,
+    recover_transactions,
+)
 
 tz = ZoneInfo("UTC")
 
@@ -24,7 +36,7 @@ class CategoriseTransactionsTaskTest(TestCase):
             type="checking",
         )
 
-    @patch("transact.task.time.sleep", lambda *_: None)
+    @patch("transact.enrichment.time.sleep", lambda *_: None)
     def test_categorise_transactions_success_and_skip(self):
         batch_id = uuid.uuid4()
 
@@ -103,7 +115,7 @@ class CategoriseTransactionsTaskTest(TestCase):
         self.assertEqual(completed.ingestion_status, Transaction.IngestionStatus.COMPLETED)
         self.assertEqual(completed.category, "Shopping")
 
-    @patch("transact.task.time.sleep", lambda *_: None)
+    @patch("transact.enrichment.time.sleep", lambda *_: None)
     def test_categorise_transactions_handles_bad_description(self):
         batch_id = uuid.uuid4()
 
@@ -131,3 +143,266 @@ class CategoriseTransactionsTaskTest(TestCase):
 
         # Category should remain None because categorisation failed
         self.assertIsNone(bad.category)
+
+
+@patch("transact.enrichment.time.sleep", lambda *_: None)
+class CategorisationFanOutTest(TestCase):
+    def setUp(self):
+        self.account = Account.objects.create(account_id="acc_fanout", name="Fan-out", type="checking")
+        self.batch_id = uuid.uuid4()
+        IngestionBatch.objects.create(batch_id=self.batch_id, status=IngestionBatch.Status.INSERTED)
+
+        for i in range(5):
+            Transaction.objects.create(
+                transaction_id=f"fanout_t{i}",
+                account=self.account,
+                amount=Decimal("-10.00"),
+                currency="USD",
+                date=datetime.now(tz),
+                description="Lyft ride",
+                batch_id=self.batch_id,
+            )
+
+    @override_settings(TRANSACT_CATEGORISATION_CHUNK_SIZE=2)
+    def test_large_batch_is_split_into_disjoint_ranges(self):
+        with patch("transact.task.chord") as mock_chord:
+            categorise_transactions(str(self.batch_id))
+
+        (header,), _ = mock_chord.call_args
+        ranges = [tuple(signature.args[1:]) for signature in header.tasks]
+        self.assertEqual(ranges, [("fanout_t0", "fanout_t1"), ("fanout_t2", "fanout_t3"), ("fanout_t4", "fanout_t4")])
+
+        callback = mock_chord.return_value.call_args.args[0]
+        self.assertEqual(callback.kwargs, {"batch_id": str(self.batch_id)})
+
+        # Running the sub-tasks and then the callback categorises the whole batch
+        results = [signature.apply().get() for signature in header.tasks]
+        callback.clone(args=(results,)).apply()
+
+        statuses = set(Transaction.objects.filter(batch_id=self.batch_id).values_list("ingestion_status", flat=True))
+        self.assertEqual(statuses, {Transaction.IngestionStatus.COMPLETED})
+        self.assertIsNotNone(IngestionBatch.objects.get(batch_id=self.batch_id).categorised_at)
+
+    def test_small_batch_is_categorised_inline(self):
+        with patch("transact.task.chord") as mock_chord:
+            categorise_transactions(str(self.batch_id))
+
+        mock_chord.assert_not_called()
+        self.assertFalse(
+            Transaction.objects.filter(batch_id=self.batch_id, ingestion_status=Transaction.IngestionStatus.PENDING)
+        )
+        self.assertIsNotNone(IngestionBatch.objects.get(batch_id=self.batch_id).categorised_at)
+
+    @override_settings(TRANSACT_CATEGORISATION_CHUNK_SIZE=2)
+    def test_range_is_updated_in_chunks(self):
+        Transaction.objects.filter(transaction_id="fanout_t0").update(
+            ingestion_status=Transaction.IngestionStatus.COMPLETED, category=Category.INCOME
+        )
+
+        # The two set-based updates per chunk, each tracked by the daily rollups, which cost three queries per update
+        # whatever the chunk size. Each of the two chunks takes twelve queries:
+        # - the claim, in a savepoint: the lookup of the candidate IDs, the rollup figures of the candidates, the update
+        #   to processing, their figures again, the merge of the difference into the rollups, and the release;
+        # - the read back of the leased transactions;
+        # - the write back: the rollup figures of the leased transactions, the bulk update of their categories and
+        #   statuses, their figures again, and the merge of the difference.
+        # A final claim then finds nothing left, in a savepoint, for three more. PostgreSQL adds a row lock per update.
+        rule_matchers.get()
+        with self.assertNumQueries(27):
+            categorise_transaction_range(str(self.batch_id))
+
+        categories = dict(Transaction.objects.filter(batch_id=self.batch_id).values_list("transaction_id", "category"))
+        self.assertEqual(categories.pop("fanout_t0"), Category.INCOME)
+        self.assertEqual(set(categories.values()), {Category.TRANSPORT})
+
+
+@patch("transact.enrichment.time.sleep", lambda *_: None)
+class CategoryCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        category_cache.clear()
+        rule_matchers.clear()
+        metrics.reset()
+        self.addCleanup(rule_matchers.clear)
+
+    def test_descriptions_are_categorised_once(self):
+        descriptions = ["Uber ride", "UBER   Ride", "Coffee", "Lyft Rides"]
+        expected = {
+            "Uber ride": Category.TRANSPORT,
+            "UBER   Ride": Category.TRANSPORT,
+            "Coffee": None,
+            "Lyft Rides": Category.TRANSPORT,
+        }
+        self.assertEqual(categorise_descriptions(descriptions), expected)
+        self.assertEqual(metrics.snapshot()["category_cache.computed"], 3)
+
+        # Repeated in this worker, including the uncategorisable one
+        self.assertEqual(categorise_descriptions(descriptions), expected)
+        # Then in another worker, through the shared tier
+        category_cache.clear()
+        self.assertEqual(categorise_descriptions(descriptions), expected)
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["category_cache.computed"], 3)
+        self.assertEqual(snapshot["category_cache.local.hits"], 3)
+        self.assertEqual((snapshot["category_cache.shared.hits"], snapshot["category_cache.shared.misses"]), (3, 3))
+
+    def test_rule_changes_invalidate_cached_categories(self):
+        self.assertEqual(categorise_descriptions(["Coffee"]), {"Coffee": None})
+
+        CategoryRule.objects.create(pattern="coffee", category=Category.SHOPPING)
+        rule_matchers.clear()
+        self.assertEqual(categorise_descriptions(["Coffee"]), {"Coffee": Category.SHOPPING})
+
+
+@patch("transact.enrichment.time.sleep", lambda *_: None)
+class WorkClaimingTest(TestCase):
+    def setUp(self):
+        self.account = Account.objects.create(account_id="acc_claim", name="Claim", type="checking")
+        self.batch_ids = [uuid.uuid4(), uuid.uuid4()]
+        for batch_id in self.batch_ids:
+            IngestionBatch.objects.create(batch_id=batch_id, status=IngestionBatch.Status.INSERTED)
+
+        for i in range(6):
+            Transaction.objects.create(
+                transaction_id=f"claim_t{i}",
+                account=self.account,
+                amount=Decimal("-10.00"),
+                currency="USD",
+                date=datetime.now(tz),
+                description="Uber ride",
+                batch_id=self.batch_ids[i % 2],
+            )
+
+    def test_claims_never_overlap(self):
+        first = Transaction.objects.claim_pending(4)
+        second = Transaction.objects.claim_pending(4)
+
+        self.assertEqual(len(first), 4)
+        self.assertEqual(len(second), 2)
+        self.assertFalse({t.transaction_id for t in first} & {t.transaction_id for t in second})
+        self.assertNotEqual(first[0].lease_token, second[0].lease_token)
+        self.assertEqual(Transaction.objects.claim_pending(4), [])
+        self.assertFalse(Transaction.objects.filter(ingestion_status=Transaction.IngestionStatus.PENDING).exists())
+
+    def test_taken_over_leases_are_not_written_back(self):
+        transactions = Transaction.objects.claim_pending(2)
+        Transaction.objects.filter(transaction_id=transactions[0].transaction_id).update(lease_token=uuid.uuid4())
+
+        categorise_chunk(transactions)
+
+        taken_over, kept = Transaction.objects.filter(
+            transaction_id__in=[t.transaction_id for t in transactions]
+        ).order_by("transaction_id")
+        self.assertEqual(taken_over.ingestion_status, Transaction.IngestionStatus.PROCESSING)
+        self.assertEqual((kept.ingestion_status, kept.category), (Transaction.IngestionStatus.COMPLETED, "Transport"))
+        self.assertIsNone(kept.lease_token)
+
+    @override_settings(TRANSACT_CATEGORISATION_CHUNK_SIZE=4)
+    def test_drain_categorises_every_batch(self):
+        self.assertEqual(drain_pending_transactions(), 6)
+
+        statuses = set(Transaction.objects.values_list("ingestion_status", flat=True))
+        self.assertEqual(statuses, {Transaction.IngestionStatus.COMPLETED})
+        self.assertFalse(IngestionBatch.objects.filter(categorised_at__isnull=True).exists())
+
+    @override_settings(TRANSACT_CATEGORISATION_CHUNK_SIZE=2)
+    def test_drain_hands_over_after_its_chunk_budget(self):
+        with patch("transact.task.drain_pending_transactions.delay") as mock_delay:
+            self.assertEqual(drain_pending_transactions(max_chunks=2), 4)
+        mock_delay.assert_called_once_with(2)
+
+    @override_settings(TRANSACT_CATEGORISATION_MODE="claim", TRANSACT_CATEGORISATION_CHUNK_SIZE=1)
+    def test_claim_mode_enqueues_drain_tasks(self):
+        for drain_tasks, expected in ((8, 3), (2, 2)):
+            with (
+                self.subTest(drain_tasks=drain_tasks),
+                override_settings(TRANSACT_CATEGORISATION_DRAIN_TASKS=drain_tasks),
+                patch("transact.task.group") as mock_group,
+            ):
+                # The pending transactions are counted, rather than read
+                with self.assertNumQueries(1):
+                    categorise_transactions(str(self.batch_ids[0]))
+
+                (signatures,), _ = mock_group.call_args
+                self.assertEqual(len(list(signatures)), expected)
+                mock_group.return_value.apply_async.assert_called_once()
+
+
+@override_settings(
+    TRANSACT_PROCESSING_TIMEOUT=600,
+    TRANSACT_CATEGORISATION_MAX_RETRIES=2,
+    TRANSACT_RETRY_BASE_DELAY=60,
+    TRANSACT_RETRY_MAX_DELAY=90,
+)
+class RecoveryTest(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.account = Account.objects.create(account_id="acc_recovery", name="Recovery", type="checking")
+        self.batch_id = uuid.uuid4()
+        IngestionBatch.objects.create(
+            batch_id=self.batch_id, status=IngestionBatch.Status.INSERTED, categorised_at=timezone.now()
+        )
+
+    def create(self, transaction_id: str, description: str = "Uber ride", **fields) -> Transaction:
+        return Transaction.objects.create(
+            transaction_id=transaction_id,
+            account=self.account,
+            amount=Decimal("-10.00"),
+            currency="USD",
+            date=datetime.now(tz),
+            description=description,
+            batch_id=self.batch_id,
+            **fields,
+        )
+
+    def test_failures_back_off_until_out_of_retries(self):
+        for attempts in range(3):
+            self.create(f"recovery_fail_t{attempts}", "Coffee", attempts=attempts)
+
+        before = timezone.now()
+        categorise_chunk(Transaction.objects.claim_pending(3))
+
+        retries = dict(Transaction.objects.values_list("attempts", "next_retry_at"))
+        self.assertEqual(round((retries[0] - before).total_seconds()), 60)
+        # The delay doubles, up to the maximum
+        self.assertEqual(round((retries[1] - before).total_seconds()), 90)
+        self.assertIsNone(retries[2])
+        self.assertEqual(metrics.snapshot()["recovery.permanently_failed"], 1)
+
+    def test_due_failures_and_stuck_transactions_are_put_back_to_pending(self):
+        now = timezone.now()
+        self.create("recovery_due", ingestion_status=Transaction.IngestionStatus.FAILED, next_retry_at=now)
+        self.create(
+            "recovery_not_due",
+            ingestion_status=Transaction.IngestionStatus.FAILED,
+            next_retry_at=now + timedelta(minutes=1),
+        )
+        self.create("recovery_stuck", ingestion_status=Transaction.IngestionStatus.PROCESSING, lease_token=uuid.uuid4())
+        self.create("recovery_stuck_out_of_retries", ingestion_status=Transaction.IngestionStatus.PROCESSING, attempts=2)
+        self.create("recovery_processing", ingestion_status=Transaction.IngestionStatus.PROCESSING)
+        # Only transactions processing for longer than the timeout are stuck
+        Transaction.objects.filter(transaction_id__startswith="recovery_stuck").update(
+            updated_at=now - timedelta(minutes=11)
+        )
+
+        with patch("transact.task.categorise_transactions.delay") as mock_delay:
+            counts = recover_transactions()
+
+        self.assertEqual(counts, {"stuck": 1, "retried": 1, "permanently_failed": 1, "restaged": 0})
+        mock_delay.assert_called_once_with(batch_id=str(self.batch_id))
+        self.assertIsNone(IngestionBatch.objects.get(batch_id=self.batch_id).categorised_at)
+
+        statuses = {t.transaction_id: (t.ingestion_status, t.attempts, t.lease_token) for t in Transaction.objects.all()}
+        self.assertEqual(statuses["recovery_due"], (Transaction.IngestionStatus.PENDING, 1, None))
+        self.assertEqual(statuses["recovery_stuck"], (Transaction.IngestionStatus.PENDING, 1, None))
+        self.assertEqual(statuses["recovery_stuck_out_of_retries"], (Transaction.IngestionStatus.FAILED, 2, None))
+        self.assertEqual(statuses["recovery_not_due"][0], Transaction.IngestionStatus.FAILED)
+        self.assertEqual(statuses["recovery_processing"][0], Transaction.IngestionStatus.PROCESSING)
+
+        # Nothing is left to recover
+        with patch("transact.task.categorise_transactions.delay") as mock_delay:
+            self.assertEqual(
+                recover_transactions(), {"stuck": 0, "retried": 0, "permanently_failed": 0, "restaged": 0}
+            )
+        mock_delay.assert_not_called()
@@ -0,0 +1,117 @@
+from decimal import Decimal
+
+from django.core.validators import MaxLengthValidator
+from django.test import SimpleTestCase, override_settings
+from rest_framework import serializers
+
+from transact.serializers import AccountSerializer, CompositeCreationSerializer, TransactionSerializer
+from transact.validation import BatchValidator
+
+
+def transaction_row(**overrides) -> dict:
+    row = {
+        "transaction_id": "val_t1",
+        "account_id": "acc_val",
+        "amount": "-12.30",
+        "iso_currency_code": "USD",
+        "date": "2025-10-01T10:00:00+02:00",
+        "merchant_name": "Coffee",
+        "name": "  Coffee purchase ",
+    }
+    row.update(overrides)
+    return row
+
+
+class BatchValidatorTest(SimpleTestCase):
+    def assertMatchesSerializer(self, serializer_class, rows):
+        """The batch validator should produce the same validated data or errors as the DRF serializer."""
+        serializer = serializer_class(data=rows, many=True)
+        try:
+            validated = BatchValidator(serializer_class).validate(rows)
+        except serializers.ValidationError as exc:
+            self.assertFalse(serializer.is_valid())
+            self.assertEqual(exc.detail, serializer.errors)
+            self.assertEqual(
+                [{name: [e.code for e in errors] for name, errors in row.items()} for row in exc.detail],
+                [{name: [e.code for e in errors] for name, errors in row.items()} for row in serializer.errors],
+            )
+        else:
+            self.assertTrue(serializer.is_valid(), msg=serializer.errors)
+            self.assertEqual(validated, serializer.validated_data)
+
+    def test_supports_ingestion_serializers(self):
+        self.assertTrue(BatchValidator.supports(AccountSerializer))
+        self.assertTrue(BatchValidator.supports(TransactionSerializer))
+
+    def test_field_validators_are_not_supported(self):
+        def not_test(value):
+            if value.startswith("test"):
+                raise serializers.ValidationError("Test accounts are not accepted.")
+
+        class ValidatedAccountSerializer(AccountSerializer):
+            account_id = serializers.CharField(validators=[not_test])
+
+        class BoundedTransactionSerializer(TransactionSerializer):
+            amount = serializers.DecimalField(max_digits=12, decimal_places=2, max_value=Decimal("1000"))
+
+        class ShortAccountSerializer(AccountSerializer):
+            account_id = serializers.CharField(validators=[MaxLengthValidator(8)])
+
+        self.assertFalse(BatchValidator.supports(ValidatedAccountSerializer))
+        self.assertFalse(BatchValidator.supports(BoundedTransactionSerializer))
+        self.assertFalse(BatchValidator.supports(ShortAccountSerializer))
+        self.assertTrue(BatchValidator.supports(type("Copy", (AccountSerializer,), {})))
+
+    def test_valid_rows_match_serializer(self):
+        rows = [
+            transaction_row(),
+            transaction_row(transaction_id="val_t2", amount="100", merchant_name=None, date="2025-10-01T10:00:00Z"),
+            transaction_row(transaction_id="val_t3", amount=5.5, date="2025-10-01T10:00:00"),
+        ]
+        del rows[1]["merchant_name"]
+        self.assertMatchesSerializer(TransactionSerializer, rows)
+
+        validated = BatchValidator(TransactionSerializer).validate(rows)
+        self.assertEqual(validated[0]["currency"], "USD")
+        self.assertEqual(validated[0]["description"], "Coffee purchase")
+        self.assertEqual(validated[0]["amount"], Decimal("-12.30"))
+
+    def test_invalid_rows_match_serializer(self):
+        rows = [
+            transaction_row(),
+            transaction_row(amount="12.345", iso_currency_code=""),
+            transaction_row(amount="12345678901.00", date="yesterday"),
+            transaction_row(amount="NaN", date="2025-13-01T10:00:00Z", name=None),
+            transaction_row(transaction_id="x" * 101, merchant_name="y" * 256, account_id=["acc"]),
+            transaction_row(name="null\x00char", amount=True),
+            "not a row",
+        ]
+        del rows[0]["amount"]
+        self.assertMatchesSerializer(TransactionSerializer, rows)
+
+        accounts = [{"account_id": "acc", "name": "", "type": "t" * 51, "mask": None}, {"account_id": " "}]
+        self.assertMatchesSerializer(AccountSerializer, accounts)
+
+
+class CompositeBatchValidationTest(SimpleTestCase):
+    @override_settings(TRANSACT_BATCH_VALIDATION_THRESHOLD=1)
+    def test_composite_errors_keep_their_shape(self):
+        data = {
+            "accounts": [{"account_id": "acc_val", "name": "Val", "type": "checking"}],
+            "transactions": [transaction_row(), transaction_row(amount="abc")],
+        }
+        serializer = CompositeCreationSerializer(data=data)
+        self.assertFalse(serializer.is_valid())
+
+        with override_settings(TRANSACT_BATCH_VALIDATION_THRESHOLD=10_000):
+            expected = CompositeCreationSerializer(data=data)
+            self.assertFalse(expected.is_valid())
+
+        self.assertEqual(serializer.errors, expected.errors)
+        self.assertEqual(list(serializer.errors), ["transactions"])
+
+    @override_settings(TRANSACT_BATCH_VALIDATION_THRESHOLD=1)
+    def test_malformed_payload_falls_back_to_serializer(self):
+        serializer = CompositeCreationSerializer(data={"accounts": {}, "transactions": []})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("accounts", serializer.errors)
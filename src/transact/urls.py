@@ -4,5 +4,21 @@ from . import views
 
 urlpatterns = [
     path("integrations/transactions/", views.BulkAccountTransactionView.as_view(), name="bulk-account-transactions"),
+    path("batches/<uuid:batch_id>/", views.BatchStatusView.as_view(), name="batch-status"),
     path("reports/account/<str:account_id>/summary/", views.SummaryAccountView.as_view(), name="account-summary"),
+    path(
+        "reports/account/<str:account_id>/timeseries/", views.TimeseriesAccountView.as_view(), name="account-timeseries"
+    ),
+    path(
+        "reports/account/<str:account_id>/transactions/",
+        views.TransactionListView.as_view(),
+        name="account-transactions",
+    ),
+    path(
+        "reports/account/<str:account_id>/transactions/export/",
+        views.TransactionExportView.as_view(),
+        name="account-transactions-export",
+    ),
+    path("reports/accounts/summary/", views.SummaryAccountsView.as_view(), name="accounts-summary"),
+    path("metrics/", views.MetricsView.as_view(), name="metrics"),
 ]
@@ -0,0 +1,225 @@
+from collections.abc import Mapping
+from decimal import Decimal, DecimalException
+from functools import cache
+
+from django.conf import settings
+from django.core import validators
+from django.utils.dateparse import parse_datetime
+from rest_framework import fields, serializers
+from rest_framework.settings import api_settings
+from rest_framework.validators import ProhibitSurrogateCharactersValidator
+
+
+class BatchValidator:
+    """
+    Validates many rows against a serializer's schema at once, column by column.
+
+    This is a fast path for ``Serializer(many=True)`` on large ingestion payloads: rather than running the full DRF
+    field machinery for every cell, each column is checked in a tight loop which only handles the common, well-formed
+    case inline. Any value that is not trivially valid is handed to the serializer's own field, so errors keep exactly
+    the same messages, codes and shape as the regular serializer.
+
+    Only plain ``CharField``, ``DecimalField`` and ``DateTimeField`` columns are supported, without validators other
+    than the ones these fields add themselves for their length limits and forbidden characters, on serializers
+    without object-level validation. Use :meth:`supports` to check a serializer before use.
+    """
+
+    SUPPORTED_FIELDS = (fields.CharField, fields.DecimalField, fields.DateTimeField)
+
+    def __init__(self, serializer_class: type[serializers.Serializer]):
+        self.serializer = serializer_class()
+        self.columns = [field for field in self.serializer.fields.values() if not field.read_only]
+
+    @classmethod
+    def supports(cls, serializer_class: type[serializers.Serializer]) -> bool:
+        """
+        Whether rows of the given serializer can be validated by this class with identical results.
+
+        :param serializer_class: The serializer describing a single row.
+        :return: True if every field is supported and there is no object or field level validation.
+        """
+        serializer = serializer_class()
+        if serializer.validators or type(serializer).validate is not serializers.Serializer.validate:
+            return False
+
+        for name, field in serializer.fields.items():
+            if hasattr(serializer, f"validate_{name}"):
+                return False
+            if not field.read_only and type(field) not in cls.SUPPORTED_FIELDS:
+                return False
+            if getattr(field, "input_formats", None) not in (None, [fields.ISO_8601]):
+                return False
+            if not field.read_only and not all(cls._checked_inline(field, validator) for validator in field.validators):
+                return False
+        return True
+
+    @staticmethod
+    def _checked_inline(field: fields.Field, validator) -> bool:
+        """
+        Whether the fast path of the given field checks what the given validator does, so it can be skipped.
+        """
+        if not isinstance(field, fields.CharField):
+            return False
+        if type(validator) is validators.MaxLengthValidator:
+            return validator.limit_value == field.max_length
+        if type(validator) is validators.MinLengthValidator:
+            return validator.limit_value == field.min_length
+        return type(validator) in (validators.ProhibitNullCharactersValidator, ProhibitSurrogateCharactersValidator)
+
+    def validate(self, rows: list) -> list[dict]:
+        """
+        Validate the given rows, returning them keyed by model attribute.
+
+        :param rows: The incoming rows, as they would be passed to ``Serializer(data=rows, many=True)``.
+        :return: The validated rows, equal to the serializer's ``validated_data``.
+        :raises ValidationError: With one error dict per row (empty for valid rows), as ``ListSerializer`` does.
+        """
+        validated = [{} for _ in rows]
+        errors = [{} for _ in rows]
+
+        for index, row in enumerate(rows):
+            if not isinstance(row, Mapping):
+                message = self.serializer.error_messages["invalid"].format(datatype=type(row).__name__)
+                errors[index] = {
+                    api_settings.NON_FIELD_ERRORS_KEY: [serializers.ErrorDetail(message, code="invalid")]
+                }
+
+        for field in self.columns:
+            self._validate_column(field, rows, validated, errors)
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return validated
+
+    def _validate_column(self, field: fields.Field, rows: list, validated: list[dict], errors: list[dict]) -> None:
+        name = field.field_name
+        attribute = field.source
+        fast_path = self._fast_path(field)
+
+        for index, row in enumerate(rows):
+            if errors[index].get(api_settings.NON_FIELD_ERRORS_KEY):
+                continue
+
+            value = row.get(name, fields.empty)
+            internal = fast_path(value)
+            if internal is fields.empty:
+                # Not trivially valid, so defer to the field for the exact DRF behaviour and error messages
+                try:
+                    internal = field.run_validation(value)
+                except fields.SkipField:
+                    continue
+                except serializers.ValidationError as exc:
+                    errors[index][name] = exc.detail
+                    continue
+
+            validated[index][attribute] = internal
+
+    def _fast_path(self, field: fields.Field):
+        """
+        Return a function converting a well-formed value of the given field, or returning ``empty`` otherwise.
+        """
+        if isinstance(field, fields.CharField):
+            return self._char_fast_path(field)
+        if isinstance(field, fields.DecimalField):
+            return self._decimal_fast_path(field)
+        return self._datetime_fast_path(field)
+
+    @staticmethod
+    def _char_fast_path(field: fields.CharField):
+        max_length = field.max_length
+        min_length = field.min_length or 1
+        trim_whitespace = field.trim_whitespace
+
+        def convert(value):
+            if value.__class__ is not str:
+                return fields.empty
+            if trim_whitespace:
+                value = value.strip()
+            # Non-ASCII strings may hold surrogates, which are left to the field's validators
+            if len(value) < min_length or (max_length is not None and len(value) > max_length):
+                return fields.empty
+            if not value.isascii() or "\x00" in value:
+                return fields.empty
+            return value
+
+        return convert
+
+    @staticmethod
+    def _decimal_fast_path(field: fields.DecimalField):
+        max_digits = field.max_digits
+        decimal_places = field.decimal_places
+        max_whole_digits = field.max_whole_digits
+        if field.localize or max_digits is None or decimal_places is None:
+            return lambda value: fields.empty
+
+        def convert(value):
+            if value.__class__ is not str or len(value) > field.MAX_STRING_LENGTH:
+                return fields.empty
+            try:
+                number = Decimal(value)
+            except DecimalException:
+                return fields.empty
+            if not number.is_finite():
+                return fields.empty
+
+            _, digits, exponent = number.as_tuple()
+            places = max(-exponent, 0)
+            whole_digits = max(len(digits) + exponent, 0)
+            if places > decimal_places or whole_digits > max_whole_digits or whole_digits + places > max_digits:
+                return fields.empty
+            return field.quantize(number)
+
+        return convert
+
+    @staticmethod
+    def _datetime_fast_path(field: fields.DateTimeField):
+        field_timezone = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+        if field_timezone is None:
+            return lambda value: fields.empty
+
+        def convert(value):
+            if value.__class__ is not str:
+                return fields.empty
+            try:
+                parsed = parse_datetime(value)
+                if parsed is None or parsed.tzinfo is None:
+                    return fields.empty
+                return parsed.astimezone(field_timezone)
+            except (ValueError, OverflowError):
+                return fields.empty
+
+        return convert
+
+
+@cache
+def get_batch_validator(serializer_class: type[serializers.Serializer]) -> BatchValidator | None:
+    """
+    Return a shared batch validator for the given serializer, or None if it is not supported.
+
+    :param serializer_class: The serializer describing a single row.
+    """
+    return BatchValidator(serializer_class) if BatchValidator.supports(serializer_class) else None
+
+
+def validate_rows(serializer_class: type[serializers.Serializer], rows: list) -> list[dict]:
+    """
+    Validate rows as ``serializer_class(many=True)`` would.
+
+    Batches of at least ``TRANSACT_BATCH_VALIDATION_THRESHOLD`` rows are checked by the :class:`BatchValidator` fast
+    path when the serializer supports it, smaller ones by the serializer itself.
+
+    :param serializer_class: The serializer describing a single row.
+    :param rows: The incoming rows.
+    :return: The validated rows.
+    :raises ValidationError: With one error dict per row (empty for valid rows).
+    """
+    validator = None
+    if len(rows) >= settings.TRANSACT_BATCH_VALIDATION_THRESHOLD:
+        validator = get_batch_validator(serializer_class)
+
+    if validator is not None:
+        return validator.validate(rows)
+
+    serializer = serializer_class(data=rows, many=True)
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data
@@ -0,0 +1,154 @@
+"""
+Per-account version counters, kept in the shared cache and bumped whenever an account's transactions change.
+
+Anything derived from an account's transactions, e.g. a summary, can be cached under the account's current version:
+once the version is bumped, the entry is never looked up again and simply expires. Versions expire too, after
+``TRANSACT_ACCOUNT_VERSION_TTL`` seconds, and are then replaced by a newer one.
+
+The category rules have a version of their own, bumped whenever any of them changes, which tells workers to recompile
+their rule matcher.
+"""
+
+import logging
+import math
+import time
+from collections.abc import Iterable
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .caching import is_shared_cache
+from .routers import lag_monitor
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "account_version"
+CHANGED_KEY_PREFIX = "account_changed"
+RULES_KEY = "category_rules_version"
+
+# Until when, on the monotonic clock, this process failed to mark accounts as changed and cannot tell which did
+_unmarked_until = 0.0
+
+
+def _key(account_id: str) -> str:
+    return f"{KEY_PREFIX}:{account_id}"
+
+
+def get_account_versions(account_ids: Iterable[str], alias: str = "default") -> dict[str, int]:
+    """
+    Return the current version of each of the given accounts.
+
+    Accounts without a version yet, or whose version was evicted, get a new one based on the current time rather
+    than starting again from zero, so that entries cached under an earlier version are never served again.
+
+    :param account_ids: The account IDs.
+    :param alias: The cache holding the versions.
+    :return: The versions keyed by account ID.
+    """
+    cache = caches[alias]
+    keys = {_key(account_id): account_id for account_id in account_ids}
+    versions = cache.get_many(keys)
+    for key in keys.keys() - versions.keys():
+        # Another process may have set it in the meantime, in which case its version wins
+        cache.add(key, time.time_ns(), timeout=settings.TRANSACT_ACCOUNT_VERSION_TTL)
+        versions[key] = cache.get(key)
+    return {account_id: versions[key] for key, account_id in keys.items()}
+
+
+def get_account_version(account_id: str, alias: str = "default") -> int:
+    return get_account_versions([account_id], alias)[account_id]
+
+
+def bump_account_versions(account_ids: Iterable[str], alias: str = "default") -> None:
+    """
+    Bump the versions of the given accounts, invalidating whatever was cached under their current versions.
+
+    Call it once the changes to the accounts' transactions are committed, so that no entry computed from the
+    previous state can be cached under the new version. The accounts are also marked as changed for as long as read
+    replicas may lag behind, see :func:`changed_recently`.
+
+    :param account_ids: The IDs of the changed accounts.
+    :param alias: The cache holding the versions.
+    """
+    cache = caches[alias]
+    account_ids = set(account_ids)
+    _mark_changed(cache, account_ids)
+    for account_id in account_ids:
+        key = _key(account_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Not set, expired or evicted
+            cache.add(key, time.time_ns(), timeout=settings.TRANSACT_ACCOUNT_VERSION_TTL)
+        except Exception:
+            logger.warning("Could not bump the version of account %s", account_id, exc_info=True)
+
+
+def _mark_changed(cache, account_ids: set[str]) -> None:
+    global _unmarked_until
+    # Replicas may not have caught up with the changes for as long as they are allowed to lag, plus however long ago
+    # their lag was last measured
+    if settings.TRANSACT_REPLICA_MAX_LAG and account_ids:
+        timeout = math.ceil(settings.TRANSACT_REPLICA_MAX_LAG + lag_monitor.interval)
+        try:
+            cache.set_many({f"{CHANGED_KEY_PREFIX}:{account_id}": True for account_id in account_ids}, timeout=timeout)
+        except Exception:
+            logger.warning("Could not mark accounts %s as changed", sorted(account_ids), exc_info=True)
+            # This process at least reads every account from the primary for as long as the markers would have lasted
+            _unmarked_until = time.monotonic() + timeout
+
+
+def changed_recently(account_ids: Iterable[str], alias: str = "default") -> bool:
+    """
+    Return whether any of the given accounts changed so recently that read replicas may not have caught up yet,
+    i.e. within the last ``TRANSACT_REPLICA_MAX_LAG`` seconds plus the interval between two lag checks.
+
+    Accounts are assumed to have changed whenever that cannot be told: if the cache is local to the process, and so
+    misses the changes made by the others, if it is unavailable, or if this process recently failed to mark changes.
+
+    :param account_ids: The account IDs.
+    :param alias: The cache holding the versions.
+    """
+    if not settings.TRANSACT_REPLICA_MAX_LAG:
+        return False
+    if not is_shared_cache(alias) or time.monotonic() < _unmarked_until:
+        return True
+    try:
+        return bool(caches[alias].get_many([f"{CHANGED_KEY_PREFIX}:{account_id}" for account_id in account_ids]))
+    except Exception:
+        logger.warning("Could not check whether accounts %s changed", sorted(account_ids), exc_info=True)
+        return True
+
+
+def get_rules_version(alias: str = "default") -> int:
+    """
+    Return the current version of the category rules, starting from the current time if it has none yet or it
+    expired, as for accounts.
+
+    :param alias: The cache holding the version.
+    """
+    cache = caches[alias]
+    version = cache.get(RULES_KEY)
+    if version is None:
+        cache.add(RULES_KEY, time.time_ns(), timeout=settings.TRANSACT_CATEGORY_CACHE_TTL)
+        version = cache.get(RULES_KEY)
+    return version
+
+
+def bump_rules_version(alias: str = "default") -> None:
+    """
+    Bump the version of the category rules, so that workers recompile their rule matcher at their next check.
+
+    Rules saved, deleted, or changed through their querysets, e.g. with ``update()``, bump it once the change is
+    committed. Call it after changing them any other way, e.g. with raw SQL.
+
+    :param alias: The cache holding the version.
+    """
+    cache = caches[alias]
+    try:
+        cache.incr(RULES_KEY)
+    except ValueError:
+        # Not set, expired or evicted
+        cache.add(RULES_KEY, time.time_ns(), timeout=settings.TRANSACT_CATEGORY_CACHE_TTL)
+    except Exception:
+        logger.warning("Could not bump the version of the category rules", exc_info=True)
@@ -1,20 +1,159 @@
-from datetime import datetime
+import hashlib
+from collections.abc import Callable
+from contextlib import AbstractContextManager
+from datetime import date, datetime
 
-from rest_framework import request, response, status
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import RequestDataTooBig
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import content_disposition_header, parse_etags, quote_etag
+from rest_framework import exceptions, permissions, request, response, status
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 
-from .models import Transaction
-from .serializers import AccountSummarySerializer, CompositeCreationSerializer
+from . import metrics
+from .caching import is_shared_cache
+from .exports import csv_chunks, export_rows, ndjson_chunks
+from .ingestion import StreamingIngestion, stage_batch
+from .models import IngestionBatch, Transaction
+from .pagination import KeysetPagination
+from .parsers import NDJSONParser
+from .routers import replica_reads
+from .serializers import (
+    AccountSummariesRequestSerializer,
+    AccountSummarySerializer,
+    AccountTimeseriesRequestSerializer,
+    AccountTimeseriesSerializer,
+    BatchStatusSerializer,
+    CompositeCreationSerializer,
+    DateRangeRequestSerializer,
+    TransactionListSerializer,
+)
+from .task import materialise_batch
+from .versions import changed_recently, get_account_version, get_account_versions
 
 
 class BulkAccountTransactionView(APIView):
+    parser_classes = [*api_settings.DEFAULT_PARSER_CLASSES, NDJSONParser]
+
+    # Media types which can be staged as-is for asynchronous ingestion
+    STAGEABLE_MEDIA_TYPES = ("application/json", NDJSONParser.media_type)
+
     def post(self, request: request.Request) -> response.Response:
+        if "respond-async" in request.headers.get("Prefer", ""):
+            return self._accept(request)
+
+        if request.content_type.startswith(NDJSONParser.media_type):
+            # Streamed batches are validated and inserted chunk by chunk as the body is read
+            response_data = StreamingIngestion().ingest(request.data)
+            return response.Response(response_data, status=status.HTTP_201_CREATED)
+
         serializer = CompositeCreationSerializer(data=request.data)
         if serializer.is_valid():
             response_data = serializer.save()
             return response.Response(response_data, status=status.HTTP_201_CREATED)
         return response.Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def _accept(self, request: request.Request) -> response.Response:
+        """
+        Stage the raw payload and return straight away, leaving validation and inserts to a background task.
+
+        Payloads are stored in the database and read back whole by the worker, so they are bounded by
+        ``TRANSACT_MAX_STAGED_BODY_SIZE``.
+        """
+        media_type = request.content_type.split(";")[0].strip()
+        if media_type not in self.STAGEABLE_MEDIA_TYPES:
+            raise exceptions.UnsupportedMediaType(media_type)
+
+        max_size = settings.TRANSACT_MAX_STAGED_BODY_SIZE
+        payload = request.stream.read(max_size + 1) if request.stream else b""
+        if len(payload) > max_size:
+            raise RequestDataTooBig("Staged request body exceeded TRANSACT_MAX_STAGED_BODY_SIZE.")
+
+        batch = stage_batch(payload, content_type=media_type)
+        materialise_batch.delay(batch_id=str(batch.batch_id))
+
+        return response.Response(
+            {"batch_id": str(batch.batch_id), "status": batch.status},
+            status=status.HTTP_202_ACCEPTED,
+            headers={
+                "Location": reverse("batch-status", kwargs={"batch_id": batch.batch_id}),
+                "Preference-Applied": "respond-async",
+            },
+        )
+
+
+class BatchStatusView(APIView):
+    def get(self, request: request.Request, batch_id: str) -> response.Response:
+        batch = get_object_or_404(IngestionBatch, batch_id=batch_id)
+        return response.Response(BatchStatusSerializer(batch).data, status=status.HTTP_200_OK)
+
+
+SUMMARY_CACHE_PREFIX = "account_summary"
+TIMESERIES_CACHE_PREFIX = "account_timeseries"
+
+
+def summary_key(account_id: str, version: int, start_date: date, end_date: date) -> str:
+    """
+    Return the key a summary is cached and tagged under. Summaries are cached under the account's version, which is
+    bumped whenever its transactions change, so an entry is never stale. The days of the range depend on the current
+    timezone.
+    """
+    return f"{account_id}:{version}:{start_date}:{end_date}:{timezone.get_current_timezone_name()}"
+
+
+def reporting_reads(account_ids: list[str]) -> AbstractContextManager:
+    """
+    Let the report queries made within the block go to a read replica, unless one of the accounts reported on changed
+    too recently for replicas to have caught up.
+    """
+    return replica_reads(not changed_recently(account_ids))
+
+
+def versioned_response(
+    request: request.Request, cache_key: str, metric: str, compute: Callable[[], response.Response]
+) -> response.Response:
+    """
+    Answer a report request with ``304 Not Modified`` if the client holds the current report already, otherwise from
+    the cache, computing and caching the report on a miss.
+
+    Versions are bumped by whichever process changes an account, e.g. a Celery worker, so reports are only cached and
+    tagged when the cache is shared by every process. Otherwise they are computed for every request.
+
+    :param request: The request.
+    :param cache_key: The key the report is cached under, including the version of the account reported on.
+    :param metric: The prefix of the counters of hits, misses and ``304`` responses.
+    :param compute: Computes the report response. Only successful responses are cached.
+    :return: The response, tagged with an ETag derived from the cache key.
+    """
+    if not is_shared_cache():
+        return compute()
+
+    etag = quote_etag(hashlib.blake2b(cache_key.encode(), digest_size=16).hexdigest())
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+    if etag in if_none_match or "*" in if_none_match:
+        metrics.incr(f"{metric}.not_modified")
+        return response.Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    data = cache.get(cache_key)
+    if data is not None:
+        metrics.incr(f"{metric}.hits")
+        return response.Response(data, status=status.HTTP_200_OK, headers=headers)
+    metrics.incr(f"{metric}.misses")
+
+    computed = compute()
+    if computed.status_code == status.HTTP_200_OK:
+        cache.set(cache_key, computed.data, timeout=settings.TRANSACT_SUMMARY_CACHE_TTL)
+        for header, value in headers.items():
+            computed[header] = value
+    return computed
+
 
 class SummaryAccountView(APIView):
     def get(self, request: request.Request, account_id: str) -> response.Response:
@@ -38,15 +177,151 @@ class SummaryAccountView(APIView):
                 {"error": "start_date cannot be after end_date"}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Get account summary data from the model manager
-        summary_data = Transaction.objects.account_summary(
-            account_id=account_id,
-            start_date=start_date,
-            end_date=end_date,
+        key = summary_key(account_id, get_account_version(account_id), start_date, end_date)
+        return versioned_response(
+            request,
+            f"{SUMMARY_CACHE_PREFIX}:{key}",
+            "summary_cache",
+            lambda: self.summarise(account_id, start_date, end_date),
         )
 
+    def summarise(self, account_id: str, start_date: date, end_date: date) -> response.Response:
+        # Get account summary data from the model manager
+        with reporting_reads([account_id]):
+            summary_data = Transaction.objects.account_summary(
+                account_id=account_id,
+                start_date=start_date,
+                end_date=end_date,
+            )
+
         # Serialize and return the data
         serializer = AccountSummarySerializer(data=summary_data)
         if serializer.is_valid():
             return response.Response(serializer.data, status=status.HTTP_200_OK)
         return response.Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class TimeseriesAccountView(APIView):
+    def get(self, request: request.Request, account_id: str) -> response.Response:
+        serializer = AccountTimeseriesRequestSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return response.Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        params = serializer.validated_data
+
+        key = summary_key(account_id, get_account_version(account_id), params["start_date"], params["end_date"])
+        return versioned_response(
+            request,
+            f"{TIMESERIES_CACHE_PREFIX}:{key}:{params['interval']}:{params['by_category']}",
+            "timeseries_cache",
+            lambda: self.series(account_id, params),
+        )
+
+    def series(self, account_id: str, params: dict) -> response.Response:
+        with reporting_reads([account_id]):
+            series = Transaction.objects.account_timeseries(account_id, **params)
+        return response.Response(AccountTimeseriesSerializer(series).data, status=status.HTTP_200_OK)
+
+
+class SummaryAccountsView(APIView):
+    def post(self, request: request.Request) -> response.Response:
+        serializer = AccountSummariesRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return response.Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        account_ids = list(dict.fromkeys(serializer.validated_data["account_ids"]))
+        start_date, end_date = serializer.validated_data["start_date"], serializer.validated_data["end_date"]
+
+        if not is_shared_cache():
+            # See versioned_response
+            with reporting_reads(account_ids):
+                summaries = Transaction.objects.account_summaries(account_ids, start_date, end_date)
+            return response.Response(
+                {"summaries": [AccountSummarySerializer(summaries[account_id]).data for account_id in account_ids]},
+                status=status.HTTP_200_OK,
+            )
+
+        # Summaries cached for single accounts are reused, and the others are computed together
+        versions = get_account_versions(account_ids)
+        cache_keys = {
+            account_id: f"{SUMMARY_CACHE_PREFIX}:{summary_key(account_id, versions[account_id], start_date, end_date)}"
+            for account_id in account_ids
+        }
+        summaries = cache.get_many(cache_keys.values())
+        missing = [account_id for account_id in account_ids if cache_keys[account_id] not in summaries]
+        metrics.incr("summary_cache.hits", len(account_ids) - len(missing))
+        metrics.incr("summary_cache.misses", len(missing))
+
+        if missing:
+            with reporting_reads(missing):
+                computed = Transaction.objects.account_summaries(missing, start_date, end_date)
+            computed = {
+                cache_keys[account_id]: AccountSummarySerializer(summary).data
+                for account_id, summary in computed.items()
+            }
+            cache.set_many(computed, timeout=settings.TRANSACT_SUMMARY_CACHE_TTL)
+            summaries.update(computed)
+
+        return response.Response(
+            {"summaries": [summaries[cache_keys[account_id]] for account_id in account_ids]},
+            status=status.HTTP_200_OK,
+        )
+
+
+class TransactionListView(APIView):
+    pagination_class = KeysetPagination
+
+    def get(self, request: request.Request, account_id: str) -> response.Response:
+        serializer = DateRangeRequestSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return response.Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        fields = [field.source for field in TransactionListSerializer().fields.values()]
+        transactions = Transaction.objects.filter(account_id=account_id).in_period(**serializer.validated_data)
+        paginator = self.pagination_class()
+        with reporting_reads([account_id]):
+            page = paginator.paginate_queryset(transactions.only(*fields), request, view=self)
+        return paginator.get_paginated_response(TransactionListSerializer(page, many=True).data)
+
+
+class TransactionExportView(APIView):
+    """
+    Streams the account's transactions over a date range as CSV, or as NDJSON with ``?output=ndjson``. The parameter
+    is not named ``format``, which selects a DRF renderer.
+    """
+
+    OUTPUTS = {
+        "csv": ("text/csv", csv_chunks),
+        "ndjson": (NDJSONParser.media_type, ndjson_chunks),
+    }
+
+    def get(self, request: request.Request, account_id: str) -> StreamingHttpResponse | response.Response:
+        serializer = DateRangeRequestSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return response.Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        output = request.query_params.get("output", "csv")
+        if output not in self.OUTPUTS:
+            return response.Response(
+                {"error": f"output must be one of {', '.join(self.OUTPUTS)}"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        content_type, format_chunks = self.OUTPUTS[output]
+
+        start_date, end_date = serializer.validated_data["start_date"], serializer.validated_data["end_date"]
+        transactions = Transaction.objects.filter(account_id=account_id).in_period(start_date, end_date)
+        # Rows are read once the view has returned, so the database to read them from is chosen now
+        with reporting_reads([account_id]):
+            transactions = transactions.using(transactions.db)
+        columns, rows = export_rows(transactions.order_by("date", "transaction_id"), TransactionListSerializer())
+        metrics.incr(f"exports.{output}")
+        filename = f"{account_id}_{start_date}_{end_date}.{output}"
+        return StreamingHttpResponse(
+            format_chunks(columns, rows),
+            content_type=content_type,
+            headers={"Content-Disposition": content_disposition_header(True, filename)},
+        )
+
+
+class MetricsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request: request.Request) -> response.Response:
+        # Counters are per process, so this reports the metrics of the web worker serving the request
+        return response.Response(metrics.snapshot(), status=status.HTTP_200_OK)